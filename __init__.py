@@ -72,12 +72,13 @@ imported_modules = []
 # or parse it
 root_modules = ["menu", "node_tree", "data_structure", "core",
                 "utils", "ui", "nodes", "old_nodes"]
-core_modules = ["handlers", "update_system", "upgrade_nodes"]
+core_modules = ["profiling", "handlers", "update_system", "upgrade_nodes"]
 utils_modules = [
     # non UI tools
     "cad_module", "sv_bmesh_utils", "sv_viewer_utils", "sv_curve_utils",
     "voronoi", "sv_script", "sv_itertools", "script_importhelper",
-    "csg_core", "csg_geom", "sv_easing_functions",
+    "csg_core", "csg_geom", "sv_easing_functions", "sv_kdtree_utils",
+    "sv_bvh_utils", "sv_noise_utils", "sv_voronoi_utils",
     # UI text editor ui
     "text_editor_submenu", "text_editor_plugins",
     # UI operators
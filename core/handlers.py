@@ -5,6 +5,8 @@ from bpy.app.handlers import persistent
 
 from sverchok import data_structure
 from sverchok.core import upgrade_nodes
+from sverchok.utils.sv_kdtree_utils import reset_kdtree_cache
+from sverchok.utils import sv_bvh_utils
 from sverchok.ui import (viewer_draw, viewer_draw_mk2, index_viewer_draw,
                          nodeview_bgl_viewer_draw, color_def)
 from sverchok import old_nodes
@@ -39,6 +41,18 @@ def sv_scene_handler(scene):
                 print('Failed to update:', name, str(e))
 
 
+@persistent
+def sv_object_updates(scene):
+    """
+    Count the changes of object data, mesh edits, modifiers or shape keys,
+    so the raycast nodes rebuild only the trees of changed objects.
+    """
+    if bpy.data.objects.is_updated or bpy.data.meshes.is_updated:
+        for obj in scene.objects:
+            if obj.is_updated_data or (obj.data and obj.data.is_updated):
+                sv_bvh_utils.object_updates[obj.name] += 1
+
+
 @persistent
 def sv_clean(scene):
     """
@@ -50,6 +64,8 @@ def sv_clean(scene):
     nodeview_bgl_viewer_draw.callback_disable_all()
     data_structure.sv_Vars = {}
     data_structure.temp_handle = {}
+    reset_kdtree_cache()
+    sv_bvh_utils.snapshot_cache.clear()
 
 
 @persistent
@@ -128,6 +144,7 @@ def set_frame_change(mode):
 def register():
     bpy.app.handlers.load_pre.append(sv_clean)
     bpy.app.handlers.load_post.append(sv_post_load)
+    bpy.app.handlers.scene_update_post.append(sv_object_updates)
     data_structure.setup_init()
     addon_name = data_structure.SVERCHOK_NAME
     addon = bpy.context.user_preferences.addons.get(addon_name)
@@ -140,4 +157,5 @@ def register():
 def unregister():
     bpy.app.handlers.load_pre.remove(sv_clean)
     bpy.app.handlers.load_post.remove(sv_post_load)
+    bpy.app.handlers.scene_update_post.remove(sv_object_updates)
     set_frame_change(None)
@@ -0,0 +1,162 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Node profiling, enabled with the "Profile nodes" preference.
+# Keeps rolling statistics per node and a timeline of the latest
+# updates that can be exported as a chrome trace (chrome://tracing).
+#
+# From the blender console:
+#   from sverchok.core import profiling
+#   profiling.slowest_nodes(bpy.data.node_groups['NodeTree'])
+#   profiling.export_chrome_trace('/tmp/sverchok_trace.json')
+
+import collections
+import json
+import os
+import threading
+
+from sverchok import data_structure
+
+# number of runs per node the statistics are based on
+STATS_WINDOW = 100
+# number of node runs kept in the timeline
+TIMELINE_LENGTH = 20000
+
+# tree name -> node name -> NodeStats
+node_stats = collections.defaultdict(dict)
+# (tree name, graph entry) in order of processing
+timeline = collections.deque(maxlen=TIMELINE_LENGTH)
+
+
+class NodeStats(object):
+    '''Rolling statistics for one node'''
+
+    def __init__(self, bl_idname):
+        self.bl_idname = bl_idname
+        self.count = 0
+        self.durations = collections.deque(maxlen=STATS_WINDOW)
+        self.max = 0.0
+        self.bytes = 0
+
+    def add(self, duration, size):
+        self.count += 1
+        self.durations.append(duration)
+        self.max = max(self.max, duration)
+        self.bytes = size
+
+    @property
+    def mean(self):
+        if not self.durations:
+            return 0.0
+        return sum(self.durations) / len(self.durations)
+
+    @property
+    def p95(self):
+        if not self.durations:
+            return 0.0
+        durations = sorted(self.durations)
+        return durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+
+    def as_dict(self):
+        return {"bl_idname": self.bl_idname,
+                "count": self.count,
+                "mean": self.mean,
+                "p95": self.p95,
+                "max": self.max,
+                "bytes": self.bytes}
+
+
+def output_bytes(node):
+    return sum(data_structure.SvGetSocketSize(s) for s in node.outputs if s.is_linked)
+
+
+def record(ng, graph):
+    '''
+    Add the graph of one update from do_update_general to the statistics
+    '''
+    stats = node_stats[ng.name]
+    thread = threading.get_ident()
+    for entry in graph:
+        name = entry["name"]
+        node = ng.nodes.get(name)
+        size = output_bytes(node) if node else 0
+        entry["bytes"] = size
+        entry.setdefault("thread", thread)
+        if name not in stats:
+            stats[name] = NodeStats(entry["bl_idname"])
+        stats[name].add(entry["duration"], size)
+        timeline.append((ng.name, entry))
+
+
+def reset(ng=None):
+    if ng is None:
+        node_stats.clear()
+        timeline.clear()
+    else:
+        node_stats.pop(ng.name, None)
+        kept = [e for e in timeline if e[0] != ng.name]
+        timeline.clear()
+        timeline.extend(kept)
+
+
+def get_node_stats(ng):
+    '''
+    Statistics for all profiled nodes in tree, {node name: dict}
+    '''
+    return {name: stats.as_dict() for name, stats in node_stats.get(ng.name, {}).items()}
+
+
+def slowest_nodes(ng, count=10, key="mean"):
+    '''
+    List of (node name, statistics) sorted by key, one of
+    "mean", "p95", "max" or "bytes", slowest first
+    '''
+    stats = get_node_stats(ng)
+    return sorted(stats.items(), key=lambda item: item[1][key], reverse=True)[:count]
+
+
+def chrome_trace(ng=None):
+    '''
+    Timeline in chrome trace event format, one process per tree
+    '''
+    tree_ids = {}
+    events = []
+    for tree_name, entry in timeline:
+        if ng is not None and tree_name != ng.name:
+            continue
+        if tree_name not in tree_ids:
+            tree_ids[tree_name] = len(tree_ids) + 1
+            events.append({"name": "process_name", "ph": "M",
+                           "pid": tree_ids[tree_name],
+                           "args": {"name": tree_name}})
+        events.append({"name": entry["name"],
+                       "cat": entry["bl_idname"],
+                       "ph": "X",
+                       "ts": entry["start"] * 1e6,
+                       "dur": entry["duration"] * 1e6,
+                       "pid": tree_ids[tree_name],
+                       "tid": entry.get("thread", 0),
+                       "args": {"bytes": entry.get("bytes", 0)}})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def export_chrome_trace(path, ng=None):
+    path = os.path.expanduser(path)
+    with open(path, 'w') as trace_file:
+        json.dump(chrome_trace(ng), trace_file)
+    return path
@@ -17,6 +17,9 @@
 # ##### END GPL LICENSE BLOCK #####
 
 import collections
+import concurrent.futures
+import os
+import threading
 import time
 
 import bpy
@@ -24,10 +27,12 @@ from mathutils import Vector
 
 from sverchok import data_structure
 from sverchok.data_structure import SvNoDataError
+from sverchok.core import profiling
 import sverchok
 
 import traceback
 import ast
+import re
 
 graphs = []
 
@@ -44,18 +49,28 @@ def update_error_colors(self, context):
 update_cache = {}
 # cache for partial update lists
 partial_update_cache = {}
+# input fingerprints of the last successful process of each node, per node group
+node_fingerprints = {}
+# dependency index per node group, kept up to date from link changes
+dep_cache = {}
+# > 0 while evicted socket data is recomputed, no evictions then
+recompute_depth = 0
+# worker pool for parallel updates, created on first use
+executor = None
 
 
-def make_dep_dict(node_tree, down=False):
+def link_keys(node_tree):
     """
-    Create a dependency dictionary for node group.
+    Set of keys (from_node, from_socket, to_node, to_socket) for the
+    links in node group, wifi connections included.
+    Returns None if the links are in an invalid state.
     """
     ng = node_tree
-    
-    deps = collections.defaultdict(set)
-   
+
+    keys = set()
+
     # create wifi out dependencies, process if needed
-   
+
     wifi_out_nodes = [(name, node.var_name)
                   for name, node in ng.nodes.items()
                   if node.bl_idname == 'WifiOutNode' and node.outputs]
@@ -63,7 +78,7 @@ def make_dep_dict(node_tree, down=False):
         wifi_dict = {node.var_name: name
                      for name, node in ng.nodes.items()
                      if node.bl_idname == 'WifiInNode'}
-        
+
     for i,link in enumerate(list(ng.links)):
         #  this proctects against a rare occurance where 
         #  a link is considered valid without a to_socket
@@ -73,31 +88,91 @@ def make_dep_dict(node_tree, down=False):
             ng.links.remove(link)
             raise ValueError("Invalid link found!, please report this file")
         if not link.is_valid:
-            return collections.defaultdict(set)  # this happens more often than one might think
+            return None  # this happens more often than one might think
         if link.is_hidden:
             continue
-        key, value = (link.from_node.name, link.to_node.name) if down else (link.to_node.name, link.from_node.name) 
-        deps[key].add(value)
+        keys.add((link.from_node.name, link.from_socket.identifier,
+                  link.to_node.name, link.to_socket.identifier))
 
     for name, var_name in wifi_out_nodes:
         other = wifi_dict.get(var_name)
         if not other:
             print("Unsatisifed Wifi dependency: node, {0} var,{1}".format(name, var_name))
-            return collections.defaultdict(set)
-        if down:
-            deps[other].add(name)
-        else:
-            deps[name].add(other)
-    
+            return None
+        keys.add((other, "wifi", name, var_name))
+
+    return keys
+
+
+def make_dep_dict(node_tree, down=False):
+    """
+    Create a dependency dictionary for node group.
+    Walks all links, use get_dep_dict for the cached version.
+    """
+    deps = collections.defaultdict(set)
+    keys = link_keys(node_tree)
+    if keys:
+        for from_node, _, to_node, _ in keys:
+            if down:
+                deps[from_node].add(to_node)
+            else:
+                deps[to_node].add(from_node)
     return deps
 
 
+def update_dep_cache(ng):
+    """
+    Update the cached dependency index of node group with the links that
+    were added or removed since last time, called on tree updates.
+    """
+    global dep_cache
+    keys = link_keys(ng)
+    if keys is None:
+        dep_cache.pop(ng.name, None)
+        return
+    cache = dep_cache.get(ng.name)
+    if cache is None:
+        cache = {"links": set(),
+                 "pairs": collections.Counter(),
+                 "up": collections.defaultdict(set),
+                 "down": collections.defaultdict(set)}
+        dep_cache[ng.name] = cache
+    old_keys = cache["links"]
+    pairs = cache["pairs"]
+    up, down = cache["up"], cache["down"]
+    # several links can connect the same pair of nodes
+    for from_node, _, to_node, _ in old_keys - keys:
+        pair = (from_node, to_node)
+        pairs[pair] -= 1
+        if pairs[pair] <= 0:
+            del pairs[pair]
+            up[to_node].discard(from_node)
+            down[from_node].discard(to_node)
+    for from_node, _, to_node, _ in keys - old_keys:
+        pairs[(from_node, to_node)] += 1
+        up[to_node].add(from_node)
+        down[from_node].add(to_node)
+    cache["links"] = keys
+
+
+def get_dep_dict(ng, down=False):
+    """
+    Cached dependency dictionary for node group, don't modify it.
+    """
+    if ng.name not in dep_cache:
+        update_dep_cache(ng)
+    cache = dep_cache.get(ng.name)
+    if cache is None:
+        return collections.defaultdict(set)
+    return cache["down"] if down else cache["up"]
+
+
 def make_update_list(node_tree, node_set=None, dependencies=None):
     """
     Makes a update list from a node_group
     if a node set is passed only the subtree defined by the node set is used. Otherwise
     the complete node tree is used.
-    If dependencies are not passed they are built.
+    If dependencies are not passed they are taken from the cache.
     """
 
     ng = node_tree
@@ -105,47 +180,36 @@ def make_update_list(node_tree, node_set=None, dependencies=None):
         node_set = set(ng.nodes.keys())
     if len(node_set) == 1:
         return list(node_set)
-    if node_set:  # get one name
-        name = node_set.pop()
-        node_set.add(name)
-    else:
+    if not node_set:
         return []
     if not dependencies:
-        deps = make_dep_dict(ng)
+        deps = get_dep_dict(ng)
     else:
         deps = dependencies
 
-    tree_stack = collections.deque([name])
-    tree_stack_append = tree_stack.append
-    tree_stack_pop = tree_stack.pop
-    out = collections.OrderedDict()
-    # travel in node graph create one sorted list of nodes based on dependencies
-    node_count = len(node_set)
-    while node_count > len(out):
-        node_dependencies = True
-        for dep_name in deps[name]:
-            if dep_name in node_set and dep_name not in out:
-                tree_stack_append(name)
-                name = dep_name
-                node_dependencies = False
-                break
-        if len(tree_stack) > node_count:
-            print("Invalid node tree!")
-            return []
-        # if all dependencies are in out
-        if node_dependencies:
-            if name not in out:
-                out[name] = 1
-            if tree_stack:
-                name = tree_stack_pop()
-            else:
-                if node_count == len(out):
-                    break
-                for node_name in node_set:
-                    if node_name not in out:
-                        name = node_name
-                        break
-    return list(out.keys())
+    # Kahn's algorithm, sorted for a stable order between runs
+    in_degree = {}
+    users = collections.defaultdict(list)
+    for name in sorted(node_set):
+        node_deps = deps.get(name, ())
+        in_degree[name] = 0
+        for dep_name in node_deps:
+            if dep_name in node_set:
+                in_degree[name] += 1
+                users[dep_name].append(name)
+    queue = collections.deque(name for name, count in in_degree.items() if not count)
+    out = []
+    while queue:
+        name = queue.popleft()
+        out.append(name)
+        for user in users[name]:
+            in_degree[user] -= 1
+            if not in_degree[user]:
+                queue.append(user)
+    if len(out) < len(node_set):
+        print("Invalid node tree!")
+        return []
+    return out
 
 
 def separate_nodes(ng, links=None):
@@ -157,36 +221,24 @@ def separate_nodes(ng, links=None):
     nodes = set(ng.nodes.keys())
     if not nodes:
         return []
-    node_links = make_dep_dict(ng)
-    down = make_dep_dict(ng, down=True)
-    for name, links in down.items():
-        node_links[name].update(links) 
-    n = nodes.pop()
-    node_set_list = [set([n])]
-    node_stack = collections.deque()
+    up = get_dep_dict(ng)
+    down = get_dep_dict(ng, down=True)
+    node_set_list = []
+
     # find separate sets
-    node_stack_append = node_stack.append
-    node_stack_pop = node_stack.pop
-    
     while nodes:
-        for node in node_links[n]:
-            if node not in node_set_list[-1]:
-                node_stack_append(node)
-        if not node_stack:  # new part
-            n = nodes.pop()
-            node_set_list.append(set([n]))
-        else:
-            while n in node_set_list[-1] and node_stack:
-                n = node_stack_pop()
-            nodes.discard(n)
-            node_set_list[-1].add(n)
-    """
-    if ng.bl_idname == "SverchCustomTreeType":
-        skip_types = {"SvGroupInputsNode", "SvGroupOutputsNode"}
-        skip_nodes = {n.name for n in ng.nodes if n.bl_idname in skip_types}
-        if skip_nodes:
-            node_set_list = filter(lambda ns:ns.isdisjoint(skip_nodes), node_set_list)
-    """    
+        n = nodes.pop()
+        node_set = {n}
+        node_stack = [n]
+        while node_stack:
+            n = node_stack.pop()
+            for other in up.get(n, set()) | down.get(n, set()):
+                if other not in node_set:
+                    node_set.add(other)
+                    nodes.discard(other)
+                    node_stack.append(other)
+        node_set_list.append(node_set)
+
     return [ns for ns in node_set_list if len(ns) > 1]
 
 def make_tree_from_nodes(node_names, tree, down=True):
@@ -205,10 +257,9 @@ def make_tree_from_nodes(node_names, tree, down=True):
     out_stack = collections.deque(node_names)
     current_node = out_stack.pop()
 
-    # build downwards links, this should be cached perhaps
-    node_links = make_dep_dict(ng, down)
+    node_links = get_dep_dict(ng, down)
     while current_node:
-        for node in node_links[current_node]:
+        for node in node_links.get(current_node, ()):
             if node not in out_set:
                 out_set.add(node)
                 out_stack.append(node)
@@ -223,26 +274,70 @@ def make_tree_from_nodes(node_names, tree, down=True):
         return make_update_list(ng, out_set)
 
 
-# to make update tree based on node types and node names bases
-# no used yet
-# should add a check do find animated or driven nodes.
-# needs some updates
+# node types whose output can change on frame change without any input
+# changing, because they read the frame, scene or blend data.
+animated_node_types = {
+    'SvFrameInfoNode', 'SvCacheNode', 'ObjectsNode', 'SvObjRemoteNode',
+    'SvObjectToMeshNode', 'SvGetDataObjectNode', 'SvGetPropNode',
+    'Sv3DviewPropsNode', 'SvBMinputNode', 'SvBVHtreeNode',
+    'SvScriptNode', 'SvScriptNodeMK2', 'SvTextInNode',
+    'SvRayCastSceneNode', 'SvRayCastObjectNode', 'SvPointOnMeshNode',
+    'SvVertexGroupNode', 'ImageNode', 'HilbertImageNode', 'SvImageComponentsNode',
+}
+
+group_node_types = {'SvGroupNode', 'SvIterationNode'}
 
-def make_animation_tree(node_types, node_list, tree_name):
+# cache for animation update lists, tree name: (animated nodes, update list)
+animation_update_cache = {}
+
+
+def animated_nodes(ng):
     """
-    Create update list for specific purposes depending on which nodes are dynamic
-    node_types 
+    Names of nodes in node group that can change on frame change,
+    nodes of animated types, nodes with keyframed or driven properties
+    and group nodes with such nodes inside.
     """
-    global update_cache
-    ng = bpy.data.node_groups[tree_name]
-    node_set = set(node_list)
-    for n_t in node_types:
-        node_set = node_set | {name for name, node in ng.nodes.items() if node.bl_idname == n_t}
-    a_tree = make_tree_from_nodes(list(node_set), tree_name)
-    return a_tree
+    names = set()
+    anim = ng.animation_data
+    if anim:
+        fcurves = list(anim.drivers)
+        if anim.action:
+            fcurves.extend(anim.action.fcurves)
+        for fcurve in fcurves:
+            match = re.match(r'nodes\["(.+?)"\]', fcurve.data_path)
+            if match and match.group(1) in ng.nodes:
+                names.add(match.group(1))
+    for name, node in ng.nodes.items():
+        if node.bl_idname in animated_node_types:
+            names.add(name)
+        elif node.bl_idname in group_node_types:
+            group_ng = bpy.data.node_groups.get(node.group_name)
+            if group_ng and animated_nodes(group_ng):
+                names.add(name)
+    return names
+
+
+def make_animation_tree(ng):
+    """
+    Create update list of the nodes that depend on animated nodes,
+    cached until the topology or the set of animated nodes changes.
+    Returns (animated node names, update list)
+    """
+    global animation_update_cache
+    names = animated_nodes(ng)
+    key = frozenset(names)
+    cached = animation_update_cache.get(ng.name)
+    if cached and cached[0] == key:
+        return cached
+    if names:
+        a_tree = make_tree_from_nodes(list(names), ng)
+    else:
+        a_tree = []
+    animation_update_cache[ng.name] = (key, a_tree)
+    return key, a_tree
 
 
-def do_update_heat_map(node_list, nodes):
+def do_update_heat_map(node_list, nodes, dirty_nodes=None):
     """
     Create a heat map for the node tree, 
     Needs development.
@@ -251,10 +346,12 @@ def do_update_heat_map(node_list, nodes):
         color_data = {node.name: (node.color[:], node.use_custom_color) for node in nodes}
         nodes.id_data.sv_user_colors = str(color_data)
 
-    times = do_update_general(node_list, nodes)
+    times = do_update_general(node_list, nodes, dirty_nodes=dirty_nodes)
     if not times:
         return
     t_max = max(times)
+    if not t_max:
+        return
     addon_name = data_structure.SVERCHOK_NAME
     addon = bpy.context.user_preferences.addons.get(addon_name)
     if addon:
@@ -298,26 +395,71 @@ def reset_error_nodes(ng):
         del ng["error nodes"]
 
 
-def do_update_general(node_list, nodes, procesed_nodes=set()):
+def node_input_fingerprint(node):
+    """
+    Fingerprint of the data a node reads from linked inputs, built from
+    the upstream socket ids and the versions of their cached payloads.
+    Returns None if the node doesn't read any linked data, such nodes
+    always have to be processed.
+    """
+    fingerprint = []
+    for socket in node.inputs:
+        if socket.is_linked:
+            other = data_structure.get_other_socket(socket)
+            if not other:
+                return None
+            version = data_structure.SvGetSocketVersion(other)
+            fingerprint.append((socket.identifier, other.node.name, other.identifier, version))
+    return tuple(fingerprint) or None
+
+
+def reset_node_fingerprints(ng):
+    """
+    Mark all nodes in node group as dirty
+    """
+    global node_fingerprints
+    node_fingerprints[ng.name] = {}
+
+
+def do_update_general(node_list, nodes, procesed_nodes=set(), dirty_nodes=None):
     """
     General update function for node set
+    If dirty_nodes is passed, other nodes are skipped if their inputs
+    didn't change since they were last processed.
     """
     global graphs
+    global node_fingerprints
     timings = []
     graph = []
     total_time = 0
     done_nodes = set(procesed_nodes)
-    
+    fingerprints = node_fingerprints.setdefault(nodes.id_data.name, {})
+    skip_clean = dirty_nodes is not None and data_structure.SKIP_UNCHANGED
+    pending = set(node_list) - done_nodes
+
     for node_name in node_list:
         if node_name in done_nodes:
             continue
+        pending.discard(node_name)
         try:
             node = nodes[node_name]
+            fingerprint = node_input_fingerprint(node)
+            if (skip_clean and fingerprint is not None and node_name not in dirty_nodes
+                    and fingerprints.get(node_name) == fingerprint):
+                if data_structure.DEBUG_MODE:
+                    print("Skipped {}, inputs unchanged".format(node_name))
+                timings.append(0.0)
+                continue
             start = time.perf_counter()
             if hasattr(node, "process"):
                 node.process()
             delta = time.perf_counter() - start
+            if data_structure.MEMORY_BUDGET and not recompute_depth:
+                evict_finished(nodes.id_data, pending)
+            if data_structure.DEBUG_MUTATIONS:
+                data_structure.check_shared_reads()
             total_time += delta
+            fingerprints[node_name] = fingerprint
             if data_structure.DEBUG_MODE:
                 print("Processed  {} in: {:.4f}".format(node_name, delta))
             timings.append(delta)
@@ -328,21 +470,206 @@ def do_update_general(node_list, nodes, procesed_nodes=set()):
             
         except Exception as err:
             ng = nodes.id_data
+            fingerprints.pop(node_name, None)
             update_error_nodes(ng, node_name, err)
             traceback.print_tb(err.__traceback__)
             print("Node {0} had exception {1}".format(node_name, err))
             return None
-    graphs.append(graph)    
+    graphs.append(graph)
+    if data_structure.PROFILE_MODE:
+        profiling.record(nodes.id_data, graph)
     if data_structure.DEBUG_MODE:
         print("Node set updated in: {:.4f} seconds".format(total_time))
     return timings
     
 
-def do_update(node_list, nodes):
+def real_users(ng, name, down):
+    """
+    Nodes that read the outputs of node, looking through reroutes
+    """
+    users = set()
+    stack = list(down.get(name, ()))
+    while stack:
+        user = stack.pop()
+        node = ng.nodes.get(user)
+        if node and node.bl_idname == 'NodeReroute':
+            stack.extend(down.get(user, ()))
+        else:
+            users.add(user)
+    return users
+
+
+def evict_finished(ng, pending):
+    """
+    Evict cached outputs, largest first, while the socket cache of node group
+    is over the memory budget. Only outputs none of the pending nodes reads
+    are evicted, they are recomputed if something reads them later.
+    """
+    budget = data_structure.MEMORY_BUDGET
+    total = data_structure.socket_cache_size(ng.name)
+    if total <= budget:
+        return
+    down = get_dep_dict(ng, down=True)
+    sizes = data_structure.socket_data_size.get(ng.name, {})
+    owners = data_structure.socket_data_owner.get(ng.name, {})
+    finished = {}
+    candidates = []
+    for s_id, size in sizes.items():
+        owner = owners.get(s_id)
+        if owner is None or owner in pending:
+            continue
+        if owner not in finished:
+            finished[owner] = real_users(ng, owner, down).isdisjoint(pending)
+        if finished[owner]:
+            candidates.append((size, s_id))
+    for size, s_id in sorted(candidates, reverse=True):
+        if total <= budget:
+            break
+        data_structure.evict_socket_data(ng.name, s_id)
+        total -= size
+        if data_structure.DEBUG_MODE:
+            print("Evicted {} bytes from {}".format(size, owners.get(s_id, s_id)))
+
+
+def recompute_evicted(node):
+    """
+    Process node again, and the upstream nodes that had outputs evicted,
+    to restore socket data that was evicted from the cache
+    """
+    global recompute_depth
+    ng = node.id_data
+    update_list = make_tree_from_nodes([node.name], ng, down=False)
+    evicted = set(data_structure.evicted_sockets.get(ng.name, {}).values())
+    dirty = {name for name in update_list if name in evicted}
+    recompute_depth += 1
+    try:
+        do_update_general(update_list, ng.nodes, dirty_nodes=dirty)
+    finally:
+        recompute_depth -= 1
+
+
+def get_executor():
+    global executor
+    if executor is None:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count() or 2)
+    return executor
+
+
+def is_thread_safe(node):
+    """
+    Nodes declare that their process only reads their own sockets and
+    properties, and doesn't touch bpy data, by setting sv_thread_safe = True
+    """
+    return getattr(node, "sv_thread_safe", False)
+
+
+def timed_process(node):
+    start = time.perf_counter()
+    if hasattr(node, "process"):
+        node.process()
+    return start, time.perf_counter() - start, threading.get_ident()
+
+
+def do_update_parallel(node_list, nodes, deps):
+    """
+    Update function for node set, processing independent thread safe nodes
+    in a worker pool. A node is started once all nodes it depends on are done.
+    Nodes that aren't thread safe, like viewers, are queued and processed in
+    the main thread only while no worker is running, so bpy data is never
+    changed while a worker reads it. Unlike the serial update, which stops
+    at the first failing node, a node that fails stops only the nodes
+    downstream of it, independent parts of the tree are still processed.
+    deps is the dependency dictionary from make_dep_dict.
+    """
+    global graphs
+    global node_fingerprints
+    graph = []
+    ng = nodes.id_data
+    fingerprints = node_fingerprints.setdefault(ng.name, {})
+    node_set = set(node_list)
+    waiting = {name: deps.get(name, set()) & node_set for name in node_list}
+    users = collections.defaultdict(list)
+    for name in node_list:
+        for dep_name in waiting[name]:
+            users[dep_name].append(name)
+    ready = [name for name in node_list if not waiting[name]]
+    main_queue = collections.deque()
+    running = {}
+    failed = set()
+    pool = get_executor()
+
+    def finish(name, fingerprint, result):
+        start, delta, thread = result
+        fingerprints[name] = fingerprint
+        graph.append({"name": name,
+                      "bl_idname": nodes[name].bl_idname,
+                      "start": start,
+                      "duration": delta,
+                      "thread": thread})
+        if data_structure.DEBUG_MUTATIONS:
+            data_structure.check_shared_reads(name)
+        if data_structure.DEBUG_MODE:
+            print("Processed  {} in: {:.4f}".format(name, delta))
+        for user in users[name]:
+            waiting[user].discard(name)
+            if not waiting[user]:
+                ready.append(user)
+
+    def fail(name, err):
+        # users of a failed node keep waiting for it and are never started
+        failed.add(name)
+        fingerprints.pop(name, None)
+        update_error_nodes(ng, name, err)
+        traceback.print_tb(err.__traceback__)
+        print("Node {0} had exception {1}".format(name, err))
+
+    while ready or main_queue or running:
+        current, ready[:] = ready[:], []
+        for name in current:
+            node = nodes[name]
+            if is_thread_safe(node):
+                fingerprint = node_input_fingerprint(node)
+                running[pool.submit(timed_process, node)] = (name, fingerprint)
+            else:
+                main_queue.append(name)
+        if main_queue and not running:
+            name = main_queue.popleft()
+            node = nodes[name]
+            fingerprint = node_input_fingerprint(node)
+            try:
+                result = timed_process(node)
+            except Exception as err:
+                fail(name, err)
+            else:
+                finish(name, fingerprint, result)
+            continue
+        if not running:
+            continue
+        done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            name, fingerprint = running.pop(future)
+            try:
+                result = future.result()
+            except Exception as err:
+                fail(name, err)
+                continue
+            finish(name, fingerprint, result)
+
+    graphs.append(graph)
+    if data_structure.PROFILE_MODE:
+        profiling.record(ng, graph)
+    if data_structure.MEMORY_BUDGET and not recompute_depth:
+        evict_finished(ng, set())
+    if failed:
+        return None
+    return [g["duration"] for g in graph]
+
+
+def do_update(node_list, nodes, dirty_nodes=None):
     if data_structure.HEAT_MAP:
-        do_update_heat_map(node_list, nodes)
+        do_update_heat_map(node_list, nodes, dirty_nodes)
     else:
-        do_update_general(node_list, nodes)
+        do_update_general(node_list, nodes, dirty_nodes=dirty_nodes)
 
 def build_update_list(ng=None):
     """
@@ -358,12 +685,15 @@ def build_update_list(ng=None):
         for ng in sverchok_trees():
             build_update_list(ng)
     else:
+        update_dep_cache(ng)
         node_sets = separate_nodes(ng)
-        deps = make_dep_dict(ng)
+        deps = get_dep_dict(ng)
         out = [make_update_list(ng, s, deps) for s in node_sets]
         update_cache[ng.name] = out
         partial_update_cache[ng.name] = {}
+        animation_update_cache.pop(ng.name, None)
         data_structure.reset_socket_cache(ng)
+        reset_node_fingerprints(ng)
 
 
 def process_to_node(node):
@@ -408,7 +738,7 @@ def process_from_node(node):
         nodes = ng.nodes
         if not ng.sv_process:
             return
-        do_update(update_list, nodes)
+        do_update(update_list, nodes, dirty_nodes={node.name})
     else:
         process_tree(ng)
 
@@ -435,12 +765,40 @@ def process_tree(ng=None):
         if not update_list:
             build_update_list(ng)
             update_list = update_cache.get(ng.name)
-        for l in update_list:
-            do_update(l, ng.nodes)
+        if data_structure.PARALLEL_UPDATE and not data_structure.HEAT_MAP:
+            # independent parts are processed together
+            node_list = [name for l in update_list for name in l]
+            do_update_parallel(node_list, ng.nodes, get_dep_dict(ng))
+        else:
+            for l in update_list:
+                do_update(l, ng.nodes)
     else:
         pass
         
         
+def process_animation(ng):
+    """
+    Frame change update, only the nodes that depend on animated nodes
+    are processed, static results upstream are reused from the socket cache.
+    """
+    global graphs
+    graphs = []
+
+    if data_structure.RELOAD_EVENT:
+        reload_sverchok()
+        return
+    if not (ng.bl_idname == "SverchCustomTreeType" and ng.sv_process):
+        return
+    if not update_cache.get(ng.name):
+        process_tree(ng)
+        return
+    names, update_list = make_animation_tree(ng)
+    if not update_list:
+        return
+    reset_error_nodes(ng)
+    do_update(update_list, ng.nodes, dirty_nodes=names)
+
+
 def reload_sverchok():
     data_structure.RELOAD_EVENT = False
     from sverchok.core import handlers
@@ -457,8 +815,19 @@ def get_update_lists(ng):
         build_update_list(ng)
     return (update_cache.get(ng.name), partial_update_cache.get(ng.name))
     
+def shutdown_executor():
+    global executor
+    if executor is not None:
+        executor.shutdown(wait=True)
+        executor = None
+
+
 def register():
     addon_name = sverchok.__name__
     addon = bpy.context.user_preferences.addons.get(addon_name)
     if addon:
         update_error_colors(addon.preferences, [])
+
+
+def unregister():
+    shutdown_executor()
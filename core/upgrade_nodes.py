@@ -144,6 +144,10 @@ new_socket_dict = {
         [['inputs', 'StringsSocket', 'text', 4]],
     'SvIterateNode':
         [['outputs', 'MatrixSocket', 'Matrices', 3]],
+    'ListSortNodeMK2':
+        [['outputs', 'StringsSocket', 'Permutation', 1]],
+    'Voronoi2DNode':
+        [['outputs', 'StringsSocket', 'Polygons', 2]],
     }
 
 
@@ -21,6 +21,10 @@ from math import radians
 import itertools
 import time
 import ast
+import copy
+import sys
+import threading
+import numpy as np
 import bpy
 from mathutils import Vector, Matrix
 
@@ -28,6 +32,12 @@ global bmesh_mapping, per_cache
 
 DEBUG_MODE = False
 HEAT_MAP = False
+SKIP_UNCHANGED = True
+DEBUG_MUTATIONS = False
+PARALLEL_UPDATE = False
+PROFILE_MODE = False
+# socket cache memory budget in bytes, 0 for no limit
+MEMORY_BUDGET = 0
 RELOAD_EVENT = False
 
 # this is set correctly later.
@@ -39,6 +49,19 @@ temp_handle = {}
 # cache_nodes = {}
 # socket cache
 socket_data_cache = {}
+# version counter per cached socket payload, bumped when the payload changes
+socket_data_version = {}
+# payloads handed out without copy, checked for in place changes in debug mode
+shared_reads = []
+# shared_reads is filled from worker threads in parallel updates
+shared_reads_lock = threading.Lock()
+# converted copies of socket payloads, list <-> numpy, keyed by payload version
+socket_data_converted = {}
+# estimated size in bytes and owning node name of cached payloads
+socket_data_size = {}
+socket_data_owner = {}
+# payloads evicted to stay within MEMORY_BUDGET, s_id: node name
+evicted_sockets = {}
 # for viewer baker node cache
 cache_viewer_baker = {}
 sv_Vars = {}
@@ -197,30 +220,26 @@ def repeat_last(lst):
 
 # longest list matching [[1,2,3,4,5], [10,11]] -> [[1,2,3,4,5], [10,11,11,11,11]]
 def match_long_repeat(lsts):
+    if is_array_input(lsts):
+        return np_match_long_repeat(lsts)
     max_l = 0
-    tmp = []
     for l in lsts:
+        if not len(l):
+            return []
         max_l = max(max_l, len(l))
-    for l in lsts:
-        if len(l) == max_l:
-            tmp.append(l)
-        else:
-            tmp.append(repeat_last(l))
-    return list(map(list, zip(*zip(*tmp))))
+    return [list(l) + [l[-1]] * (max_l - len(l)) for l in lsts]
 
 
 # longest list matching, cycle [[1,2,3,4,5] ,[10,11]] -> [[1,2,3,4,5] ,[10,11,10,11,10]]
 def match_long_cycle(lsts):
+    if is_array_input(lsts):
+        return np_match_long_cycle(lsts)
     max_l = 0
-    tmp = []
     for l in lsts:
+        if not len(l):
+            return []
         max_l = max(max_l, len(l))
-    for l in lsts:
-        if len(l) == max_l:
-            tmp.append(l)
-        else:
-            tmp.append(itertools.cycle(l))
-    return list(map(list, zip(*zip(*tmp))))
+    return [(list(l) * (max_l // len(l) + 1))[:max_l] for l in lsts]
 
 
 # when you intent to use lenght of first list to control WHILE loop duration
@@ -236,6 +255,8 @@ def second_as_first_cycle(F,S):
 # cross matching
 # [[1,2], [5,6,7]] -> [[1,1,1,2,2,2], [5,6,7,5,6,7]]
 def match_cross(lsts):
+    if is_array_input(lsts):
+        return np_match_cross(lsts)
     return list(map(list, zip(*itertools.product(*lsts))))
 
 
@@ -245,11 +266,15 @@ def match_cross(lsts):
 # but longer and less elegant expression
 # performance difference is minimal since number of lists is usually small
 def match_cross2(lsts):
+    if is_array_input(lsts):
+        return np_match_cross2(lsts)
     return list(reversed(list(map(list, zip(*itertools.product(*reversed(lsts)))))))
 
 
 # Shortest list decides output length [[1,2,3,4,5], [10,11]] -> [[1,2], [10, 11]]
 def match_short(lsts):
+    if is_array_input(lsts):
+        return np_match_short(lsts)
     return list(map(list, zip(*zip(*lsts))))
 
 
@@ -257,10 +282,88 @@ def match_short(lsts):
 def fullList(l, count):
     d = count - len(l)
     if d > 0:
-        l.extend([l[-1] for a in range(d)])
+        l.extend([l[-1]] * d)
     return
 
 
+# numpy versions of the matchers, used by the functions above when all
+# inputs are arrays. The first axis is matched, results are arrays and
+# as far as possible views into the inputs, a single repeated item is a
+# stride 0 view and is never copied. Results should be treated read only.
+
+def is_array_input(lsts):
+    return bool(lsts) and all(isinstance(l, np.ndarray) for l in lsts)
+
+
+def np_repeat_to(arr, count):
+    """
+    Extend array to count items along the first axis by repeating the last
+    """
+    n = len(arr)
+    if n == count:
+        return arr
+    if n == 1:
+        return np.broadcast_to(arr, (count,) + arr.shape[1:])
+    return arr[np.minimum(np.arange(count), n - 1)]
+
+
+def np_cycle_to(arr, count):
+    """
+    Extend array to count items along the first axis by cycling
+    """
+    n = len(arr)
+    if n == count:
+        return arr
+    if n == 1:
+        return np.broadcast_to(arr, (count,) + arr.shape[1:])
+    return arr[np.arange(count) % n]
+
+
+def np_match_long_repeat(arrs):
+    if not all(len(a) for a in arrs):
+        return []
+    max_l = max(len(a) for a in arrs)
+    return [np_repeat_to(a, max_l) for a in arrs]
+
+
+def np_match_long_cycle(arrs):
+    if not all(len(a) for a in arrs):
+        return []
+    max_l = max(len(a) for a in arrs)
+    return [np_cycle_to(a, max_l) for a in arrs]
+
+
+def np_match_short(arrs):
+    min_l = min(len(a) for a in arrs)
+    if not min_l:
+        return []
+    return [a[:min_l] for a in arrs]
+
+
+def np_match_cross(arrs):
+    """
+    Cross matching, last array varies fastest, like match_cross
+    """
+    lengths = [len(a) for a in arrs]
+    total = int(np.prod(lengths))
+    if not total:
+        return []
+    index = np.arange(total)
+    out = []
+    step = total
+    for a, n in zip(arrs, lengths):
+        step //= n
+        out.append(a[(index // step) % n])
+    return out
+
+
+def np_match_cross2(arrs):
+    """
+    Cross matching, first array varies fastest, like match_cross2
+    """
+    return list(reversed(np_match_cross(list(reversed(arrs)))))
+
+
 def sv_zip(*iterables):
     # zip('ABCD', 'xy') --> Ax By
     # like standard zip but list instead of tuple
@@ -333,12 +436,13 @@ def iterate_process(method, matcher, *inputs, node=None):
 class Input(object):
     '''Node input socket metainformation descriptor.'''
 
-    def __init__(self, socktype, name, identifier=None, is_mandatory=True, default=sentinel, deepcopy=True):
+    def __init__(self, socktype, name, identifier=None, is_mandatory=True, default=sentinel, deepcopy=True, as_array=False):
         self.socktype = socktype
         self.name = name
         self.identifier = identifier if identifier is not None else name
         self.default = default
         self.deepcopy = deepcopy
+        self.as_array = as_array
         self.is_mandatory = is_mandatory
 
     def __str__(self):
@@ -348,7 +452,7 @@ class Input(object):
         return node.inputs.new(self.socktype, self.name, self.identifier)
     
     def get(self, node):
-        return node.inputs[self.name].sv_get(default=self.default, deepcopy=self.deepcopy)
+        return node.inputs[self.name].sv_get(default=self.default, deepcopy=self.deepcopy, as_array=self.as_array)
 
 class Output(object):
     '''Node output socket metainformation descriptor.'''
@@ -849,6 +953,11 @@ def sverchok_debug(mode):
 def setup_init():
     global DEBUG_MODE
     global HEAT_MAP
+    global SKIP_UNCHANGED
+    global DEBUG_MUTATIONS
+    global PARALLEL_UPDATE
+    global PROFILE_MODE
+    global MEMORY_BUDGET
     global SVERCHOK_NAME
     import sverchok
     SVERCHOK_NAME = sverchok.__name__
@@ -856,6 +965,11 @@ def setup_init():
     if addon:
         DEBUG_MODE = addon.preferences.show_debug
         HEAT_MAP = addon.preferences.heat_map
+        SKIP_UNCHANGED = addon.preferences.skip_unchanged
+        DEBUG_MUTATIONS = addon.preferences.debug_mutations
+        PARALLEL_UPDATE = addon.preferences.parallel_update
+        PROFILE_MODE = addon.preferences.profile_nodes
+        MEMORY_BUDGET = addon.preferences.memory_budget * 2**20
     else:
         print("Setup of preferences failed")
     
@@ -1114,6 +1228,8 @@ def SvSetSocketAnyType(self, socket_name, out):
 # useful for our limited case
 # we should be able to specify vectors here to get them create
 # or stop destroying them when in vector socket.
+# tuples and read only numpy arrays are immutable and shared,
+# a node that wants to change an array has to copy it first.
 
 
 def sv_deep_copy(lst):
@@ -1124,6 +1240,57 @@ def sv_deep_copy(lst):
     return lst
 
 
+def sv_freeze(data, level=2):
+    '''
+    Read only views of the numpy arrays in payload, the payload itself
+    or up to level lists deep, so they can be shared between consumers.
+    Lists holding arrays are copied, the lists of the caller are not
+    changed. A payload without writeable arrays is returned as it is.
+    '''
+    if isinstance(data, np.ndarray):
+        if data.flags.writeable:
+            data = data.view()
+            data.flags.writeable = False
+        return data
+    if level and isinstance(data, list) and data:
+        if isinstance(data[0], (list, np.ndarray)):
+            frozen = [sv_freeze(d, level - 1) for d in data]
+            if any(f is not d for f, d in zip(frozen, data)):
+                return frozen
+    return data
+
+
+def payload_unchanged(data, snapshot):
+    '''
+    Exact comparison of payload against a snapshot, numpy aware
+    '''
+    if isinstance(data, np.ndarray) or isinstance(snapshot, np.ndarray):
+        return np.array_equal(data, snapshot)
+    if isinstance(data, (list, tuple)) and isinstance(snapshot, (list, tuple)):
+        if len(data) != len(snapshot):
+            return False
+        return all(payload_unchanged(d, s) for d, s in zip(data, snapshot))
+    return data == snapshot
+
+
+def check_shared_reads(node=None):
+    '''
+    Report nodes that modified data read with deepcopy=False in place,
+    that corrupts the data for all other nodes reading the same socket.
+    With node, the name of a finished node, only its reads are checked,
+    nodes still running in other threads keep theirs.
+    Only used when DEBUG_MUTATIONS is set.
+    '''
+    with shared_reads_lock:
+        checked = [read for read in shared_reads if node is None or read[0] == node]
+        shared_reads[:] = [read for read in shared_reads if node is not None and read[0] != node]
+    for node_name, socket_name, data, snapshot in checked:
+        if not payload_unchanged(data, snapshot):
+            print("Warning: {} modified shared data from input {} in place".format(node_name, socket_name))
+# shared_reads is filled from worker threads in parallel updates
+shared_reads_lock = threading.Lock()
+
+
 # Build string for showing in socket label
 def SvGetSocketInfo(socket):
 
@@ -1139,25 +1306,192 @@ def SvGetSocketInfo(socket):
     if ng in socket_data_cache:
         if s_id in socket_data_cache[ng]:
             data = socket_data_cache[ng][s_id]
-            if data:
+            if data is not None and len(data):
                 return str(len(data))
     return ''
 
 
+def payload_equal(old, new):
+    '''
+    Check if a socket payload is unchanged, used to stop propagation of
+    updates that don't change any data. Equal payloads are compared in
+    full, so it's only done when skipping unchanged nodes is enabled.
+    '''
+    if old is new:
+        # could have been modified in place, can't tell
+        return False
+    if isinstance(old, np.ndarray) or isinstance(new, np.ndarray):
+        if isinstance(old, np.ndarray) and isinstance(new, np.ndarray) and np.may_share_memory(old, new):
+            # views of the same array, it could have been modified in place
+            return False
+        return np.array_equal(old, new)
+    try:
+        return bool(old == new)
+    except (ValueError, TypeError):
+        # ambiguous comparison, for example numpy arrays in lists
+        return False
+
+
+def sv_payload_size(data, sample=16):
+    '''
+    Estimate memory used by a socket payload in bytes. Nested lists are
+    estimated from a sample of their items, so this stays cheap for
+    large payloads.
+    '''
+    if isinstance(data, np.ndarray):
+        return data.nbytes
+    if isinstance(data, (list, tuple)):
+        size = sys.getsizeof(data)
+        if not data:
+            return size
+        if len(data) <= sample:
+            return size + sum(sv_payload_size(d, sample) for d in data)
+        step = len(data) // sample
+        sampled = sum(sv_payload_size(data[i * step], sample) for i in range(sample))
+        return size + sampled * len(data) // sample
+    return sys.getsizeof(data)
+
+
+def SvGetSocketSize(socket):
+    '''
+    Estimated size in bytes of the data cached for output socket
+    '''
+    return socket_data_size.get(socket.id_data.name, {}).get(socket_id(socket), 0)
+
+
+def socket_cache_size(ng_name):
+    '''
+    Estimated size in bytes of all data cached for node group
+    '''
+    return sum(socket_data_size.get(ng_name, {}).values())
+
+
+def evict_socket_data(ng_name, s_id):
+    '''
+    Drop payload from socket cache, it is recomputed when read again
+    '''
+    owner = socket_data_owner.get(ng_name, {}).pop(s_id, None)
+    socket_data_cache.get(ng_name, {}).pop(s_id, None)
+    socket_data_size.get(ng_name, {}).pop(s_id, None)
+    for as_array in (True, False):
+        socket_data_converted.get(ng_name, {}).pop((s_id, as_array), None)
+    if owner is not None:
+        evicted_sockets.setdefault(ng_name, {})[s_id] = owner
+
+
 def SvSetSocket(socket, out):
     global socket_data_cache
+    global socket_data_version
     if not socket.is_output:
         print("Warning, {} setting input socket: {}".format(socket.node.name, socket.name))
     if not socket.is_linked:
         print("Warning: {} setting unconncted socket: {}".format(socket.node.name, socket.name))
     s_id = socket_id(socket)
     s_ng = socket.id_data.name
-    if s_ng not in socket_data_cache:
-        socket_data_cache[s_ng] = {}
-    socket_data_cache[s_ng][s_id] = out
+    # setdefault, sockets can be set from worker threads
+    cache = socket_data_cache.setdefault(s_ng, {})
+    versions = socket_data_version.setdefault(s_ng, {})
+    out = sv_freeze(out)
+    # an evicted payload can't be compared, counts as changed
+    evicted_sockets.get(s_ng, {}).pop(s_id, None)
+    if not SKIP_UNCHANGED or s_id not in cache or not payload_equal(cache[s_id], out):
+        versions[s_id] = versions.get(s_id, 0) + 1
+    cache[s_id] = out
+    socket_data_size.setdefault(s_ng, {})[s_id] = sv_payload_size(out)
+    socket_data_owner.setdefault(s_ng, {})[s_id] = socket.node.name
+
+
+def SvGetSocketVersion(socket):
+    '''
+    Version of the payload of an output socket, None if nothing is cached.
+    '''
+    s_id = socket_id(socket)
+    return socket_data_version.get(socket.id_data.name, {}).get(s_id)
+
+
+#####################################
+# numpy socket payloads             #
+#####################################
+
+# Sockets can carry numpy arrays instead of nested lists, a list with
+# one array per object or one array with objects along the first axis:
+#   vertices N x 3 float, edges/faces N x k int, matrices N x 4 x 4 float
+# Legacy nodes still get nested lists from sv_get(), converted on demand
+# and only once per payload version. Nodes that work with arrays should
+# use sv_get(as_array=True).
 
+# dtype used for array conversion, per socket type
+socket_array_dtypes = {
+    'VerticesSocket': np.float64,
+    'MatrixSocket': np.float64,
+}
 
-def SvGetSocket(socket, deepcopy=True):
+
+def is_array_payload(data):
+    if isinstance(data, np.ndarray):
+        return True
+    return isinstance(data, (list, tuple)) and any(isinstance(d, np.ndarray) for d in data)
+
+
+def sv_to_list(data, tuples=False):
+    '''
+    Convert array payload to nested lists, with tuples=True the innermost
+    level of a 2d object array becomes tuples, like vertices in lists.
+    '''
+    out = []
+    for obj in data:
+        if isinstance(obj, np.ndarray):
+            if tuples and obj.ndim == 2:
+                out.append(list(map(tuple, obj.tolist())))
+            else:
+                out.append(obj.tolist())
+        else:
+            out.append(obj)
+    return out
+
+
+def sv_to_array(data, dtype=None):
+    '''
+    Convert list payload to a list of read only arrays, one per object.
+    Ragged objects, like faces with different vertex counts, stay lists.
+    '''
+    if isinstance(data, np.ndarray):
+        return sv_freeze(data)
+    out = []
+    for obj in data:
+        if not isinstance(obj, np.ndarray):
+            try:
+                arr = np.array(obj, dtype=dtype)
+            except (ValueError, TypeError):
+                out.append(obj)
+                continue
+            if arr.dtype == object:
+                out.append(obj)
+                continue
+            obj = arr
+        out.append(sv_freeze(obj))
+    return out
+
+
+def get_converted(s_ng, s_id, data, as_array, socket_type):
+    '''
+    Converted payload from cache, converts if payload version changed
+    '''
+    global socket_data_converted
+    version = socket_data_version.get(s_ng, {}).get(s_id)
+    converted = socket_data_converted.setdefault(s_ng, {})
+    key = (s_id, as_array)
+    if key in converted and converted[key][0] == version:
+        return converted[key][1]
+    if as_array:
+        out = sv_to_array(data, socket_array_dtypes.get(socket_type))
+    else:
+        out = sv_to_list(data, tuples=(socket_type == 'VerticesSocket'))
+    converted[key] = (version, out)
+    return out
+
+
+def SvGetSocket(socket, deepcopy=True, as_array=False):
     global socket_data_cache
     global DEBUG_MODE
     if socket.is_linked:
@@ -1166,11 +1500,26 @@ def SvGetSocket(socket, deepcopy=True):
         s_ng = other.id_data.name
         if s_ng not in socket_data_cache:
             raise LookupError
+        if s_id in evicted_sockets.get(s_ng, {}):
+            from sverchok.core import update_system
+            update_system.recompute_evicted(other.node)
         if s_id in socket_data_cache[s_ng]:
             out = socket_data_cache[s_ng][s_id]
+            if as_array:
+                # arrays are read only, never copied
+                if isinstance(out, np.ndarray) or (out and all(isinstance(d, np.ndarray) for d in out)):
+                    return out
+                return get_converted(s_ng, s_id, out, True, other.bl_idname)
+            if is_array_payload(out):
+                out = get_converted(s_ng, s_id, out, False, other.bl_idname)
+                # the converted lists are shared between consumers
+                deepcopy = True
             if deepcopy:
                 return sv_deep_copy(out)
             else:
+                if DEBUG_MUTATIONS:
+                    with shared_reads_lock:
+                        shared_reads.append((socket.node.name, socket.name, out, copy.deepcopy(out)))
                 return out
         else:
             if DEBUG_MODE:
@@ -1187,14 +1536,68 @@ def reset_socket_cache(ng):
     Reset socket cache either for node group.
     """
     global socket_data_cache
+    global socket_data_converted
     socket_data_cache[ng.name] = {}
+    socket_data_converted[ng.name] = {}
+    socket_data_size[ng.name] = {}
+    socket_data_owner[ng.name] = {}
+    evicted_sockets[ng.name] = {}
+    # versions are kept so that a reset never reuses a version number
+    from sverchok.utils.sv_kdtree_utils import reset_kdtree_cache
+    reset_kdtree_cache(ng)
         
 
 ####################################
 # быстрый сортировщик / quick sorter
 ####################################
 
+def numeric_array(keys):
+    """ keys as array if they are numbers or equal length tuples of numbers, else None """
+    try:
+        arr = np.asarray(keys)
+    except ValueError:
+        return None
+    if arr.dtype.kind not in 'biuf' or arr.ndim > 2:
+        return None
+    return arr
+
+
+def sv_argsort(values, keys=None, component=None):
+    """
+    Stable permutation that sorts values, as an int array.
+    keys: one sort key per value instead of the values themselves,
+          a key that is a tuple is compared item by item (lexicographic)
+    component: sort vectors, or tuple keys, by this component only,
+          keys that aren't vectors or tuples are sorted by value
+    Numbers and tuples of numbers are sorted by numpy, everything else
+    by sorted(), both are O(n log n).
+    """
+    if keys is None:
+        keys = values
+    arr = numeric_array(keys)
+    if component is not None:
+        if arr is not None:
+            if arr.ndim == 2:
+                arr = arr[:, component]
+        elif all(isinstance(k, (list, tuple, np.ndarray)) for k in keys):
+            keys = [k[component] for k in keys]
+            arr = numeric_array(keys)
+    if arr is None:
+        perm = sorted(range(len(keys)), key=keys.__getitem__)
+        return np.array(perm, dtype=np.int64)
+    if arr.ndim == 2:
+        # lexsort sorts by the last key first
+        return np.lexsort(arr.T[::-1])
+    return np.argsort(arr, kind='mergesort')
+
+
+def sv_permute(values, perm):
+    """ values reordered by a permutation from sv_argsort """
+    if isinstance(values, np.ndarray):
+        return values[perm]
+    return [values[i] for i in perm.tolist()]
+
+
 def svQsort(L):
-    if L: return svQsort([x for x in L[1:] if x<L[0]]) + L[0:1] + svQsort([x for x in L[1:] if x>=L[0]])
-    return []
+    return sv_permute(L, sv_argsort(L)) if len(L) else []
 
@@ -28,11 +28,12 @@ from sverchok import data_structure
 from sverchok.data_structure import (SvGetSocketInfo, SvGetSocket,
                                      SvSetSocket, updateNode,
                                      get_other_socket, SvNoDataError,
-                                     sentinel)
+                                     sentinel, sv_to_array)
 
 from sverchok.core.update_system import (build_update_list, process_from_node,
                                          process_tree, get_update_lists,
-                                         update_error_nodes)
+                                         update_error_nodes, update_dep_cache,
+                                         process_animation)
 from sverchok.ui import color_def
 
 def process_from_socket(self, context):
@@ -57,9 +58,9 @@ class MatrixSocket(NodeSocket):
     prop_name = StringProperty(default='')
     
 
-    def sv_get(self, default=sentinel, deepcopy=True):
+    def sv_get(self, default=sentinel, deepcopy=True, as_array=False):
         if self.is_linked and not self.is_output:
-            return SvGetSocket(self, deepcopy)
+            return SvGetSocket(self, deepcopy, as_array)
         elif default is sentinel:
             raise SvNoDataError
         else:
@@ -91,18 +92,19 @@ class VerticesSocket(NodeSocket):
     use_prop = BoolProperty(default=False)
     
     
-    def sv_get(self, default=sentinel, deepcopy=True):
+    def sv_get(self, default=sentinel, deepcopy=True, as_array=False):
         if self.is_linked and not self.is_output:
-            return SvGetSocket(self, deepcopy)
+            return SvGetSocket(self, deepcopy, as_array)
         if self.prop_name:
-            return [[getattr(self.node, self.prop_name)[:]]]
+            out = [[getattr(self.node, self.prop_name)[:]]]
         elif self.use_prop:
-            return [[self.prop[:]]]
+            out = [[self.prop[:]]]
         elif default is sentinel:
             raise SvNoDataError
         else:
             return default
-            
+        return sv_to_array(out, float) if as_array else out
+
     def sv_set(self, data):
         SvSetSocket(self, data)
 
@@ -134,17 +136,18 @@ class StringsSocket(NodeSocketStandard):
     prop_index = IntProperty()
 
 
-    def sv_get(self, default=sentinel, deepcopy=True):
+    def sv_get(self, default=sentinel, deepcopy=True, as_array=False):
         if self.is_linked and not self.is_output:
-            return SvGetSocket(self, deepcopy)
+            return SvGetSocket(self, deepcopy, as_array)
         elif self.prop_name:
-            return [[getattr(self.node, self.prop_name)]]
+            out = [[getattr(self.node, self.prop_name)]]
         elif self.prop_type:
-            return [[getattr(self.node, self.prop_type)[self.prop_index]]]
+            out = [[getattr(self.node, self.prop_type)[self.prop_index]]]
         elif default is not sentinel:
             return default
         else:
             raise SvNoDataError
+        return sv_to_array(out) if as_array else out
 
     def sv_set(self, data):
         SvSetSocket(self, data)
@@ -274,7 +277,7 @@ class SverchCustomTree(NodeTree, SvNodeTreeCommon):
         Updates the Sverchok node tree if animation layers show true. For animation callback
         """
         if self.sv_animate:
-            process_tree(self)
+            process_animation(self)
 
 
 class SverchGroupTree(NodeTree, SvNodeTreeCommon):
@@ -291,6 +294,7 @@ class SverchGroupTree(NodeTree, SvNodeTreeCommon):
         if self.is_frozen():
             return
         self.adjust_reroutes()
+        update_dep_cache(self)
 
     @classmethod
     def poll(cls, context):
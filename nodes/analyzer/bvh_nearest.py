@@ -19,6 +19,7 @@
 import bpy
 from sverchok.node_tree import SverchCustomTreeNode
 from sverchok.data_structure import (updateNode)
+from sverchok.utils.sv_bvh_utils import find_nearest
 
 
 class SvBVHnearNode(bpy.types.Node, SverchCustomTreeNode):
@@ -38,17 +39,12 @@ class SvBVHnearNode(bpy.types.Node, SverchCustomTreeNode):
     def process(self):
         outFin = []
         bvhl, p = self.inputs
-        oL,oN,oI,oD = self.outputs
+        points = p.sv_get()[0]
         for BV in bvhl.sv_get():
-            outFin.append([BV.find(i) for i in p.sv_get()[0]])
-        if oL.is_linked:
-            oL.sv_set([[i[0][:] for i in o] for o in outFin])
-        if oN.is_linked:
-            oN.sv_set([[i[1][:] for i in o] for o in outFin])
-        if oI.is_linked:
-            oI.sv_set([[i[2] for i in o] for o in outFin])
-        if oD.is_linked:
-            oD.sv_set([[i[3] for i in o] for o in outFin])
+            outFin.append(find_nearest(BV, points))
+        for i, socket in enumerate(self.outputs):
+            if socket.is_linked:
+                socket.sv_set([o[i].tolist() for o in outFin])
 
     def update_socket(self, context):
         self.update()
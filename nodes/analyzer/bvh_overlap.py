@@ -19,6 +19,7 @@
 import bpy
 from sverchok.node_tree import SverchCustomTreeNode
 from sverchok.data_structure import (updateNode)
+from sverchok.utils.sv_bvh_utils import overlap
 
 
 class SvBvhOverlapNode(bpy.types.Node, SverchCustomTreeNode):
@@ -36,11 +37,11 @@ class SvBvhOverlapNode(bpy.types.Node, SverchCustomTreeNode):
     def process(self):
         A,B = self.inputs
         outA, outB = self.outputs
-        ZAB = zip(A.sv_get(), B.sv_get())
+        pairs = [overlap(i, i2) for i, i2 in zip(A.sv_get(), B.sv_get())]
         if outA.is_linked:
-            outA.sv_set([[i[0] for i in i.overlap(i2)] for i, i2 in ZAB])
+            outA.sv_set([p[:, 0].tolist() for p in pairs])
         if outB.is_linked:
-            outB.sv_set([[i[1] for i in i.overlap(i2)] for i, i2 in ZAB])
+            outB.sv_set([p[:, 1].tolist() for p in pairs])
 
     def update_socket(self, context):
         self.update()
@@ -19,6 +19,7 @@
 import bpy
 from sverchok.node_tree import SverchCustomTreeNode
 from sverchok.data_structure import (updateNode, match_long_cycle as C)
+from sverchok.utils.sv_bvh_utils import ray_cast
 
 
 class SvBVHRaycastNode(bpy.types.Node, SverchCustomTreeNode):
@@ -38,20 +39,14 @@ class SvBVHRaycastNode(bpy.types.Node, SverchCustomTreeNode):
         so('StringsSocket', 'Distance')
 
     def process(self):
-        L,N,I,D = self.outputs
         bvhl, st, di = self.inputs
         RL = []
         st,di = C([st.sv_get()[0], di.sv_get()[0]])
         for bvh in bvhl.sv_get():
-            RL.append([bvh.ray_cast(i, i2) for i, i2 in zip(st,di)])
-        if L.is_linked:
-            L.sv_set([[r[0][:] if r[0] != None else (0,0,0) for r in L] for L in RL])
-        if N.is_linked:
-            N.sv_set([[r[1][:] if r[1] != None else (0,0,0) for r in L] for L in RL])
-        if I.is_linked:
-            I.sv_set([[r[2] if r[2] != None else -1 for r in L] for L in RL])
-        if D.is_linked:
-            D.sv_set([[r[3] if r[3] != None else 0 for r in L] for L in RL])
+            RL.append(ray_cast(bvh, st, di))
+        for i, socket in enumerate(self.outputs):
+            if socket.is_linked:
+                socket.sv_set([r[i].tolist() for r in RL])
 
     def update_socket(self, context):
         self.update()
@@ -18,10 +18,10 @@
 
 import bpy
 from bpy.props import EnumProperty, StringProperty
-import mathutils
-from mathutils import Vector
 
 from sverchok.node_tree import SverchCustomTreeNode
+from sverchok.data_structure import match_long_repeat
+from sverchok.utils.sv_kdtree_utils import socket_kdtrees
 
 
 # documentation/blender_python_api_2_70_release/mathutils.kdtree.html
@@ -130,129 +130,76 @@ class SvKDTreeNode(bpy.types.Node, SverchCustomTreeNode):
         if not inputs['Verts'].is_linked:
             return
 
+        # before continuing check at least that there is one output.
         try:
-            verts = inputs['Verts'].sv_get()[0]
-        except IndexError:
+            some_output = any([outputs[i].is_linked for i in range(3)])
+        except (IndexError, KeyError) as e:
+            return
+
+        verts = inputs['Verts'].sv_get(deepcopy=False)
+        cVerts = inputs['Check Verts'].sv_get(deepcopy=False, default=[])
+        if not (len(verts) and len(cVerts)):
             return
 
         '''
         - assumptions:
             : MainVerts are potentially different on each update
-            : not nested input ([vlist1],[vlist2],...)
-
-        with small vert lists I don't imagine this will be very noticeable,
-        '''
+            : nested input ([vlist1],[vlist2],...), every Check Verts object
+              is searched in the matching Verts object
 
-        # make kdtree
-        # documentation/blender_python_api_2_70_release/mathutils.kdtree.html
-        size = len(verts)
-        kd = mathutils.kdtree.KDTree(size)
-
-        for i, vtx in enumerate(verts):
-            kd.insert(Vector(vtx), i)
-        kd.balance()
-
-        '''
-        #
-        # commented out because this may not even be an issue anymore.
-        #
-        reset_outs = {
-            'FIND': ['proxima .co', 'proxima .idx', 'proxima dist'],
-            'FIND_N': ['n proxima .co', 'n proxima .idx', 'n proxima dist'],
-            'FIND_RANGE': ['grouped .co', 'grouped .idx', 'grouped dist']
-        }
-        #
-        # # set sockets to [] and return early, somehow this has been triggered
-        # # early.
-        # if not (inputs['Check Verts'].is_linked):
-        #     try:
-        #         for socket in reset_outs[self.mode]:
-        #             outputs[socket].sv_set([])
-        #     except KeyError:
-        #         pass
-        #     return
+        the kdtrees are cached until the Verts payload changes
+        and every object is queried with all its check verts at once.
         '''
+        trees = socket_kdtrees(inputs['Verts'], verts)
 
-        # before continuing check at least that there is one output.
-        try:
-            some_output = any([outputs[i].is_linked for i in range(3)])
-        except (IndexError, KeyError) as e:
-            return
-
-        cVerts = inputs['Check Verts'].sv_get()[0]
-        if not cVerts:
-            return
-
-        # consumables and aliases
-        out_co_list = []
-        out_idx_list = []
-        out_dist_list = []
-        add_verts_coords = out_co_list.append
-        add_verts_idxs = out_idx_list.append
-        add_verts_dists = out_dist_list.append
-
-        if self.mode == 'FIND':
-            ''' [Verts.co,..] =>
-                [Verts.idx,.] =>
-                [Verts.dist,.] =>
-            => [Main Verts]
-            => [cVert,..]
-            '''
-            for i, vtx in enumerate(cVerts):
-                co, index, dist = kd.find(vtx)
-                add_verts_coords(co.to_tuple())
-                add_verts_idxs(index)
-                add_verts_dists(dist)
-
-        elif self.mode == 'FIND_N':
-            ''' [[Verts.co,..n],..c] => from MainVerts closest to v.co
-                [[Verts.idx,..n],.c] => from MainVerts closest to v.co
-                [[Verts.dist,.n],.c] => from MainVerts closest to v.co
-            => [Main Verts]
-            => [cVert,..]
-            => [n, max n nearest
-            '''
+        if self.mode == 'FIND_N':
             n = inputs['n nearest'].sv_get()[0][0]
             if (not n) or (n < 1):
                 return
-
-            for i, vtx in enumerate(cVerts):
-                co_list = []
-                idx_list = []
-                dist_list = []
-                n_list = kd.find_n(vtx, n)
-                for co, index, dist in n_list:
-                    co_list.append(co.to_tuple())
-                    idx_list.append(index)
-                    dist_list.append(dist)
-                add_verts_coords(co_list)
-                add_verts_idxs(idx_list)
-                add_verts_dists(dist_list)
-
         elif self.mode == 'FIND_RANGE':
-            ''' [grouped [.co for p in MainVerts in r of v in cVert]] =>
-                [grouped [.idx for p in MainVerts in r of v in cVert]] =>
-                [grouped [.dist for p in MainVerts in r of v in cVert]] =>
-            => [Main Verts]
-            => [cVert,..]
-            => n
-            '''
             r = inputs['radius'].sv_get()[0][0]
             if (not r) or r < 0:
                 return
 
-            for i, vtx in enumerate(cVerts):
-                co_list = []
-                idx_list = []
-                dist_list = []
-                n_list = kd.find_range(vtx, r)
-                for co, index, dist in n_list:
-                    co_list.append(co.to_tuple())
-                    idx_list.append(index)
-                    dist_list.append(dist)
-                add_verts_coords(co_list)
-                add_verts_idxs(idx_list)
-                add_verts_dists(dist_list)
+        # consumables, the results of all objects are joined
+        out_co_list = []
+        out_idx_list = []
+        out_dist_list = []
+
+        for kd, check in zip(*match_long_repeat([trees, list(cVerts)])):
+
+            if self.mode == 'FIND':
+                ''' [Verts.co,..] =>
+                    [Verts.idx,.] =>
+                    [Verts.dist,.] =>
+                => [Main Verts]
+                => [cVert,..]
+                '''
+                co, index, dist = kd.find(check)
+
+            elif self.mode == 'FIND_N':
+                ''' [[Verts.co,..n],..c] => from MainVerts closest to v.co
+                    [[Verts.idx,..n],.c] => from MainVerts closest to v.co
+                    [[Verts.dist,.n],.c] => from MainVerts closest to v.co
+                => [Main Verts]
+                => [cVert,..]
+                => [n, max n nearest
+                '''
+                co, index, dist = kd.find_n(check, n)
+
+            elif self.mode == 'FIND_RANGE':
+                ''' [grouped [.co for p in MainVerts in r of v in cVert]] =>
+                    [grouped [.idx for p in MainVerts in r of v in cVert]] =>
+                    [grouped [.dist for p in MainVerts in r of v in cVert]] =>
+                => [Main Verts]
+                => [cVert,..]
+                => n
+                '''
+                co, index, dist = kd.find_range(check, r)
+
+            out_co_list.extend(co)
+            out_idx_list.extend(index)
+            out_dist_list.extend(dist)
 
         outputs[0].sv_set(out_co_list)
         if outputs[1].is_linked:
@@ -18,11 +18,11 @@
 
 import bpy
 from bpy.props import IntProperty, FloatProperty
-import mathutils
-from mathutils import Vector
+import numpy as np
 
 from sverchok.node_tree import SverchCustomTreeNode
 from sverchok.data_structure import updateNode, SvSetSocketAnyType, SvGetSocketAnyType
+from sverchok.utils.sv_kdtree_utils import socket_kdtrees
 
 
 # documentation/blender_python_api_2_70_release/mathutils.kdtree.html
@@ -61,8 +61,11 @@ class SvKDTreeEdgesNode(bpy.types.Node, SverchCustomTreeNode):
         inputs = self.inputs
         outputs = self.outputs
 
+        if not inputs['Verts'].is_linked:
+            return
+
         try:
-            verts = inputs['Verts'].sv_get()[0]
+            verts = inputs['Verts'].sv_get(deepcopy=False)
             linked = outputs['Edges'].is_linked
         except (IndexError, KeyError) as e:
             return
@@ -81,44 +84,32 @@ class SvKDTreeEdgesNode(bpy.types.Node, SverchCustomTreeNode):
                 sock_input = s_default_value
             socket_inputs.append(sock_input)
 
-        self.run_kdtree(verts, socket_inputs)
+        trees = socket_kdtrees(inputs['Verts'], verts)
+        edges = [self.run_kdtree(kd, socket_inputs) for kd in trees]
+        self.outputs['Edges'].sv_set(edges)
 
-    def run_kdtree(self, verts, socket_inputs):
+    def run_kdtree(self, kd, socket_inputs):
         mindist, maxdist, maxNum, skip = socket_inputs
 
-        # make kdtree
-        # documentation/blender_python_api_2_70_release/mathutils.kdtree.html
-        size = len(verts)
-        kd = mathutils.kdtree.KDTree(size)
-
-        for i, vtx in enumerate(verts):
-            kd.insert(Vector(vtx), i)
-        kd.balance()
-
         # set minimum values
         maxNum = max(maxNum, 1)
         skip = max(skip, 0)
 
-        # makes edges
-        e = set()
-        mcount = 0
-        for i, vtx in enumerate(verts):
-            num_edges = 0
-            for (co, index, dist) in kd.find_range(vtx, maxdist):
-                if (dist <= mindist) or (i == index):
-                    continue
-                if (num_edges > maxNum):
-                    break
-                if num_edges <= skip:
-                    num_edges += 1
-                    continue
-
-                e.add(tuple(sorted([i, index])))
-                mcount += 1
-                num_edges += 1
-
-        # print(len(e), 'vs', mcount)
-        self.outputs['Edges'].sv_set([list(e)])
+        # all neighbours within maxdist of every vertex, nearest first
+        groups, index, dist = kd.range_arrays(kd.verts, maxdist)
+        keep = (dist > mindist) & (index != groups)
+        groups, index = groups[keep], index[keep]
+        if not len(groups):
+            return []
+
+        # the rank of a neighbour is its position in the list of its vertex,
+        # the first skip + 1 and those past maxNum are left out
+        starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+        rank = np.arange(len(groups)) - np.repeat(starts, np.diff(np.r_[starts, len(groups)]))
+        keep = (rank > skip) & (rank <= maxNum)
+
+        e = np.sort(np.column_stack((groups[keep], index[keep])), axis=1)
+        return np.unique(e, axis=0).tolist() if len(e) else []
 
 
 def register():
@@ -18,10 +18,12 @@
 
 import bpy
 import mathutils
+import numpy as np
 from mathutils import Vector
 from bpy.props import BoolProperty
 from sverchok.node_tree import SverchCustomTreeNode
 from sverchok.data_structure import (updateNode, match_long_repeat)
+from sverchok.utils.sv_bvh_utils import object_bvh, ray_cast_segments
 
 
 class SvRayCastNode(bpy.types.Node, SverchCustomTreeNode):
@@ -52,25 +54,29 @@ class SvRayCastNode(bpy.types.Node, SverchCustomTreeNode):
         P,N,I = self.outputs
         outfin,OutLoc,obj,sm1,sm2 = [],[],o.sv_get(),self.mode,self.mode2
         st, en = match_long_repeat([s.sv_get()[0], e.sv_get()[0]])
+        scene = bpy.context.scene
         for OB in obj:
+            # local space rays against the tree shared with the scene snapshot
+            bvh = object_bvh(OB, scene)
             if sm1:
                 obm = OB.matrix_local.inverted()
-                outfin.append([OB.ray_cast(obm*Vector(i), obm*Vector(i2)) for i,i2 in zip(st,en)])
+                outfin.append(ray_cast_segments(bvh, [obm*Vector(i) for i in st],
+                                                [obm*Vector(i2) for i2 in en]))
             else:
-                outfin.append([OB.ray_cast(i,i2) for i,i2 in zip(st,en)])
+                outfin.append(ray_cast_segments(bvh, st, en))
         if sm2:
             if P.is_linked:
                 for i,i2 in zip(obj,outfin):
-                    omw = i.matrix_world
-                    OutLoc.append([(omw*i[0])[:] for i in i2])
+                    omw = np.array(i.matrix_world)
+                    OutLoc.append((i2[0].dot(omw[:3, :3].T) + omw[:3, 3]).tolist())
                 P.sv_set(OutLoc)
         else:
             if P.is_linked:
-                P.sv_set([[i[0][:] for i in i2] for i2 in outfin])
+                P.sv_set([i2[0].tolist() for i2 in outfin])
         if N.is_linked:
-            N.sv_set([[i[1][:] for i in i2] for i2 in outfin])
+            N.sv_set([i2[1].tolist() for i2 in outfin])
         if I.is_linked:
-            I.sv_set([[i[2] for i in i2] for i2 in outfin])
+            I.sv_set([i2[2].tolist() for i2 in outfin])
 
     def update_socket(self, context):
         self.update()
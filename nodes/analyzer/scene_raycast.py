@@ -17,8 +17,10 @@
 # ##### END GPL LICENSE BLOCK #####
 
 import bpy
+import numpy as np
 from sverchok.node_tree import SverchCustomTreeNode
 from sverchok.data_structure import (updateNode, match_long_repeat)
+from sverchok.utils.sv_bvh_utils import scene_snapshot
 
 
 class SvRayCastNode(bpy.types.Node, SverchCustomTreeNode):
@@ -39,22 +41,24 @@ class SvRayCastNode(bpy.types.Node, SverchCustomTreeNode):
 
     def process(self):
         P,N,S,O,M = self.outputs
-        rc = []
         st = self.inputs['start'].sv_get()[0]
         en = self.inputs['end'].sv_get()[0]
         st, en = match_long_repeat([st, en])
-        for i,i2 in zip(st,en):
-            rc.append(bpy.context.scene.ray_cast(i, i2))
+        # all rays against the trees of the scene snapshot of this frame
+        snapshot = scene_snapshot(bpy.context.scene)
+        success, obj_index, location, normal, face_index = snapshot.ray_cast(st, en)
         if P.is_linked:
-            P.sv_set([[i[3][:] for i in rc]])
+            P.sv_set([location.tolist()])
         if N.is_linked:
-            N.sv_set([[i[4][:] for i in rc]])
+            N.sv_set([normal.tolist()])
         if S.is_linked:
-            S.sv_set([[i[0] for i in rc]])
+            S.sv_set([success.tolist()])
         if O.is_linked:
-            O.sv_set([i[1] for i in rc])
+            O.sv_set([snapshot.objects[i] if i >= 0 else None for i in obj_index.tolist()])
         if M.is_linked:
-            M.sv_set([[v[:] for v in i[2]] for i in rc])
+            matrices = [m.tolist() for m in snapshot.matrices]
+            identity = np.identity(4).tolist()
+            M.sv_set([matrices[i] if i >= 0 else identity for i in obj_index.tolist()])
 
     def update_socket(self, context):
         self.update()
@@ -22,6 +22,7 @@ from bpy.props import EnumProperty
 from mathutils.bvhtree import BVHTree
 from sverchok.node_tree import SverchCustomTreeNode
 from sverchok.data_structure import (updateNode, enum_item as e)
+from sverchok.utils.sv_bvh_utils import bvh_from_object, bvh_from_polygons
 
 
 class SvBVHtreeNode(bpy.types.Node, SverchCustomTreeNode):
@@ -59,13 +60,13 @@ class SvBVHtreeNode(bpy.types.Node, SverchCustomTreeNode):
         bvh = []
         if self.Mod == "FromObject":
             for i in self.inputs[0].sv_get():
-                bvh.append(BVHTree.FromObject(i, bpy.context.scene, deform=True, render=False, cage=False, epsilon=0.0))
+                bvh.append(bvh_from_object(i, bpy.context.scene))
         elif self.Mod == "FromBMesh":
             for i in self.inputs[0].sv_get():
                 bvh.append(BVHTree.FromBMesh(i))
         else:
             for i,i2 in zip(self.inputs[1].sv_get(),self.inputs[2].sv_get()):
-                bvh.append(BVHTree.FromPolygons(i, i2, all_triangles=False, epsilon=0.0))
+                bvh.append(bvh_from_polygons(i, i2))
         self.outputs[0].sv_set(bvh)
 
     def update_socket(self, context):
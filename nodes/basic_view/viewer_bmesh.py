@@ -25,9 +25,9 @@ from mathutils import Matrix, Vector
 from sverchok.node_tree import (
     SverchCustomTreeNode, VerticesSocket, MatrixSocket, StringsSocket)
 from sverchok.data_structure import dataCorrect, fullList, updateNode, SvGetSocketAnyType
-from sverchok.utils.sv_bmesh_utils import bmesh_from_pydata
 from sverchok.utils.sv_viewer_utils import (
     matrix_sanitizer,
+    mesh_from_pydata_bulk,
     natural_plus_one,
     get_random_init
 )
@@ -77,10 +77,7 @@ def make_bmesh_geometry(node, context, name, verts, *topology):
         mesh.update()
     else:
 
-        ''' get bmesh, write bmesh to obj, free bmesh'''
-        bm = bmesh_from_pydata(verts, edges, faces)
-        bm.to_mesh(sv_object.data)
-        bm.free()
+        mesh_from_pydata_bulk(sv_object.data, verts, edges, faces)
         sv_object.hide_select = False
 
     if matrix:
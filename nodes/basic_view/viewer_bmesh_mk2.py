@@ -26,9 +26,9 @@ from mathutils import Matrix, Vector
 
 from sverchok.node_tree import SverchCustomTreeNode
 from sverchok.data_structure import dataCorrect, fullList, updateNode
-from sverchok.utils.sv_bmesh_utils import bmesh_from_pydata
 from sverchok.utils.sv_viewer_utils import (
     matrix_sanitizer,
+    mesh_from_pydata_bulk,
     natural_plus_one,
     get_random_init
 )
@@ -80,10 +80,7 @@ def make_bmesh_geometry(node, idx, context, verts, *topology):
         mesh.update()
     else:
 
-        ''' get bmesh, write bmesh to obj, free bmesh'''
-        bm = bmesh_from_pydata(verts, edges, faces)
-        bm.to_mesh(sv_object.data)
-        bm.free()
+        mesh_from_pydata_bulk(sv_object.data, verts, edges, faces)
 
         sv_object.hide_select = False
 
@@ -139,10 +136,7 @@ def make_bmesh_geometry_merged(node, idx, context, yielder_object):
 
         vert_count += len(verts)
 
-    ''' get bmesh, write bmesh to obj, free bmesh'''
-    bm = bmesh_from_pydata(big_verts, big_edges, big_faces)
-    bm.to_mesh(sv_object.data)
-    bm.free()
+    mesh_from_pydata_bulk(sv_object.data, big_verts, big_edges, big_faces)
 
     sv_object.hide_select = False
     sv_object.matrix_local = Matrix.Identity(4)
@@ -19,7 +19,7 @@
 import bpy
 from bpy.props import (
     BoolProperty, StringProperty, IntProperty,
-    FloatProperty, FloatVectorProperty)
+    FloatProperty, FloatVectorProperty, EnumProperty)
 
 from mathutils import Matrix
 
@@ -237,6 +237,29 @@ class ViewerNode2(bpy.types.Node, SverchCustomTreeNode):
         default=False,
         description='Allows mesh.transform(matrix) operation, quite fast!')
 
+    # level of detail
+    lod = BoolProperty(
+        name='LOD', description='Draw a reduced preview when more primitives are visible than the budget',
+        default=False,
+        update=updateNode)
+
+    lod_budget = IntProperty(
+        name='Budget', description='Number of points, lines and faces drawn at full resolution',
+        min=1000, default=200000,
+        update=updateNode)
+
+    lod_mode = EnumProperty(
+        name='Reduce', description='Preview of objects above the budget',
+        items=[('SAMPLE', 'Sample', 'Draw every n-th vertex, edge and face', 0),
+               ('BOX', 'Box', 'Draw bounding boxes', 1)],
+        default='SAMPLE',
+        update=updateNode)
+
+    culling = BoolProperty(
+        name='Culling', description='Skip objects outside the view, with LOD',
+        default=True,
+        update=updateNode)
+
     def sv_init(self, context):
         self.inputs.new('VerticesSocket', 'vertices', 'vertices')
         self.inputs.new('StringsSocket', 'edg_pol', 'edg_pol')
@@ -297,6 +320,14 @@ class ViewerNode2(bpy.types.Node, SverchCustomTreeNode):
 
         col.separator()
 
+        col.prop(self, 'lod', toggle=True)
+        if self.lod:
+            col.prop(self, 'lod_budget')
+            col.prop(self, 'lod_mode', text='')
+            col.prop(self, 'culling')
+
+        col.separator()
+
         col.label('Light Direction')
 
         col.prop(self, "use_scene_light")
@@ -396,7 +427,11 @@ class ViewerNode2(bpy.types.Node, SverchCustomTreeNode):
             'edge_width': self.edge_width,
             'forced_tessellation': self.ngon_tessellate,
             'timings': self.callback_timings,
-            'light_direction': ld
+            'light_direction': ld,
+            'lod': self.lod,
+            'lod_budget': self.lod_budget,
+            'lod_mode': self.lod_mode,
+            'culling': self.culling
         }
         return options.copy()
 
@@ -17,11 +17,11 @@
 # ##### END GPL LICENSE BLOCK #####
 
 import bpy
-from bpy.props import BoolProperty, IntProperty, StringProperty
+from bpy.props import BoolProperty, IntProperty, StringProperty, EnumProperty
 
 from sverchok.node_tree import SverchCustomTreeNode
 from sverchok.data_structure import (updateNode, changable_sockets,
-                                     dataCorrect, svQsort)
+                                     dataCorrect, match_long_repeat, sv_argsort, sv_permute)
 
 class ListSortNodeMK2(bpy.types.Node, SverchCustomTreeNode):
     ''' List Sort MK2 '''
@@ -37,13 +37,29 @@ class ListSortNodeMK2(bpy.types.Node, SverchCustomTreeNode):
     newsock = BoolProperty(name='newsock',
                            default=False)
 
+    modes = [
+        ("VALUE", "Value", "Sort by values or keys, tuples are compared item by item", 1),
+        ("COMPONENT", "Component", "Sort by one component of vectors or of tuple keys", 2)
+    ]
+
+    mode = EnumProperty(name='mode', items=modes,
+                        default='VALUE',
+                        update=updateNode)
+    component = IntProperty(name='component',
+                            default=0, min=0,
+                            update=updateNode)
+
     def draw_buttons(self, context, layout):
         layout.prop(self, "level", text="level")
+        layout.prop(self, "mode", expand=True)
+        if self.mode == 'COMPONENT':
+            layout.prop(self, "component", text="component")
 
     def sv_init(self, context):
         self.inputs.new('StringsSocket', "data", "data")
         self.inputs.new('StringsSocket', "keys", "keys")
         self.outputs.new('StringsSocket', "data", "data")
+        self.outputs.new('StringsSocket', "Permutation", "Permutation")
 
     def update(self):
         if 'data' in self.inputs and self.inputs['data'].links > 0:
@@ -51,25 +67,40 @@ class ListSortNodeMK2(bpy.types.Node, SverchCustomTreeNode):
             inputsocketname = 'data'
             outputsocketname = ['data']
             changable_sockets(self, inputsocketname, outputsocketname)
+            # a replaced socket is added last, keep data first
+            index = self.outputs.find('data')
+            if index > 0:
+                self.outputs.move(index, 0)
 
     def process(self):
-        if not self.outputs['data'].is_linked:
+        outputs = self.outputs
+        perm_linked = 'Permutation' in outputs and outputs['Permutation'].is_linked
+        if not (outputs['data'].is_linked or perm_linked):
             return
 
         data_ = self.inputs['data'].sv_get()
-        data = dataCorrect(data_, nominal_dept=self.level).copy()
-        out_ = []
+        data = dataCorrect(data_, nominal_dept=self.level)
+        component = self.component if self.mode == 'COMPONENT' else None
+
+        # permutation indices of every object, stable sort
         if not self.inputs['keys'].is_linked:
-            for obj in data:
-                out_.append(svQsort(obj))
+            perms = [sv_argsort(obj, component=component) for obj in data]
         else:
             keys_ = self.inputs['keys'].sv_get()
             keys = dataCorrect(keys_, nominal_dept=1)
-            for d,k in zip(data,keys):
-                d.sort(key = lambda x: k.pop(0))
-                out_.append(d)
-        out = dataCorrect(out_)
-        self.outputs['data'].sv_set(out)
+            # the last key list is repeated for the remaining objects
+            data, keys = match_long_repeat([data, keys])
+            perms = []
+            for d, k in zip(data, keys):
+                if len(k) < len(d):
+                    raise ValueError("List Sort: {} keys for {} items".format(len(k), len(d)))
+                perms.append(sv_argsort(d, keys=k[:len(d)], component=component))
+
+        if outputs['data'].is_linked:
+            out_ = [sv_permute(d, p) for d, p in zip(data, perms)]
+            outputs['data'].sv_set(dataCorrect(out_))
+        if perm_linked:
+            outputs['Permutation'].sv_set([p.tolist() for p in perms])
 
 
 
@@ -17,12 +17,10 @@
 # ##### END GPL LICENSE BLOCK #####
 
 import bpy
-from mathutils import Matrix, Vector
 
 from sverchok.node_tree import SverchCustomTreeNode, VerticesSocket, MatrixSocket
-from sverchok.data_structure import (Vector_generate, Vector_degenerate,
-                            Matrix_generate, updateNode,
-                            SvGetSocketAnyType, SvSetSocketAnyType)
+from sverchok.data_structure import updateNode, SvSetSocketAnyType
+from sverchok.utils.sv_mesh_utils import apply_matrices
 
 
 class MatrixApplyNode(bpy.types.Node, SverchCustomTreeNode):
@@ -30,6 +28,7 @@ class MatrixApplyNode(bpy.types.Node, SverchCustomTreeNode):
     bl_idname = 'MatrixApplyNode'
     bl_label = 'Apply matrix for vectors'
     bl_icon = 'OUTLINER_OB_EMPTY'
+    sv_thread_safe = True
 
     def sv_init(self, context):
         self.inputs.new('VerticesSocket', "Vectors", "Vectors")
@@ -39,30 +38,17 @@ class MatrixApplyNode(bpy.types.Node, SverchCustomTreeNode):
     def process(self):
         # inputs
         if self.outputs['Vectors'].is_linked:
-            vecs_ = SvGetSocketAnyType(self, self.inputs['Vectors'])
-            vecs = Vector_generate(vecs_)
-
-            mats_ = SvGetSocketAnyType(self, self.inputs['Matrixes'])
-            mats = Matrix_generate(mats_)
-
-            vectors_ = self.vecscorrect(vecs, mats)
-            vectors = Vector_degenerate(vectors_)
+            vecs = self.inputs['Vectors'].sv_get(deepcopy=False, as_array=True)
+            mats = self.inputs['Matrixes'].sv_get(deepcopy=False)
+            if not len(vecs):
+                SvSetSocketAnyType(self, 'Vectors', [])
+                return
+
+            # matrix i moves object i, the last object for the other matrices
+            index = [min(i, len(vecs) - 1) for i in range(len(mats))]
+            vectors = apply_matrices(mats, vecs, index)
             SvSetSocketAnyType(self, 'Vectors', vectors)
 
-    def vecscorrect(self, vecs, mats):
-        out = []
-        lengthve = len(vecs)-1
-        for i, m in enumerate(mats):
-            out_ = []
-            k = i
-            if k > lengthve:
-                k = lengthve
-            for v in vecs[k]:
-                out_.append(m*v)
-            out.append(out_)
-        return out
-
-
 
 def register():
     bpy.utils.register_class(MatrixApplyNode)
@@ -18,10 +18,11 @@
 
 import bpy
 from bpy.props import BoolProperty
-from mathutils import Matrix, Vector
+import numpy as np
+
 from sverchok.node_tree import SverchCustomTreeNode
-from sverchok.data_structure import (Matrix_generate, updateNode)
-from sverchok.utils.sv_mesh_utils import mesh_join
+from sverchok.data_structure import updateNode
+from sverchok.utils.sv_mesh_utils import mesh_join, apply_matrices, transform_batch, repeat_indices
 
 
 class SvMatrixApplyJoinNode(bpy.types.Node, SverchCustomTreeNode):
@@ -48,21 +49,32 @@ class SvMatrixApplyJoinNode(bpy.types.Node, SverchCustomTreeNode):
     def process(self):
         if not self.inputs['Matrices'].is_linked:
             return
-        vertices = self.inputs['Vertices'].sv_get()
-        matrices = self.inputs['Matrices'].sv_get()
-        matrices = Matrix_generate(matrices)
+        vertices = self.inputs['Vertices'].sv_get(deepcopy=False, as_array=True)
+        matrices = self.inputs['Matrices'].sv_get(deepcopy=False)
+        edges = self.inputs['Edges'].sv_get(default=[[]], deepcopy=False)
+        faces = self.inputs['Faces'].sv_get(default=[[]], deepcopy=False)
         n = len(matrices)
-        result_vertices = (vertices*n)[:n]
-        outV = []
-        for i, i2 in zip(matrices, result_vertices):
-            outV.append([(i*Vector(v))[:] for v in i2])
-        edges = self.inputs['Edges'].sv_get(default=[[]])
-        faces = self.inputs['Faces'].sv_get(default=[[]])
-        result_edges = (edges * n)[:n]
-        result_faces = (faces * n)[:n]
-        if self.do_join:
-            outV, result_edges, result_faces = mesh_join(outV, result_edges, result_faces)
-            outV, result_edges, result_faces = [outV], [result_edges], [result_faces]
+
+        if not len(vertices):
+            for socket in self.outputs:
+                socket.sv_set([])
+            return
+
+        if self.do_join and len(vertices) == len(edges) == len(faces) == 1:
+            # one mesh copied onto every matrix, joined without copying
+            outV = transform_batch(matrices, vertices[0])
+            offsets = len(vertices[0]) * np.arange(n)
+            outV = [outV.reshape(-1, 3)]
+            result_edges = [repeat_indices(edges[0], offsets, as_array=True)]
+            result_faces = [repeat_indices(faces[0], offsets, as_array=True)]
+        else:
+            # matrix i moves mesh i, the meshes repeat when there are more matrices
+            outV = apply_matrices(matrices, vertices, [i % len(vertices) for i in range(n)])
+            result_edges = (edges * n)[:n]
+            result_faces = (faces * n)[:n]
+            if self.do_join:
+                outV, result_edges, result_faces = mesh_join(outV, result_edges, result_faces)
+                outV, result_edges, result_faces = [outV], [result_edges], [result_faces]
         self.outputs['Edges'].sv_set(result_edges)
         self.outputs['Faces'].sv_set(result_faces)
         self.outputs['Vertices'].sv_set(outV)
@@ -16,138 +16,163 @@
 #
 # ##### END GPL LICENSE BLOCK #####
 
-import itertools
-from collections import defaultdict
-
 import bpy
-import bmesh
-from mathutils.geometry import intersect_line_line as LineIntersect
+import numpy as np
 
 from sverchok.node_tree import SverchCustomTreeNode
 from sverchok.utils import cad_module as cm
-from sverchok.utils.sv_bmesh_utils import bmesh_from_pydata
+from sverchok.utils.sv_mesh_utils import row_keys
 
 ''' helpers '''
 
-
-def order_points(edge, point_list):
-    ''' order these edges from distance to v1, then
-    sandwich the sorted list with v1, v2 '''
-    v1, v2 = edge
-    dist = lambda co: (v1-co).length
-    point_list = sorted(point_list, key=dist)
-    return [v1] + point_list + [v2]
-
-
-def remove_permutations_that_share_a_vertex(bm, permutations):
-    ''' Get useful Permutations '''
-
-    final_permutations = []
-    for edges in permutations:
-        raw_vert_indices = cm.vertex_indices_from_edges_tuple(bm, edges)
-        if cm.duplicates(raw_vert_indices):
-            continue
-
-        # reaches this point if they do not share.
-        final_permutations.append(edges)
-
-    return final_permutations
-
-
-def get_valid_permutations(bm, edge_indices):
-    raw_permutations = itertools.permutations(edge_indices, 2)
-    permutations = [r for r in raw_permutations if r[0] < r[1]]
-    return remove_permutations_that_share_a_vertex(bm, permutations)
-
-
-def can_skip(closest_points, vert_vectors):
-    '''this checks if the intersection lies on both edges, returns True
-    when criteria are not met, and thus this point can be skipped'''
-    if not closest_points:
-        return True
-    if not isinstance(closest_points[0].x, float):
-        return True
-    if cm.num_edges_point_lies_on(closest_points[0], vert_vectors) < 2:
-        return True
-
-    # if this distance is larger than than VTX_PRECISION, we can skip it.
-    cpa, cpb = closest_points
-    return (cpa-cpb).length > cm.CAD_prefs.VTX_PRECISION
-
-
-def get_intersection_dictionary(bm, edge_indices):
-
-    if hasattr(bm.verts, "ensure_lookup_table"):
-        bm.verts.ensure_lookup_table()
-        bm.edges.ensure_lookup_table()
-
-    permutations = get_valid_permutations(bm, edge_indices)
-
-    k = defaultdict(list)
-    d = defaultdict(list)
-
-    for edges in permutations:
-        raw_vert_indices = cm.vertex_indices_from_edges_tuple(bm, edges)
-        vert_vectors = cm.vectors_from_indices(bm, raw_vert_indices)
-
-        points = LineIntersect(*vert_vectors)
-
-        # some can be skipped.    (NaN, None, not on both edges)
-        if can_skip(points, vert_vectors):
-            continue
-
-        # reaches this point only when an intersection happens on both edges.
-        [k[edge].append(points[0]) for edge in edges]
-
-    # k will contain a dict of edge indices and points found on those edges.
-    for edge_idx, unordered_points in k.items():
-        tv1, tv2 = bm.edges[edge_idx].verts
-        v1 = bm.verts[tv1.index].co
-        v2 = bm.verts[tv2.index].co
-        ordered_points = order_points((v1, v2), unordered_points)
-        d[edge_idx].extend(ordered_points)
-
-    return d
-
-
-def update_mesh(bm, d):
-    ''' Make new geometry '''
-
-    oe = bm.edges
-    ov = bm.verts
-
-    vert_count = len(ov)
-    edge_count = len(oe)
-
-    for old_edge, point_list in d.items():
-        num_points = len(point_list)
-        num_edges_to_add = num_points-1
-
-        for i in range(num_edges_to_add):
-            ov.new(point_list[i])
-            ov.new(point_list[i+1])
-
-            if hasattr(bm.verts, "ensure_lookup_table"):
-                bm.verts.ensure_lookup_table()
-                bm.edges.ensure_lookup_table()  # not sure this even exists..
-
-            vseq = ov[vert_count], ov[vert_count+1]
-            oe.new(vseq)
-            bm.normal_update()
-            vert_count = len(ov)
-            edge_count = len(oe)
-
-    # offer a remove doubles pass here.
-    #
-
-
-def unselect_nonintersecting(bm, d_edges, edge_indices):
-    # print(d_edges, edge_indices)
-    if len(edge_indices) > len(d_edges):
-        reserved_edges = set(edge_indices) - set(d_edges)
-        for edge in reserved_edges:
-            bm.edges[edge].select = False
-        # print("unselected {}, non intersecting edges".format(reserved_edges))
+# lines closer to parallel than this, as the squared sine of their angle,
+# are not intersected
+PARALLEL_EPSILON = 1.1920928955078125e-07
+
+# grid cells are made larger until the boxes cover at most this many per edge
+GRID_ENTRIES_PER_EDGE = 8
+
+
+def grid_cells(low, high, cell):
+    ''' first and last grid cell of every box, and the number of cells it covers '''
+    first = np.floor(low / cell).astype(np.int64)
+    last = np.floor(high / cell).astype(np.int64)
+    return first, last, (last - first + 1).prod(axis=1)
+
+
+def candidate_pairs(starts, ends, margin):
+    '''
+    Pairs (i, j), i < j, of edges with overlapping bounding boxes. The boxes
+    are put in the cells of a uniform grid they cover, only boxes in the
+    same cell are compared. A pair is kept in the one cell that holds the
+    low corner of the overlap of both boxes, so it's found once.
+    '''
+    low = np.minimum(starts, ends) - margin
+    high = np.maximum(starts, ends) + margin
+    count = len(low)
+    if count < 2:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    origin = low.min(axis=0)
+    low, high = low - origin, high - origin
+
+    # cells of the size of a typical box along every axis, larger if long
+    # boxes cover too many
+    sizes = high - low
+    cell = np.median(sizes, axis=0)
+    cell[~(cell > 0)] = sizes.max() if sizes.max() > 0 else 1.0
+    first, last, covered = grid_cells(low, high, cell)
+    while covered.sum() > GRID_ENTRIES_PER_EDGE * count:
+        cell *= 2
+        first, last, covered = grid_cells(low, high, cell)
+
+    # one entry per box and cell it covers
+    box = np.repeat(np.arange(count), covered)
+    k = np.arange(len(box)) - np.repeat(np.cumsum(covered) - covered, covered)
+    span = (last - first + 1)[box]
+    cells = first[box]
+    cells[:, 0] += k // (span[:, 1] * span[:, 2])
+    cells[:, 1] += k // span[:, 2] % span[:, 1]
+    cells[:, 2] += k % span[:, 2]
+
+    dims = last.max(axis=0) + 1
+    if float(dims[0]) * float(dims[1]) * float(dims[2]) < 2 ** 62:
+        keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    else:
+        keys = row_keys(cells)
+    order = np.argsort(keys, kind='mergesort')
+    box, cells, keys = box[order], cells[order], keys[order]
+
+    # every entry against the entries after it in the same cell
+    cell_end = np.r_[np.flatnonzero(keys[1:] != keys[:-1]) + 1, len(keys)]
+    n = np.repeat(cell_end, np.diff(np.r_[0, cell_end])) - np.arange(len(keys)) - 1
+    a = np.repeat(np.arange(len(keys)), n)
+    b = a + 1 + np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+    i, j = box[a], box[b]
+
+    overlap = np.all((low[i] <= high[j]) & (low[j] <= high[i]), axis=1)
+    corner = np.floor(np.maximum(low[i], low[j]) / cell).astype(np.int64)
+    keep = overlap & np.all(corner == cells[a], axis=1)
+    i, j = i[keep], j[keep]
+    return np.minimum(i, j), np.maximum(i, j)
+
+
+def intersect_edges(verts, edges, precision):
+    '''
+    Intersections of all edges that don't share a vertex.
+    Returns edge index, point and position along the edge of every
+    intersection found, both edges of an intersection get the point.
+    '''
+    starts, ends = verts[edges[:, 0]], verts[edges[:, 1]]
+    i, j = candidate_pairs(starts, ends, precision)
+
+    shared = (edges[i, 0] == edges[j, 0]) | (edges[i, 0] == edges[j, 1]) | \
+             (edges[i, 1] == edges[j, 0]) | (edges[i, 1] == edges[j, 1])
+    i, j = i[~shared], j[~shared]
+
+    # closest points of the lines through both edges, pa on i, pb on j
+    d1 = ends[i] - starts[i]
+    d2 = ends[j] - starts[j]
+    r = starts[i] - starts[j]
+    a = np.einsum('ij,ij->i', d1, d1)
+    b = np.einsum('ij,ij->i', d1, d2)
+    e = np.einsum('ij,ij->i', d2, d2)
+    c = np.einsum('ij,ij->i', d1, r)
+    f = np.einsum('ij,ij->i', d2, r)
+    denom = a * e - b * b
+    # denom is |d1|^2 |d2|^2 sin^2 of the angle, compared relative to the lengths
+    valid = denom > PARALLEL_EPSILON * a * e
+    denom[~valid] = 1.0
+    s = (b * f - c * e) / denom
+    t = (a * f - b * c) / denom
+    pa = starts[i] + s[:, np.newaxis] * d1
+    pb = starts[j] + t[:, np.newaxis] * d2
+
+    # pa has to lie on both edges and pb close to it
+    e[e == 0] = 1.0
+    t_a = np.einsum('ij,ij->i', pa - starts[j], d2) / e
+    on_j = np.linalg.norm(starts[j] + t_a[:, np.newaxis] * d2 - pa, axis=1) < precision
+    valid &= (s >= 0) & (s <= 1) & (t_a >= 0) & (t_a <= 1) & on_j
+    valid &= np.linalg.norm(pa - pb, axis=1) <= precision
+
+    pa = pa[valid]
+    edge_index = np.concatenate((i[valid], j[valid]))
+    points = np.concatenate((pa, pa))
+    position = np.concatenate((s[valid], t_a[valid]))
+    return edge_index, points, position
+
+
+def split_edges(verts, edges, edge_index, points, position):
+    '''
+    New vertices and edges, every intersected edge becomes a chain of
+    edges through its points ordered from its first vertex, every edge
+    of the chain gets two new vertices. Edges without intersections are
+    added back with their own vertices.
+    '''
+    order = np.lexsort((position, edge_index))
+    edge_index, points = edge_index[order], points[order]
+    cut = np.unique(edge_index)
+
+    # chain of every cut edge: first vertex, points, second vertex
+    chain_edge = np.concatenate((cut, edge_index, cut))
+    chain_pos = np.concatenate((np.full(len(cut), -np.inf), position[order], np.full(len(cut), np.inf)))
+    chain_points = np.concatenate((verts[edges[cut, 0]], points, verts[edges[cut, 1]]))
+    chain_order = np.lexsort((chain_pos, chain_edge))
+    chain_edge, chain_points = chain_edge[chain_order], chain_points[chain_order]
+
+    # a segment from every chain point to the next one of the same edge
+    same = chain_edge[:-1] == chain_edge[1:]
+    seg_start, seg_end = chain_points[:-1][same], chain_points[1:][same]
+    new_verts = np.empty((2 * len(seg_start), 3))
+    new_verts[0::2] = seg_start
+    new_verts[1::2] = seg_end
+    offset = len(verts)
+    new_edges = offset + np.arange(len(new_verts)).reshape(-1, 2)
+
+    add_back = np.ones(len(edges), dtype=bool)
+    add_back[cut] = False
+    verts_out = np.concatenate((verts, new_verts)).tolist()
+    edges_out = np.concatenate((new_edges, edges[add_back])).tolist()
+    return verts_out, edges_out
 
 
 class SvIntersectEdgesNode(bpy.types.Node, SverchCustomTreeNode):
@@ -177,28 +202,11 @@ class SvIntersectEdgesNode(bpy.types.Node, SverchCustomTreeNode):
         except (IndexError, KeyError) as e:
             return
 
-        bm = bmesh_from_pydata(verts_in, edges_in, [])
-
-        edge_indices = [e.index for e in bm.edges]
-        trim_indices = len(edge_indices)
-        for edge in bm.edges:
-            edge.select = True
-
-        d = get_intersection_dictionary(bm, edge_indices)
-
-        unselect_nonintersecting(bm, d.keys(), edge_indices)
-
-        # store non_intersecting edge sequencer
-        add_back = [[i.index for i in edge.verts] for edge in bm.edges if not edge.select]
-
-        update_mesh(bm, d)
-
-        verts_out = [v.co.to_tuple() for v in bm.verts]
-        edges_out = [[j.index for j in i.verts] for i in bm.edges]
+        verts = np.array(verts_in, dtype=np.float64).reshape(-1, 3)
+        edges = np.array(edges_in, dtype=np.int64).reshape(-1, 2)
 
-        # optional correction, remove originals, add back those that are not intersecting.
-        edges_out = edges_out[trim_indices:]
-        edges_out.extend(add_back)
+        found = intersect_edges(verts, edges, cm.CAD_prefs.VTX_PRECISION)
+        verts_out, edges_out = split_edges(verts, edges, *found)
 
         outputs['Verts_out'].sv_set([verts_out])
         outputs['Edges_out'].sv_set([edges_out])
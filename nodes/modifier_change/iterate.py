@@ -16,86 +16,53 @@
 #
 # ##### END GPL LICENSE BLOCK #####
 
-from mathutils import Vector, Matrix
-from operator import iadd
-from functools import reduce
+import numpy as np
 
 import bpy
 from bpy.props import IntProperty
 
 from sverchok.node_tree import SverchCustomTreeNode
-from sverchok.data_structure import updateNode, match_long_repeat, Matrix_generate, Vector_generate, Vector_degenerate
-
-
-def concat(lists):
-    return reduce(iadd, lists)
-
-
-def Matrix_degenerate(ms):
-    return [[j[:] for j in M] for M in ms]
-
-
-def iterate_matrices(matrices, vertices, edges, faces, count, offset, r=0):
-    result_vertices = []
-    result_edges = []
-    result_faces = []
-
-    x = 0
-    for matrix in matrices:
-        new_vertices, new_edges, new_faces = iterate(matrices, matrix, vertices, edges, faces, count, offset+x, r)
-        x += len(new_vertices)
-        result_vertices.extend(new_vertices)
-        result_edges.extend(new_edges)
-        result_faces.extend(new_faces)
-
-    return result_vertices, result_edges, result_faces
-
-
-def iterate(matrices, matrix, vertices, edges, faces, count, offset, r=0):
-    result_vertices = []
-    result_edges = []
-    result_faces = []
-    if count == 0:
-        return result_vertices, result_edges, result_faces
-
-    new_vertices = [matrix*v for v in vertices]
-    new_edges = [(v1+offset+r, v2+offset+r) for v1, v2 in edges]
-    new_faces = [[v+offset+r for v in face] for face in faces]
-
-    result_vertices.extend(new_vertices)
-    result_edges.extend(new_edges)
-    result_faces.extend(new_faces)
-
-    n = len(new_vertices)
-    rest_vertices, rest_edges, rest_faces = iterate_matrices(matrices, new_vertices, edges, faces, count-1, offset, r+n)
-
-    result_vertices.extend(rest_vertices)
-    result_edges.extend(rest_edges)
-    result_faces.extend(rest_faces)
-
-    return result_vertices, result_edges, result_faces
-
-
-def shift_edges(edges, offset):
-    return [(v1+offset, v2+offset) for (v1, v2) in edges]
-
-
-def shift_faces(faces, offset):
-    return [[v+offset for v in face] for face in faces]
-
-
-def calc_matrix_powers(matrices, count):
-    if count == 0:
-        return []
-    if count == 1:
-        return matrices
-
-    result = []
-    result.extend(matrices)
-    for m in matrices:
-        result.extend([m*n for n in calc_matrix_powers(matrices, count-1)])
-
-    return result
+from sverchok.data_structure import updateNode, match_long_repeat
+from sverchok.utils.sv_mesh_utils import transform_chunks, repeat_indices
+
+
+def iterated_matrices(matrices, count):
+    '''
+    All products of 1 to count of the matrices, each computed once from the
+    product with one matrix less, level by level. Returns the products in
+    the order their copies of the mesh are output, the order of all
+    sequences of matrices applied one after another, depth first, and the
+    products in the order of the Matrices output.
+    '''
+    size = len(matrices)
+    if not count or not size:
+        return np.zeros((0, 4, 4)), np.zeros(0, dtype=np.int64)
+
+    # subtree[d], number of sequences starting with a given sequence
+    # when d more matrices may follow, itself included
+    subtree = np.cumsum(size ** np.arange(count))
+    levels = [matrices]
+    positions = [np.arange(size) * subtree[count - 1]]
+    for level in range(2, count + 1):
+        # sequence j of the previous level followed by matrix i is j * size + i
+        levels.append(np.matmul(matrices[np.newaxis], levels[-1][:, np.newaxis]).reshape(-1, 4, 4))
+        positions.append((positions[-1][:, np.newaxis] + 1 +
+                          np.arange(size) * subtree[count - level]).ravel())
+    products = np.concatenate(levels)
+    order = np.empty(len(products), dtype=np.int64)
+    order[np.concatenate(positions)] = np.arange(len(products))
+
+    # Matrices output: all single matrices, then for every matrix m the
+    # output for count - 1 multiplied by m from the left. The product
+    # m1 * m2 * .. mk is the sequence mk, .. m2, m1 applied one after another.
+    level_start = np.r_[0, np.cumsum(size ** np.arange(1, count + 1))]
+    depth = np.ones(size, dtype=np.int64)
+    index = np.arange(size)
+    for _ in range(count - 1):
+        depth = np.r_[np.ones(size, dtype=np.int64), np.tile(depth + 1, size)]
+        index = np.r_[np.arange(size), (np.arange(size)[:, np.newaxis] +
+                                        size * index[np.newaxis]).ravel()]
+    return products[order], products[level_start[depth - 1] + index]
 
 
 class SvIterateNode(bpy.types.Node, SverchCustomTreeNode):
@@ -125,11 +92,9 @@ class SvIterateNode(bpy.types.Node, SverchCustomTreeNode):
         if not self.inputs['Matrix'].is_linked:
             return
 
-        matrices = self.inputs['Matrix'].sv_get()
-        matrices = Matrix_generate(matrices)
+        matrices = np.array(self.inputs['Matrix'].sv_get(), dtype=np.float64).reshape(-1, 4, 4)
         counts = self.inputs['Iterations'].sv_get()[0]
         vertices_s = self.inputs['Vertices'].sv_get(default=[[]])
-        vertices_s = Vector_generate(vertices_s)
         edges_s = self.inputs['Edges'].sv_get(default=[[]])
         faces_s = self.inputs['Polygons'].sv_get(default=[[]])
 
@@ -154,34 +119,35 @@ class SvIterateNode(bpy.types.Node, SverchCustomTreeNode):
 
             meshes = match_long_repeat([vertices_s, edges_s, faces_s, counts])
 
+            # the products only depend on the number of iterations
+            products = {}
+            identity = np.identity(4)[np.newaxis]
             offset = 0
             for vertices, edges, faces, count in zip(*meshes):
-                result_vertices.extend(vertices)
-
-                result_edges.extend(shift_edges(edges, offset))
-                result_faces.extend(shift_faces(faces, offset))
-                #result_matrices.extend([Matrix()] * len(matrices))
-                result_matrices.append(Matrix())
-                offset += len(vertices)
-
-                new_vertices, new_edges, new_faces = iterate_matrices(matrices, vertices, edges, faces, count, offset)
-                offset += len(new_vertices)
-                new_matrices = calc_matrix_powers(matrices, count)
-
-                result_vertices.extend(new_vertices)
-                result_edges.extend(new_edges)
-                result_faces.extend(new_faces)
-                result_matrices.extend(new_matrices)
+                if count not in products:
+                    products[count] = iterated_matrices(matrices, count)
+                transforms, matrices_out = products[count]
+                # the mesh itself comes first, as the copy for the identity
+                transforms = np.concatenate((identity, transforms))
+
+                vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+                offsets = offset + len(vertices) * np.arange(len(transforms))
+                for chunk in transform_chunks(transforms, vertices):
+                    result_vertices.extend(chunk.reshape(-1, 3).tolist())
+                result_edges.extend(repeat_indices(edges, offsets))
+                result_faces.extend(repeat_indices(faces, offsets))
+                result_matrices.extend(identity.tolist())
+                result_matrices.extend(matrices_out.tolist())
+                offset += len(vertices) * len(transforms)
 
-            result_vertices = Vector_degenerate([result_vertices])
             if self.outputs['Vertices'].is_linked:
-                self.outputs['Vertices'].sv_set(result_vertices)
+                self.outputs['Vertices'].sv_set([result_vertices])
             if self.outputs['Edges'].is_linked:
                 self.outputs['Edges'].sv_set([result_edges])
             if self.outputs['Polygons'].is_linked:
                 self.outputs['Polygons'].sv_set([result_faces])
             if self.outputs['Matrices'].is_linked:
-                self.outputs['Matrices'].sv_set(Matrix_degenerate(result_matrices))
+                self.outputs['Matrices'].sv_set(result_matrices)
 
 
 def register():
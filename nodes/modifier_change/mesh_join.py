@@ -43,8 +43,8 @@ class SvMeshJoinNode(bpy.types.Node, SverchCustomTreeNode):
         if 'Vertices' in self.inputs and self.inputs['Vertices'].is_linked and \
            'PolyEdge' in self.inputs and self.inputs['PolyEdge'].is_linked:
 
-            verts = self.inputs['Vertices'].sv_get()
-            poly_edge = self.inputs['PolyEdge'].sv_get()
+            verts = self.inputs['Vertices'].sv_get(deepcopy=False, as_array=True)
+            poly_edge = self.inputs['PolyEdge'].sv_get(deepcopy=False)
 
             verts_out, dummy, poly_edge_out = mesh_join(verts, [], poly_edge)
 
@@ -17,18 +17,29 @@
 # ##### END GPL LICENSE BLOCK #####
 
 import bpy
-from bpy.props import FloatProperty
+from bpy.props import FloatProperty, EnumProperty
 import bmesh
 
 from sverchok.node_tree import SverchCustomTreeNode
 from sverchok.data_structure import (updateNode, Vector_generate, repeat_last,
                             SvSetSocketAnyType, SvGetSocketAnyType)
+from sverchok.utils import sv_mesh_utils
 
 #
 # Remove Doubles
 # by Linus Yng
 
 
+def remove_doubles_array(vertices, faces, d):
+    ''' same as remove_doubles with a spatial hash on arrays instead of bmesh '''
+    if not len(faces) or not len(vertices):
+        return False
+
+    if len(faces[0]) == 2:
+        return sv_mesh_utils.remove_doubles(vertices, edges=faces, dist=d)
+    return sv_mesh_utils.remove_doubles(vertices, faces=faces, dist=d)
+
+
 def remove_doubles(vertices, faces, d, find_doubles=False):
     if not faces or not vertices:
         return False
@@ -80,6 +91,16 @@ class SvRemoveDoublesNode(bpy.types.Node, SverchCustomTreeNode):
                              default=0.001, precision=3, min=0,
                              update=updateNode)
 
+    implementations = [
+        ('NUMPY', 'Fast', 'Spatial hash on arrays', '', 1),
+        ('BMESH', 'Bmesh', 'bmesh.ops.remove_doubles, slower but the exact bmesh result', '', 2)]
+
+    implementation = EnumProperty(
+        items=implementations,
+        default='NUMPY',
+        description='Remove doubles implementation',
+        update=updateNode)
+
     def sv_init(self, context):
         self.inputs.new('StringsSocket', 'Distance').prop_name = 'distance'
         self.inputs.new('VerticesSocket', 'Vertices', 'Vertices')
@@ -92,7 +113,7 @@ class SvRemoveDoublesNode(bpy.types.Node, SverchCustomTreeNode):
 
     def draw_buttons(self, context, layout):
         #layout.prop(self, 'distance', text="Distance")
-        pass
+        layout.prop(self, 'implementation', expand=True)
 
     def process(self):
         if not any([s.is_linked for s in self.outputs]):
@@ -101,14 +122,16 @@ class SvRemoveDoublesNode(bpy.types.Node, SverchCustomTreeNode):
         if 'Vertices' in self.inputs and self.inputs['Vertices'].is_linked and \
            'PolyEdge' in self.inputs and self.inputs['PolyEdge'].is_linked:
 
-            verts = Vector_generate(SvGetSocketAnyType(self, self.inputs['Vertices']))
-            polys = SvGetSocketAnyType(self, self.inputs['PolyEdge'])
+            if self.implementation == 'BMESH':
+                verts = Vector_generate(SvGetSocketAnyType(self, self.inputs['Vertices']))
+            else:
+                verts = self.inputs['Vertices'].sv_get(deepcopy=False, as_array=True)
+            polys = self.inputs['PolyEdge'].sv_get(deepcopy=False)
             if 'Distance' in self.inputs:
                 distance = self.inputs['Distance'].sv_get()[0]
             else:
                 distance = [self.distance]
-            if 'Doubles' in self.outputs:
-                has_double_out = bool('Doubles' in self.outputs)
+            has_double_out = 'Doubles' in self.outputs and self.outputs['Doubles'].is_linked
 
             verts_out = []
             edges_out = []
@@ -116,7 +139,10 @@ class SvRemoveDoublesNode(bpy.types.Node, SverchCustomTreeNode):
             d_out = []
 
             for v, p, d in zip(verts, polys, repeat_last(distance)):
-                res = remove_doubles(v, p, d, has_double_out)
+                if self.implementation == 'BMESH':
+                    res = remove_doubles(v, p, d, has_double_out)
+                else:
+                    res = remove_doubles_array(v, p, d)
                 if not res:
                     return
                 verts_out.append(res[0])
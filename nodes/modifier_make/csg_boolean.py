@@ -17,53 +17,29 @@
 # ##### END GPL LICENSE BLOCK #####
 
 import bpy
-import bmesh
-import sys
 
-from bpy.props import FloatProperty, EnumProperty
+from bpy.props import EnumProperty
 
 from sverchok.node_tree import SverchCustomTreeNode
-from sverchok.data_structure import updateNode
-from sverchok.utils.sv_bmesh_utils import bmesh_from_pydata
+from sverchok.data_structure import updateNode, match_long_repeat
 
 from sverchok.utils.csg_core import CSG
 
 def Boolean(VA, PA, VB, PB, operation):
-    if not all([VA, PA, VB, PB]):
-        return False, False
+    if not all([len(VA), PA, len(VB), PB]):
+        return [], []
 
     a = CSG.Obj_from_pydata(VA, PA)
     b = CSG.Obj_from_pydata(VB, PB)
 
-    faces = []
-    vertices = []
+    if operation == 'DIFF':
+        result = a.subtract(b)
+    elif operation == 'JOIN':
+        result = a.union(b)
+    elif operation == 'ITX':
+        result = a.intersect(b)
 
-    recursionlimit = sys.getrecursionlimit()
-    sys.setrecursionlimit(10000)
-    try:
-        if operation == 'DIFF':
-            polygons = a.subtract(b).toPolygons()
-        elif operation == 'JOIN':
-            polygons = a.union(b).toPolygons()
-        elif operation == 'ITX':
-            polygons = a.intersect(b).toPolygons()
-    except RuntimeError as e:
-        raise RuntimeError(e)
-
-    sys.setrecursionlimit(recursionlimit)
-
-    for polygon in polygons:
-        indices = []
-        for v in polygon.vertices:
-            pos = [v.pos.x, v.pos.y, v.pos.z]
-            if not pos in vertices:
-                vertices.append(pos)
-            index = vertices.index(pos)
-            indices.append(index)
-
-        faces.append(indices)
-
-    return [vertices], [faces]
+    return result.to_pydata()
 
 
 class SvCSGBooleanNode(bpy.types.Node, SverchCustomTreeNode):
@@ -105,12 +81,17 @@ class SvCSGBooleanNode(bpy.types.Node, SverchCustomTreeNode):
         if not self.outputs['Vertices'].is_linked:
             return
 
-        VA = self.inputs['Verts A'].sv_get()[0]
-        PA = self.inputs['Polys A'].sv_get()[0]
-        VB = self.inputs['Verts B'].sv_get()[0]
-        PB = self.inputs['Polys B'].sv_get()[0]
-
-        verts_out, polys_out = Boolean(VA, PA, VB, PB, self.selected_mode)
+        VA = self.inputs['Verts A'].sv_get(deepcopy=False, as_array=True)
+        PA = self.inputs['Polys A'].sv_get(deepcopy=False)
+        VB = self.inputs['Verts B'].sv_get(deepcopy=False, as_array=True)
+        PB = self.inputs['Polys B'].sv_get(deepcopy=False)
+
+        verts_out = []
+        polys_out = []
+        for va, pa, vb, pb in zip(*match_long_repeat([VA, PA, VB, PB])):
+            verts, polys = Boolean(va, pa, vb, pb, self.selected_mode)
+            verts_out.append(verts)
+            polys_out.append(polys)
 
         self.outputs['Vertices'].sv_set(verts_out)
         self.outputs['Polygons'].sv_set(polys_out)
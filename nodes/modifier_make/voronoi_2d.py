@@ -17,11 +17,14 @@
 # ##### END GPL LICENSE BLOCK #####
 
 import bpy
-from bpy.props import FloatProperty
+from bpy.props import FloatProperty, EnumProperty
+import numpy as np
 
 from sverchok.node_tree import SverchCustomTreeNode
-from sverchok.data_structure import updateNode, SvSetSocketAnyType, SvGetSocketAnyType
-from sverchok.utils.voronoi import Site, computeVoronoiDiagram, computeDelaunayTriangulation
+from sverchok.data_structure import updateNode, SvSetSocketAnyType
+from sverchok.utils.sv_mesh_utils import face_edges
+from sverchok.utils.sv_voronoi_utils import (as_xy, delaunay_triangles,
+                                             voronoi_edges, voronoi_cells)
 
 
 class Voronoi2DNode(bpy.types.Node, SverchCustomTreeNode):
@@ -34,84 +37,72 @@ class Voronoi2DNode(bpy.types.Node, SverchCustomTreeNode):
                          default=1.0, min=0,
                          options={'ANIMATABLE'}, update=updateNode)
 
+    modes = [
+        ('EDGES', 'Edges', 'Edges of the diagram, vertices clamped to the clipping box', '', 1),
+        ('CELLS', 'Cells', 'Polygons of the cells cut by the clipping box', '', 2)]
+
+    mode = EnumProperty(
+        items=modes,
+        default='EDGES',
+        description='Output of the diagram',
+        update=updateNode)
+
     def sv_init(self, context):
         self.inputs.new('VerticesSocket', "Vertices", "Vertices")
- #       self.inputs.new('StringsSocket', "Clipping", "Clipping")
         self.outputs.new('VerticesSocket', "Vertices", "Vertices")
         self.outputs.new('StringsSocket', "Edges", "Edges")
-#        self.outputs.new('StringsSocket', "Polygons", "Polygons")
-# Polygon output does not work right now. Should be fixed
+        self.outputs.new('StringsSocket', "Polygons", "Polygons")
 
     def draw_buttons(self, context, layout):
+        layout.prop(self, "mode", expand=True)
         layout.prop(self, "clip", text="Clipping")
 
     def process(self):
-        # inputs
-        if 'Edges' in self.outputs and self.outputs['Edges'].is_linked or \
-           'Vertices' in self.outputs and self.outputs['Vertices'].is_linked:
-
-            if 'Vertices' in self.inputs and self.inputs['Vertices'].is_linked:
-                points_in = SvGetSocketAnyType(self, self.inputs['Vertices'])
-
-            pts_out = []
-    #        polys_out = []
-            edges_out = []
-            for obj in points_in:
-                pt_list = []
-                x_max = obj[0][0]
-                x_min = obj[0][0]
-                y_min = obj[0][1]
-                y_max = obj[0][1]
-                # creates points in format for voronoi library, throwing away z
-                for pt in obj:
-                    x, y = pt[0], pt[1]
-                    x_max = max(x, x_max)
-                    x_min = min(x, x_min)
-                    y_max = max(y, y_max)
-                    y_min = min(x, x_min)
-                    pt_list.append(Site(pt[0], pt[1]))
-
-                res = computeVoronoiDiagram(pt_list)
-
-                edges = res[2]
-                delta = self.clip
-                x_max = x_max + delta
-                y_max = y_max + delta
-
-                x_min = x_min - delta
-                y_min = y_min - delta
-
-                # clipping box to bounding box.
-                pts_tmp = []
-                for pt in res[0]:
-                    x, y = pt[0], pt[1]
-                    if x < x_min:
-                        x = x_min
-                    if x > x_max:
-                        x = x_max
-
-                    if y < y_min:
-                        y = y_min
-                    if y > y_max:
-                        y = y_max
-                    pts_tmp.append((x, y, 0))
-
-                pts_out.append(pts_tmp)
-
-                edges_out.append([(edge[1], edge[2]) for edge in edges if -1 not in edge])
-
-            # outputs
-            if 'Vertices' in self.outputs and self.outputs['Vertices'].links:
-                SvSetSocketAnyType(self, 'Vertices', pts_out)
-
-            if 'Edges' in self.outputs and self.outputs['Edges'].links:
-                SvSetSocketAnyType(self, 'Edges', edges_out)
+        if not any(s.is_linked for s in self.outputs):
+            return
+        if not self.inputs['Vertices'].is_linked:
+            return
+        points_in = self.inputs['Vertices'].sv_get(deepcopy=False, as_array=True)
+
+        pts_out = []
+        edges_out = []
+        polys_out = []
+        for obj in points_in:
+            xy = as_xy(obj)
+            if not len(xy):
+                continue
+            # bounding box of the points grown by the clipping distance
+            lower = xy.min(axis=0) - self.clip
+            upper = xy.max(axis=0) + self.clip
+
+            if self.mode == 'CELLS':
+                verts, polys = voronoi_cells(xy, (lower, upper))
+                edges = face_edges(polys)
+            else:
+                verts, edges = voronoi_edges(xy)
+                if verts:
+                    verts = np.array(verts)
+                    verts[:, :2] = np.clip(verts[:, :2], lower, upper)
+                    verts = verts.tolist()
+                polys = []
+
+            pts_out.append(verts)
+            edges_out.append(edges)
+            polys_out.append(polys)
+
+        if self.outputs['Vertices'].is_linked:
+            SvSetSocketAnyType(self, 'Vertices', pts_out)
+
+        if self.outputs['Edges'].is_linked:
+            SvSetSocketAnyType(self, 'Edges', edges_out)
+
+        if 'Polygons' in self.outputs and self.outputs['Polygons'].is_linked:
+            SvSetSocketAnyType(self, 'Polygons', polys_out)
 
     def update_socket(self, context):
         self.update()
 
 
-# computeDelaunayTriangulation
 class DelaunayTriangulation2DNode(bpy.types.Node, SverchCustomTreeNode):
     ''' DelaunayTriangulation '''
     bl_idname = 'DelaunayTriangulation2DNode'
@@ -120,25 +111,16 @@ class DelaunayTriangulation2DNode(bpy.types.Node, SverchCustomTreeNode):
 
     def sv_init(self, context):
         self.inputs.new('VerticesSocket', "Vertices", "Vertices")
- #       self.outputs.new('StringsSocket', "Edges", "Edges")
         self.outputs.new('StringsSocket', "Polygons", "Polygons")
 
     def process(self):
-        points_in = []
         if not ('Polygons' in self.outputs and self.outputs['Polygons'].is_linked):
             return
-        if 'Vertices' in self.inputs and self.inputs['Vertices'].is_linked:
-            points_in = SvGetSocketAnyType(self, self.inputs['Vertices'])
-        tris_out = []
-
-        for obj in points_in:
-
-            pt_list = [Site(pt[0], pt[1]) for pt in obj]
-            res = computeDelaunayTriangulation(pt_list)
-            tris_out.append([tri for tri in res if -1 not in tri])
-
-        if 'Polygons' in self.outputs and self.outputs['Polygons'].is_linked:
-            SvSetSocketAnyType(self, 'Polygons', tris_out)
+        if not self.inputs['Vertices'].is_linked:
+            return
+        points_in = self.inputs['Vertices'].sv_get(deepcopy=False, as_array=True)
+        tris_out = [delaunay_triangles(obj).tolist() for obj in points_in]
+        SvSetSocketAnyType(self, 'Polygons', tris_out)
 
 
 def register():
@@ -70,6 +70,7 @@ class VectorMathNode(bpy.types.Node, SverchCustomTreeNode):
     bl_idname = 'VectorMathNode'
     bl_label = 'Vector Math'
     bl_icon = 'OUTLINER_OB_EMPTY'
+    sv_thread_safe = True
 
     # vector math functions
     mode_items = [
@@ -24,8 +24,8 @@ from bpy.props import EnumProperty
 from mathutils import noise
 
 from sverchok.node_tree import SverchCustomTreeNode
-from sverchok.data_structure import (updateNode, Vector_generate, Vector_degenerate,
-                            SvSetSocketAnyType, SvGetSocketAnyType)
+from sverchok.data_structure import updateNode
+from sverchok.utils.sv_noise_utils import noise_array, mathutils_noise
 
 # noise nodes
 # from http://www.blender.org/documentation/blender_python_api_2_70_release/mathutils.noise.html
@@ -43,6 +43,7 @@ class SvNoiseNode(bpy.types.Node, SverchCustomTreeNode):
     bl_idname = 'SvNoiseNode'
     bl_label = 'Vector Noise'
     bl_icon = 'OUTLINER_OB_EMPTY'
+    sv_thread_safe = True
 
     def changeMode(self, context):
         if self.out_mode == 'SCALAR':
@@ -71,8 +72,17 @@ class SvNoiseNode(bpy.types.Node, SverchCustomTreeNode):
         description="Noise type",
         update=updateNode)
 
+    implementations = [
+        ('MATHUTILS', 'Exact', 'mathutils.noise values, slow on large inputs', '', 1),
+        ('NUMPY', 'Fast', 'numpy approximation of the noise type, same range but different values', '', 2)]
+
+    implementation = EnumProperty(
+        items=implementations,
+        default='MATHUTILS',
+        description='Noise implementation',
+        update=updateNode)
+
     noise_dict = {}
-    noise_f = {'SCALAR': noise.noise, 'VECTOR': noise.noise_vector}
 
     def sv_init(self, context):
         self.inputs.new('VerticesSocket', 'Vertices', 'Vertices')
@@ -81,6 +91,7 @@ class SvNoiseNode(bpy.types.Node, SverchCustomTreeNode):
     def draw_buttons(self, context, layout):
         layout.prop(self, 'out_mode', expand=True)
         layout.prop(self, 'noise_type', text="Type")
+        layout.prop(self, 'implementation', expand=True)
 
     def process(self):
 
@@ -92,17 +103,18 @@ class SvNoiseNode(bpy.types.Node, SverchCustomTreeNode):
         if not self.outputs[0].is_linked:
             return
 
-        
-        verts = Vector_generate(self.inputs['Vertices'].sv_get())
-        out = []
-        n_t = self.noise_dict[self.noise_type]
-        n_f = self.noise_f[self.out_mode]
+        # every object is evaluated at once, results are arrays
+        verts = self.inputs['Vertices'].sv_get(deepcopy=False, as_array=True)
+        vector = self.out_mode == 'VECTOR'
 
-        for obj in verts:
-            out.append([n_f(v, n_t) for v in obj])
+        if self.implementation == 'NUMPY':
+            out = [noise_array(obj, self.noise_type, vector) for obj in verts]
+        else:
+            n_t = self.noise_dict[self.noise_type]
+            out = [mathutils_noise(obj, n_t, vector) for obj in verts]
 
         if 'Noise V' in self.outputs:
-            self.outputs['Noise V'].sv_set(Vector_degenerate(out))
+            self.outputs['Noise V'].sv_set(out)
         else:
             self.outputs['Noise S'].sv_set(out)
 
@@ -20,6 +20,7 @@ import bpy
 
 from sverchok.node_tree import SverchCustomTreeNode
 from sverchok.data_structure import levelsOflist, SvSetSocketAnyType, SvGetSocketAnyType
+from sverchok.utils.sv_mesh_utils import first_occurrences
 
 
 class VertsDelDoublesNode(bpy.types.Node, SverchCustomTreeNode):
@@ -54,9 +55,13 @@ class VertsDelDoublesNode(bpy.types.Node, SverchCustomTreeNode):
             for x in vers:
                 out.append(self.remdou(x, levs))
         else:
-            for x in vers:
-                if x not in out:
-                    out.append(x)
+            try:
+                out = [vers[i] for i in first_occurrences(vers).tolist()]
+            except (ValueError, TypeError):
+                # not equal length rows of numbers
+                for x in vers:
+                    if x not in out:
+                        out.append(x)
         return out
 
 
@@ -1,10 +1,11 @@
 import bpy
 from bpy.types import AddonPreferences
-from bpy.props import BoolProperty, FloatVectorProperty, EnumProperty
+from bpy.props import BoolProperty, FloatVectorProperty, EnumProperty, IntProperty
 
 from sverchok import data_structure
 from sverchok.core import handlers
 from sverchok.core import update_system
+from sverchok.core import profiling
 from sverchok.utils import sv_panels_tools
 from sverchok.ui import color_def
 
@@ -18,6 +19,24 @@ class SverchokPreferences(AddonPreferences):
     def update_heat_map(self, context):
         data_structure.heat_map_state(self.heat_map)
 
+    def update_debug_mutations(self, context):
+        data_structure.DEBUG_MUTATIONS = self.debug_mutations
+        data_structure.shared_reads = []
+
+    def update_profile(self, context):
+        data_structure.PROFILE_MODE = self.profile_nodes
+        if not self.profile_nodes:
+            profiling.reset()
+
+    def update_memory_budget(self, context):
+        data_structure.MEMORY_BUDGET = self.memory_budget * 2**20
+
+    def update_parallel(self, context):
+        data_structure.PARALLEL_UPDATE = self.parallel_update
+
+    def update_skip_unchanged(self, context):
+        data_structure.SKIP_UNCHANGED = self.skip_unchanged
+
     def set_frame_change(self, context):
         handlers.set_frame_change(self.frame_change_mode)
     
@@ -33,6 +52,18 @@ class SverchokPreferences(AddonPreferences):
         default=False, subtype='NONE',
         update=update_debug_mode)
 
+    debug_mutations = BoolProperty(
+        name="Detect shared data changes",
+        description="Warn when a node modifies input data it didn't copy, slow",
+        default=False, subtype='NONE',
+        update=update_debug_mutations)
+
+    skip_unchanged = BoolProperty(
+        name="Skip unchanged nodes",
+        description="Don't reprocess nodes whose input data didn't change in partial updates",
+        default=True, subtype='NONE',
+        update=update_skip_unchanged)
+
     no_data_color = FloatVectorProperty(
         name="No data", description='When a node can not get data',
         size=3, min=0.0, max=1.0,
@@ -46,6 +77,24 @@ class SverchokPreferences(AddonPreferences):
         update=update_system.update_error_colors)
 
 
+    parallel_update = BoolProperty(
+        name="Parallel update",
+        description="Process independent thread safe nodes in parallel, experimental",
+        default=False, subtype='NONE',
+        update=update_parallel)
+
+    profile_nodes = BoolProperty(
+        name="Profile nodes",
+        description="Keep timing statistics per node, see core/profiling.py",
+        default=False, subtype='NONE',
+        update=update_profile)
+
+    memory_budget = IntProperty(
+        name="Memory budget (MB)",
+        description="Evict socket data no node is waiting for when the cache of a layout is larger, 0 for no limit",
+        default=0, min=0,
+        update=update_memory_budget)
+
     #  heat map settings
     heat_map = BoolProperty(
         name="Heat map",
@@ -145,6 +194,9 @@ class SverchokPreferences(AddonPreferences):
         row1 = col.row()
         row1.prop(self, "frame_change_mode", expand=True)
         col.prop(self, "show_icons")
+        col.prop(self, "skip_unchanged")
+        col.prop(self, "parallel_update")
+        col.prop(self, "memory_budget")
         col.prop(self, "over_sized_buttons")
         col.separator()
         
@@ -177,6 +229,8 @@ class SverchokPreferences(AddonPreferences):
         col = row.column(align=True)
         col.label(text="Debug:")
         col.prop(self, "show_debug")
+        col.prop(self, "debug_mutations")
+        col.prop(self, "profile_nodes")
 
         col.label("Error colors")
         row1 = col.row()
@@ -23,13 +23,20 @@ import traceback
 
 import bpy
 import mathutils
+import numpy as np
 from mathutils import Vector, Matrix
-from mathutils.geometry import normal
 from mathutils.geometry import tessellate_polygon as tessellate
 
-from sverchok.data_structure import Vector_generate, Matrix_generate
+from sverchok.data_structure import Vector_generate
+from sverchok.utils.sv_viewer_utils import index_buffer
 
 callback_dict = {}
+# node id -> (first, count) of compiled display lists, rebuilt on node update
+display_lists = {}
+# node id -> bounding boxes and primitive counts of objects, for lod
+lod_cache = {}
+# display lists of disabled callbacks, freed on the next draw
+stale_display_lists = []
 SpaceView3D = bpy.types.SpaceView3D
 
 from bgl import (
@@ -41,7 +48,7 @@ from bgl import (
     #
     GL_MATRIX_MODE, GL_MODELVIEW_MATRIX, GL_MODELVIEW, GL_PROJECTION,
     glMatrixMode, glLoadMatrixf, glPushMatrix, glPopMatrix, glLoadIdentity,
-    glGenLists, glNewList, glEndList, glCallList, glFlush, GL_COMPILE,
+    glGenLists, glNewList, glEndList, glCallList, glDeleteLists, glFlush, GL_COMPILE,
     #
     GL_POINTS, GL_POINT_SIZE, GL_POINT_SMOOTH, GL_POINT_SMOOTH_HINT,
     GL_LINE, GL_LINES, GL_LINE_STRIP, GL_LINE_LOOP, GL_LINE_STIPPLE,
@@ -159,59 +166,124 @@ def callback_disable(n_id):
 
     SpaceView3D.draw_handler_remove(handle_view, 'WINDOW')
     del callback_dict[n_id]
+    if n_id in display_lists:
+        stale_display_lists.append(display_lists.pop(n_id))
+    lod_cache.pop(n_id, None)
     tag_redraw_all_view3d()
 
 
-def get_color_from_normal(dvk, pol, num_verts, vectorlight, colo):
-    if num_verts <= 4:
-        normal_no = normal(dvk[pol[0]], dvk[pol[1]], dvk[pol[2]])
-    else:
-        normal_no = normal(dvk[pol[0]], dvk[pol[1]], dvk[pol[2]], dvk[pol[3]])
-
-    normal_no = (normal_no.angle(vectorlight, 0)) / pi
-
-    r = (normal_no * colo[0]) - 0.1
-    g = (normal_no * colo[1]) - 0.1
-    b = (normal_no * colo[2]) - 0.1
-    return (r+0.2, g+0.2, b+0.2)
-
-
-def display_face(options, pol, data_vector, data_matrix, k, i):
-
-    colo = options['face_colors']
-    shade = options['shading']
-    forced_tessellation = options['forced_tessellation']
-
-    num_verts = len(pol)
-    dvk = data_vector[k]
-
-    if shade:
-        vectorlight = options['light_direction']
-        face_color = get_color_from_normal(dvk, pol, num_verts, vectorlight, colo)
+def get_colors_from_normals(verts, flat, loop_start, loop_total, vectorlight, colo):
+    '''
+    Face colors of all faces at once, the angle between face normal
+    and light direction scales the face color
+    '''
+    starts = np.repeat(loop_start, loop_total)
+    totals = np.repeat(loop_total, loop_total)
+    following = starts + (np.arange(len(flat)) - starts + 1) % totals
+
+    # newell normal, sum of the cross products of the edges
+    v0 = verts[flat]
+    v1 = verts[flat[following]]
+    normals = np.add.reduceat(np.cross(v0, v1), loop_start, axis=0)
+
+    light = np.array(vectorlight[:3], dtype=np.float64)
+    lengths = np.linalg.norm(normals, axis=1) * np.linalg.norm(light)
+    lengths[lengths == 0] = 1.0
+    cos = np.clip(normals.dot(light) / lengths, -1.0, 1.0)
+    factor = np.arccos(cos) / pi
+    return factor[:, np.newaxis] * np.array(colo[:3]) + 0.1
+
+
+def bake_polygons(verts, polygons, options):
+    '''
+    Faces of one object grouped for drawing, indices are into verts.
+    triangles and quads go into one GL_TRIANGLES and one GL_QUADS
+    block, ngons are tessellated or drawn as single GL_POLYGONs.
+    '''
+    num_verts = len(verts)
+    polygons = [pol for pol in polygons if len(pol) > 2 and max(pol) < num_verts]
+    baked = {'tris': None, 'quads': None, 'ngons': [], 'edges': None}
+    if not polygons:
+        return baked
+
+    flat, loop_start, loop_total = index_buffer(polygons)
+
+    if options['show_faces']:
+        colo = options['face_colors']
+        if options['shading']:
+            colors = get_colors_from_normals(
+                verts, flat, loop_start, loop_total, options['light_direction'], colo)
+        else:
+            colors = np.tile(np.array(colo[:3], dtype=np.float64), (len(polygons), 1))
+
+        tris = loop_total == 3
+        quads = loop_total == 4
+        ngons = ~(tris | quads)
+        corners = np.arange(4)
+        if tris.any():
+            idx = flat[loop_start[tris][:, np.newaxis] + corners[:3]]
+            baked['tris'] = (idx, colors[tris].tolist())
+        if quads.any():
+            idx = flat[loop_start[quads][:, np.newaxis] + corners]
+            baked['quads'] = (idx, colors[quads].tolist())
+
+        tri_idx, tri_colors = [], []
+        for f in np.flatnonzero(ngons).tolist():
+            pol = polygons[f]
+            color = colors[f].tolist()
+            if options['forced_tessellation']:
+                v = [Vector(verts[i]) for i in pol]
+                for tri in tessellate([v]):
+                    tri_idx.append([pol[t] for t in tri])
+                    tri_colors.append(color)
+            else:
+                baked['ngons'].append((list(pol), color))
+        if tri_idx:
+            if baked['tris']:
+                idx, tri_colors_ = baked['tris']
+                baked['tris'] = (np.vstack((idx, tri_idx)), tri_colors_ + tri_colors)
+            else:
+                baked['tris'] = (np.array(tri_idx), tri_colors)
+
+    if options['show_edges']:
+        # raw edges of all faces, sorted by index and without dupes
+        starts = np.repeat(loop_start, loop_total)
+        following = starts + (np.arange(len(flat)) - starts + 1) % np.repeat(loop_total, loop_total)
+        edges = np.sort(np.column_stack((flat, flat[following])), axis=1)
+        baked['edges'] = np.unique(edges, axis=0)
+
+    return baked
+
+
+def bake_edges(verts, edges):
+    edges = np.array(edges, dtype=np.int64).reshape(-1, 2)
+    return edges[edges.max(axis=1) < len(verts)] if len(edges) else edges
+
+
+def draw_batch(mode, corners, colors=None):
+    glBegin(mode)
+    if colors is None:
+        for co in corners:
+            glVertex3f(*co)
     else:
-        face_color = colo[:]
-
-    glColor3f(*face_color)
-
-    if (num_verts in {3, 4}) or (not forced_tessellation):
-        glBegin(GL_POLYGON)
-        for point in pol:
-            vec = data_matrix[i] * dvk[point]
-            glVertex3f(*vec)
-        glEnd()
+        for color, face in zip(colors, corners):
+            glColor3f(*color)
+            for co in face:
+                glVertex3f(*co)
+    glEnd()
 
-    else:
-        ''' ngons, we tessellate '''
-        glBegin(GL_TRIANGLES)
-        v = [dvk[i] for i in pol]
-        for pol in tessellate([v]):
-            for point in pol:
-                vec = data_matrix[i] * v[point]
-                glVertex3f(*vec)
-        glEnd()
 
+def draw_geometry(n_id, options, data_vector, data_polygons, data_matrix, data_edges,
+                  objects=None, step=1, baked=None):
+    '''
+    data_vector is a list of N x 3 arrays and data_matrix a list of
+    4 x 4 arrays, every vertex is transformed once with numpy and the
+    results are sent as plain lists, so this is fast enough to be
+    compiled into a display list on every update of the node.
 
-def draw_geometry(n_id, options, data_vector, data_polygons, data_matrix, data_edges):
+    objects are the indices of the matrices to draw, default all,
+    step > 1 draws only every step-th vertex, edge and face.
+    '''
 
     show_verts = options['show_verts']
     show_edges = options['show_edges']
@@ -222,19 +294,15 @@ def draw_geometry(n_id, options, data_vector, data_polygons, data_matrix, data_e
     edge_width = options['edge_width']
 
     tran = options['transparent']
-    shade = options['shading']
 
     verlen = options['verlen']
-    max_verts_ = [len(d) for d in data_vector]
 
     if tran:
         polyholy = GL_POLYGON_STIPPLE
         edgeholy = GL_LINE_STIPPLE
-        edgeline = GL_LINE_STRIP
     else:
         polyholy = GL_POLYGON
         edgeholy = GL_LINE
-        edgeline = GL_LINES
 
     def get_max_k(i, verlen):
         k = i
@@ -242,6 +310,18 @@ def draw_geometry(n_id, options, data_vector, data_polygons, data_matrix, data_e
             k = verlen
         return k
 
+    def transformed(matrix, verts):
+        return verts.dot(matrix[:3, :3].T) + matrix[:3, 3]
+
+    if objects is None:
+        objects = range(len(data_matrix))
+
+    # per object geometry is baked once, matrices usually share objects
+    if baked is None:
+        baked = {}
+    baked_polygons = baked.setdefault('polygons', {})
+    baked_edges = baked.setdefault('edges', {})
+
     ''' vertices '''
 
     glEnable(GL_POINT_SIZE)
@@ -257,11 +337,10 @@ def draw_geometry(n_id, options, data_vector, data_polygons, data_matrix, data_e
         glColor3f(*vertex_colors)
         glBegin(GL_POINTS)
 
-        for i, matrix in enumerate(data_matrix):
+        for i in objects:
             k = get_max_k(i, verlen)
-            for vert in data_vector[k]:
-                vec = data_matrix[i] * vert
-                glVertex3f(*vec)
+            for co in transformed(data_matrix[i], data_vector[k][::step]).tolist():
+                glVertex3f(*co)
 
         glEnd()
 
@@ -274,40 +353,33 @@ def draw_geometry(n_id, options, data_vector, data_polygons, data_matrix, data_e
         num_datapolygon_lists = len(data_polygons)
 
         glEnable(polyholy)
-        for i, matrix in enumerate(data_matrix):
+        for i in objects:
 
             k = get_max_k(i, verlen)
-            mesh_edges = set()
             if k >= num_datapolygon_lists:
                 k = (num_datapolygon_lists-1)
-                #break
-
-            for j, pol in enumerate(data_polygons[k]):
 
-                if max(pol) >= max_verts_[k]:
-                    continue
-
-                if show_faces:
-                    display_face(options, pol, data_vector, data_matrix, k, i)
-
-                # collect raw edges, sort by index, use set to prevent dupes.
-                if show_edges:
-                    er = list(pol) + [pol[0]]
-                    kb = {tuple(sorted((e, er[i+1]))) for i, e in enumerate(er[:-1])}
-                    mesh_edges.update(kb)
-
-            if show_edges and mesh_edges:
+            if k not in baked_polygons:
+                baked_polygons[k] = bake_polygons(data_vector[k], data_polygons[k], options)
+            baked = baked_polygons[k]
+            world = transformed(data_matrix[i], data_vector[k])
+
+            if show_faces:
+                if baked['tris']:
+                    idx, colors = baked['tris']
+                    draw_batch(GL_TRIANGLES, world[idx[::step]].tolist(), colors[::step])
+                if baked['quads']:
+                    idx, colors = baked['quads']
+                    draw_batch(GL_QUADS, world[idx[::step]].tolist(), colors[::step])
+                for pol, color in baked['ngons'][::step]:
+                    draw_batch(GL_POLYGON, [world[pol].tolist()], [color])
+
+            if show_edges and baked['edges'] is not None and len(baked['edges']):
                 # glHint(GL_LINE_SMOOTH_HINT, GL_NICEST)
                 glEnable(edgeholy)
                 glLineWidth(edge_width)
                 glColor3f(*edge_colors)
-                glBegin(GL_LINES)
-                for edge in mesh_edges:
-                    for p in edge:
-                        vec = data_matrix[i] * data_vector[k][p]
-                        glVertex3f(*vec)
-
-                glEnd()
+                draw_batch(GL_LINES, world[baked['edges'][::step].ravel()].tolist())
                 glDisable(edgeholy)
 
         glDisable(polyholy)
@@ -320,24 +392,20 @@ def draw_geometry(n_id, options, data_vector, data_polygons, data_matrix, data_e
         glLineWidth(edge_width)
         glEnable(edgeholy)
 
-        for i, matrix in enumerate(data_matrix):
+        for i in objects:
             k = get_max_k(i, verlen)
 
             if k >= len(data_edges):
                 continue
 
-            for line in data_edges[k]:
-
-                # i think this catches edges which refer to indices not present in
-                # the accompanying vertex list.
-                if max(line) >= max_verts_[k]:
-                    continue
-
-                glBegin(edgeline)
-                for p in line:
-                    vec = data_matrix[i] * data_vector[k][p]
-                    glVertex3f(*vec)
-                glEnd()
+            # drops edges which refer to indices not present in
+            # the accompanying vertex list.
+            if k not in baked_edges:
+                baked_edges[k] = bake_edges(data_vector[k], data_edges[k])
+            edges = baked_edges[k][::step]
+            if len(edges):
+                world = transformed(data_matrix[i], data_vector[k])
+                draw_batch(GL_LINES, world[edges.ravel()].tolist())
 
         glDisable(edgeholy)
 
@@ -346,22 +414,141 @@ def draw_geometry(n_id, options, data_vector, data_polygons, data_matrix, data_e
     if data_matrix and not data_vector:
         md = MatrixDraw()
         for mat in data_matrix:
-            md.draw_matrix(mat)
+            md.draw_matrix(Matrix(mat.tolist()))
+
+
+def object_bounds(data_vector, data_matrix, verlen):
+    '''
+    World space corners of the bounding box of every object as a
+    N x 8 x 4 array of homogeneous coordinates
+    '''
+    local = {}
+    boxes = np.ones((len(data_matrix), 8, 4))
+    # corner c takes the max of axis x, y, z if bit 4, 2, 1 of c is set
+    bits = np.array([[c & 4, c & 2, c & 1] for c in range(8)], dtype=bool)
+    for i, matrix in enumerate(data_matrix):
+        k = min(i, verlen)
+        if k not in local:
+            verts = data_vector[k]
+            if len(verts):
+                local[k] = np.where(bits, verts.max(axis=0), verts.min(axis=0))
+            else:
+                local[k] = np.zeros((8, 3))
+        boxes[i, :, :3] = local[k].dot(matrix[:3, :3].T) + matrix[:3, 3]
+    return boxes
+
+
+def object_primitives(options, data_vector, data_polygons, data_edges, count, verlen):
+    ''' number of points, lines and faces drawn for every object '''
+    primitives = np.zeros(count, dtype=np.int64)
+    for i in range(count):
+        k = min(i, verlen)
+        if options['show_verts']:
+            primitives[i] += len(data_vector[k])
+        if data_polygons:
+            pols = len(data_polygons[min(k, len(data_polygons) - 1)])
+            # every face adds about as many edges as faces
+            primitives[i] += pols * (options['show_faces'] + 2 * options['show_edges'])
+        if data_edges and options['show_edges'] and k < len(data_edges):
+            primitives[i] += len(data_edges[k])
+    return primitives
+
+
+def draw_box(corners, color):
+    glLineWidth(1.0)
+    glColor3f(*color)
+    glBegin(GL_LINES)
+    for a in range(8):
+        for b in (1, 2, 4):
+            if not a & b:
+                glVertex3f(*corners[a][:3])
+                glVertex3f(*corners[a | b][:3])
+    glEnd()
+
+
+def compile_lod_lists(n_id, options, data_vector, data_polygons, data_matrix, data_edges):
+    '''
+    Every object gets a full and a reduced display list, the reduced
+    one is a sample of every step-th primitive, or the bounding box
+    when lod_mode is BOX. Which objects and which of the two lists are
+    drawn is decided per frame in draw_lod.
+    '''
+    count = len(data_matrix)
+    verlen = options['verlen']
+    boxes = object_bounds(data_vector, data_matrix, verlen)
+    primitives = object_primitives(options, data_vector, data_polygons, data_edges, count, verlen)
+    step = max(1, int(math.ceil(primitives.sum() / max(1, options['lod_budget']))))
 
+    first = glGenLists(2 * count)
+    display_lists[n_id] = (first, 2 * count)
+    lod_cache[n_id] = {'boxes': boxes, 'primitives': primitives}
 
-def draw_callback_view(n_id, cached_view, options):
+    baked = {}
+    for i in range(count):
+        glNewList(first + i, GL_COMPILE)
+        try:
+            draw_geometry(n_id, options, data_vector, data_polygons, data_matrix, data_edges,
+                          objects=[i], baked=baked)
+        finally:
+            glEndList()
+
+        glNewList(first + count + i, GL_COMPILE)
+        try:
+            if options['lod_mode'] == 'BOX':
+                draw_box(boxes[i].tolist(), options['edge_colors'])
+            else:
+                draw_geometry(n_id, options, data_vector, data_polygons, data_matrix, data_edges,
+                              objects=[i], step=step, baked=baked)
+        finally:
+            glEndList()
+
+
+def visible_objects(boxes):
+    '''
+    Mask of objects with a bounding box that is not entirely outside
+    one of the planes of the view frustum
+    '''
+    region_data = bpy.context.region_data
+    if region_data is None:
+        return np.ones(len(boxes), dtype=bool)
+    perspective = np.array(region_data.perspective_matrix)
+    clip = boxes.dot(perspective.T)
+    w = clip[:, :, 3:]
+    xyz = clip[:, :, :3]
+    outside = (xyz > w).all(axis=1) | (xyz < -w).all(axis=1)
+    return ~outside.any(axis=1)
+
+
+def draw_lod(n_id, options):
+    first, total = display_lists[n_id]
+    count = total // 2
+    cache = lod_cache[n_id]
+    if options['culling']:
+        visible = np.flatnonzero(visible_objects(cache['boxes']))
+    else:
+        visible = np.arange(count)
 
-    def Vector_generate2(prop):
-        # try:
-        #     return [[Vector(v[:3]) for v in obj] for obj in prop]
-        # except ValueEror:
-        #     return []
-        return [[Vector(v) for v in obj] for obj in prop]
+    # full resolution as long as the visible part fits in the budget
+    if cache['primitives'][visible].sum() > options['lod_budget']:
+        first += count
+    for i in visible.tolist():
+        glCallList(first + i)
+
+
+def release_display_lists():
+    ''' free display lists of disabled callbacks, needs the gl context of a draw callback '''
+    while stale_display_lists:
+        glDeleteLists(*stale_display_lists.pop())
+
+
+def draw_callback_view(n_id, cached_view, options):
 
     # context = bpy.context
     if options["timings"]:
         start = time.perf_counter()
 
+    release_display_lists()
+
     if options['draw_list'] == 0:
 
         sl1 = cached_view[n_id + 'v']
@@ -369,7 +556,7 @@ def draw_callback_view(n_id, cached_view, options):
         sl3 = cached_view[n_id + 'm']
 
         if sl1:
-            data_vector = Vector_generate2(sl1)
+            data_vector = [np.array(obj, dtype=np.float64).reshape(-1, 3) for obj in sl1]
             verlen = len(data_vector)-1
         else:
             if not sl3:
@@ -397,31 +584,40 @@ def draw_callback_view(n_id, cached_view, options):
                 data_polygons = sl2
 
         if sl3:
-            data_matrix = Matrix_generate(sl3)
+            data_matrix = [np.array(m, dtype=np.float64) for m in sl3]
         else:
-            data_matrix = [Matrix() for i in range(verlen+1)]
+            data_matrix = [np.identity(4) for i in range(verlen+1)]
 
-        if (data_vector, data_polygons, data_matrix, data_edges) == (0, 0, 0, 0):
-            callback_disable(n_id)
-            return
+        if n_id in display_lists:
+            glDeleteLists(*display_lists.pop(n_id))
+        lod_cache.pop(n_id, None)
+
+        # lod needs vertices for the bounding boxes
+        options['use_lod'] = options.get('lod', False) and bool(data_vector)
         try:
-            the_display_list = glGenLists(1)
-            glNewList(the_display_list, GL_COMPILE)
-            draw_geometry(n_id, options, data_vector, data_polygons, data_matrix, data_edges)
+            if options['use_lod']:
+                compile_lod_lists(n_id, options, data_vector, data_polygons, data_matrix, data_edges)
+            else:
+                the_display_list = glGenLists(1)
+                display_lists[n_id] = (the_display_list, 1)
+                glNewList(the_display_list, GL_COMPILE)
+                try:
+                    draw_geometry(n_id, options, data_vector, data_polygons, data_matrix, data_edges)
+                finally:
+                    glEndList()
         except Exception as err:
             print("Error in callback!:")
             traceback.print_exc()
             options['error'] = True
-        finally:
-            glEndList()
 
-        options['genlist'] = the_display_list
+    elif n_id not in display_lists:
+        return
 
-    elif options['draw_list'] == 1:
-        the_display_list = options['genlist']
-    
     if not 'error' in options:
-        glCallList(the_display_list)
+        if options['use_lod']:
+            draw_lod(n_id, options)
+        else:
+            glCallList(display_lists[n_id][0])
         glFlush()
 
     # restore to system state
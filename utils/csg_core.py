@@ -1,4 +1,7 @@
-import math
+import itertools
+
+import numpy as np
+
 from sverchok.utils.csg_geom import *
 
 
@@ -9,7 +12,7 @@ class CSG(object):
     Python port Copyright (c) 2012 Tim Knip (http://www.floorplanner.com), under the MIT license.
     """
     def __init__(self):
-        self.polygons = []
+        self.polygons = CSGPolygons.empty()
 
     @classmethod
     def fromPolygons(cls, polygons):
@@ -18,16 +21,15 @@ class CSG(object):
         return csg
 
     def clone(self):
-        csg = CSG()
-        csg.polygons = map(lambda p: p.clone(), self.polygons)
-        return csg
+        # polygons are not changed in place, sharing them is enough
+        return CSG.fromPolygons(self.polygons)
 
     def toPolygons(self):
         return self.polygons
 
     def union(self, csg):
-        a = CSGNode(self.clone().polygons)
-        b = CSGNode(csg.clone().polygons)
+        a = CSGNode(self.polygons)
+        b = CSGNode(csg.polygons)
         a.clipTo(b)
         b.clipTo(a)
         b.invert()
@@ -37,8 +39,8 @@ class CSG(object):
         return CSG.fromPolygons(a.allPolygons())
 
     def subtract(self, csg):
-        a = CSGNode(self.clone().polygons)
-        b = CSGNode(csg.clone().polygons)
+        a = CSGNode(self.polygons)
+        b = CSGNode(csg.polygons)
         a.invert()
         a.clipTo(b)
         b.clipTo(a)
@@ -50,8 +52,8 @@ class CSG(object):
         return CSG.fromPolygons(a.allPolygons())
 
     def intersect(self, csg):
-        a = CSGNode(self.clone().polygons)
-        b = CSGNode(csg.clone().polygons)
+        a = CSGNode(self.polygons)
+        b = CSGNode(csg.polygons)
         a.invert()
         b.clipTo(a)
         b.invert()
@@ -66,21 +68,38 @@ class CSG(object):
         Return a new CSG solid with solid and empty space switched. This solid is
         not modified.
         """
-        csg = self.clone()
-        map(lambda p: p.flip(), csg.polygons)
-        return csg
+        return CSG.fromPolygons(self.polygons.flipped())
 
     @classmethod
     def Obj_from_pydata(cls, verts, faces):
         """
-
+        Solid from vertices and faces, faces with less than 3 corners
+        or without area are left out.
         """
-        polygons = []
-        for face in faces:
-            polyg = []
-            for idx in face:
-                co = verts[idx]
-                polyg.append(CSGVertex(co))
-            polygons.append(CSGPolygon(polyg))
+        verts = np.asarray(verts, dtype=np.float64).reshape(-1, 3)
+        faces = [f for f in faces if len(f) >= 3]
+        if not faces or not len(verts):
+            return CSG()
+        counts = np.fromiter(map(len, faces), dtype=np.int64, count=len(faces))
+        corners = np.fromiter(itertools.chain.from_iterable(faces), dtype=np.int64,
+                              count=int(counts.sum()))
+        polygons = CSGPolygons(verts[corners], counts)
+        return CSG.fromPolygons(polygons.select(polygons.planes[:, :3].any(axis=1)))
 
-        return CSG.fromPolygons(polygons)
+    def to_pydata(self):
+        """
+        Vertices and faces as lists, equal corners share one vertex,
+        vertices are in order of first use.
+        """
+        polygons = self.polygons
+        if not len(polygons):
+            return [], []
+        unique, first, inverse = np.unique(polygons.verts, axis=0,
+                                           return_index=True, return_inverse=True)
+        order = np.argsort(first)
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        corners = rank[inverse.ravel()].tolist()
+        ends = np.cumsum(polygons.counts).tolist()
+        faces = [corners[end - count:end] for end, count in zip(ends, polygons.counts.tolist())]
+        return unique[order].tolist(), faces
@@ -1,242 +1,160 @@
-import math
+import numpy as np
 
+# tolerance used by `CSGPolygons.split()` to decide if a point is on the plane
+EPSILON = 1e-5
 
-class CSGVector(object):
+COPLANAR = 0
+FRONT = 1
+BACK = 2
+SPANNING = 3
 
-    """
-    class CSGVector
-
-    Represents a 3D vector.
-
-    Example usage:
-         CSGVector(1, 2, 3);
-    """
-
-    def __init__(self, *args):
-        self.x = args[0]
-        self.y = args[1]
-        self.z = args[2]
-
-    def clone(self):
-        return CSGVector(self.x, self.y, self.z)
-
-    def negated(self):
-        return CSGVector(-self.x, -self.y, -self.z)
-
-    def plus(self, a):
-        return CSGVector(self.x + a.x, self.y + a.y, self.z + a.z)
-
-    def minus(self, a):
-        return CSGVector(self.x - a.x, self.y - a.y, self.z - a.z)
-
-    def times(self, a):
-        return CSGVector(self.x * a, self.y * a, self.z * a)
-
-    def dividedBy(self, a):
-        return CSGVector(self.x / a, self.y / a, self.z / a)
-
-    def dot(self, a):
-        return self.x * a.x + self.y * a.y + self.z * a.z
-
-    def lerp(self, a, t):
-        return self.plus(a.minus(self).times(t))
-
-    def length(self):
-        return math.sqrt(self.dot(self))
-
-    def unit(self):
-        """ Normalize. """
-        return self.dividedBy(self.length())
-
-    def cross(self, a):
-        return CSGVector(
-            self.y * a.z - self.z * a.y,
-            self.z * a.x - self.x * a.z,
-            self.x * a.y - self.y * a.x)
-
-    def __getitem__(self, key):
-        return (self.x, self.y, self.z)[key]
-
-    def __setitem__(self, key, value):
-        l = [self.x, self.y, self.z]
-        l[key] = value
-        self.x, self.y, self.z = l
-
-    def __len__(self):
-        return 3
-
-    def __iter__(self):
-        return iter((self.x, self.y, self.z))
-
-    def __repr__(self):
-        return 'CSGVector(%.2f, %.2f, %0.2f)' % (self.x, self.y, self.z)
-
-
-class CSGVertex(object):
 
+def polygon_planes(verts, counts):
     """
-    Class CSGVertex
-
-    Represents a vertex of a polygon. Use your own vertex class instead of this
-    one to provide additional features like texture coordinates and vertex
-    colors. Custom vertex classes need to provide a `pos` property and `clone()`,
-    `flip()`, and `interpolate()` methods that behave analogous to the ones
-    defined by `Vertex`. This class provides `normal` so convenience
-    functions like `CSG.sphere()` can return a smooth vertex normal, but `normal`
-    is not used anywhere else.
+    Planes (normal x, y, z and w, the distance along the normal) of the
+    polygons given as flat corners and corner counts. The normal is the
+    Newell normal, zero for degenerate polygons.
     """
-
-    def __init__(self, pos, normal=[0.0, 0.0, 0.0]):
-        self.pos = CSGVector(pos[0], pos[1], pos[2])
-        self.normal = CSGVector(normal[0], normal[1], normal[2])
-
-    def clone(self):
-        return CSGVertex(self.pos.clone(), self.normal.clone())
-
-    def flip(self):
-        """
-        Invert all orientation-specific data (e.g. vertex normal). Called when the
-        orientation of a polygon is flipped.
-        """
-        self.normal = self.normal.negated()
-
-    def interpolate(self, other, t):
-        """
-        Create a new vertex between this vertex and `other` by linearly
-        interpolating all properties using a parameter of `t`. Subclasses should
-        override this to interpolate additional properties.
-        """
-        return CSGVertex(self.pos.lerp(other.pos, t), self.normal.lerp(other.normal, t))
-
-
-class CSGPlane(object):
+    starts = np.cumsum(counts) - counts
+    following = np.arange(len(verts)) + 1
+    following[np.cumsum(counts) - 1] = starts
+    a, b = verts, verts[following]
+    newell = np.column_stack((
+        (a[:, 1] - b[:, 1]) * (a[:, 2] + b[:, 2]),
+        (a[:, 2] - b[:, 2]) * (a[:, 0] + b[:, 0]),
+        (a[:, 0] - b[:, 0]) * (a[:, 1] + b[:, 1])))
+    normals = np.add.reduceat(newell, starts, axis=0)
+    length = np.sqrt(np.einsum('ij,ij->i', normals, normals))
+    length[length == 0] = 1
+    normals /= length[:, np.newaxis]
+    return np.column_stack((normals, np.einsum('ij,ij->i', normals, verts[starts])))
+
+
+class CSGPolygons(object):
 
     """
-    class CSGPlane
+    class CSGPolygons
 
-    Represents a plane in 3D space.
+    A batch of convex polygons stored as arrays: the corners of all polygons
+    (K, 3), the number of corners of every polygon (P,) and their planes
+    (P, 4). The polygons are never changed in place, every operation returns
+    new arrays, so they can be shared between solids and trees without cloning.
     """
 
-    """
-    `CSGPlane.EPSILON` is the tolerance used by `splitPolygon()` to decide if a
-    point is on the plane.
-    """
-    EPSILON = 1e-5
+    __slots__ = ('verts', 'counts', 'planes')
 
-    def __init__(self, normal, w):
-        self.normal = normal
-        self.w = w
+    def __init__(self, verts, counts, planes=None):
+        self.verts = np.asarray(verts, dtype=np.float64).reshape(-1, 3)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        if planes is None:
+            planes = polygon_planes(self.verts, self.counts) if len(self.counts) else np.zeros((0, 4))
+        self.planes = planes
 
     @classmethod
-    def fromPoints(cls, a, b, c):
-        n = b.minus(a).cross(c.minus(a)).unit()
-        return CSGPlane(n, n.dot(a))
+    def empty(cls):
+        return cls(np.zeros((0, 3)), np.zeros(0, dtype=np.int64), np.zeros((0, 4)))
 
-    def clone(self):
-        return CSGPlane(self.normal.clone(), self.w)
-
-    def flip(self):
-        self.normal = self.normal.negated()
-        self.w = -self.w
+    @classmethod
+    def concatenate(cls, batches):
+        batches = [b for b in batches if len(b)]
+        if not batches:
+            return cls.empty()
+        if len(batches) == 1:
+            return batches[0]
+        return cls(np.concatenate([b.verts for b in batches]),
+                   np.concatenate([b.counts for b in batches]),
+                   np.concatenate([b.planes for b in batches]))
 
-    def splitPolygon(self, polygon, coplanarFront, coplanarBack, front, back):
+    def __len__(self):
+        return len(self.counts)
+
+    def select(self, mask, starts=None):
+        """ polygons where mask is True, starts are the first corners if known """
+        index = np.flatnonzero(mask)
+        if not len(index):
+            return CSGPolygons.empty()
+        if len(index) == len(self.counts):
+            return self
+        first, last = index[0], index[-1] + 1
+        if last - first == len(index):
+            # a range of polygons, views instead of copies
+            if starts is None:
+                starts = np.cumsum(self.counts) - self.counts
+            end = starts[last] if last < len(starts) else len(self.verts)
+            return CSGPolygons(self.verts[starts[first]:end], self.counts[first:last],
+                               self.planes[first:last])
+        return CSGPolygons(self.verts[np.repeat(mask, self.counts)], self.counts[index],
+                           self.planes[index])
+
+    def flipped(self):
+        """ polygons with reversed corners and planes """
+        ends = np.cumsum(self.counts)
+        owner = np.repeat(np.arange(len(self.counts)), self.counts)
+        reverse = (2 * ends - self.counts - 1)[owner] - np.arange(len(self.verts))
+        return CSGPolygons(self.verts[reverse], self.counts, -self.planes)
+
+    def split(self, plane):
         """
-        Split `polygon` by this plane if needed, then put the polygon or polygon
-        fragments in the appropriate lists. Coplanar polygons go into either
-        `coplanarFront` or `coplanarBack` depending on their orientation with
-        respect to this plane. Polygons in front or in back of this plane go into
-        either `front` or `back`
+        Split the polygons by plane if needed, returns the polygons coplanar
+        and facing the same way as the plane, the coplanar ones facing the
+        other way, and the polygons or polygon fragments in front of and in
+        back of the plane.
         """
-        COPLANAR = 0
-        FRONT = 1
-        BACK = 2
-        SPANNING = 3
-
-        # Classify each point as well as the entire polygon into one of the above
-        # four classes.
-        polygonType = 0
-        types = []
-
-        for i in range(0, len(polygon.vertices)):
-            t = self.normal.dot(polygon.vertices[i].pos) - self.w
-            type = -1
-            if t < -CSGPlane.EPSILON:
-                type = BACK
-            elif t > CSGPlane.EPSILON:
-                type = FRONT
-            else:
-                type = COPLANAR
-            polygonType |= type
-            types.append(type)
-
-        # Put the polygon in the correct list, splitting it when necessary.
-        if polygonType == COPLANAR:
-            if self.normal.dot(polygon.plane.normal) > 0:
-                coplanarFront.append(polygon)
-            else:
-                coplanarBack.append(polygon)
-        elif polygonType == FRONT:
-            front.append(polygon)
-        elif polygonType == BACK:
-            back.append(polygon)
-        elif polygonType == SPANNING:
+        normal, w = plane[:3], plane[3]
+        dist = self.verts.dot(normal) - w
+        types = np.full(len(dist), COPLANAR, dtype=np.int8)
+        types[dist < -EPSILON] = BACK
+        types[dist > EPSILON] = FRONT
+        starts = np.cumsum(self.counts) - self.counts
+        polygon_types = np.bitwise_or.reduceat(types, starts)
+
+        coplanar = polygon_types == COPLANAR
+        facing = self.planes[:, :3].dot(normal) > 0
+        coplanar_front = self.select(coplanar & facing, starts)
+        coplanar_back = self.select(coplanar & ~facing, starts)
+        front = self.select(polygon_types == FRONT, starts)
+        back = self.select(polygon_types == BACK, starts)
+
+        spanning = polygon_types == SPANNING
+        if not spanning.any():
+            return coplanar_front, coplanar_back, front, back
+
+        f_verts, f_counts, b_verts, b_counts = [], [], [], []
+        corners = np.repeat(spanning, self.counts)
+        verts = self.verts[corners].tolist()
+        types = types[corners].tolist()
+        dist = dist[corners].tolist()
+        start = 0
+        for count in self.counts[spanning].tolist():
             f = []
             b = []
-            for i in range(0, len(polygon.vertices)):
-                j = (i + 1) % len(polygon.vertices)
-                ti = types[i]
-                tj = types[j]
-                vi = polygon.vertices[i]
-                vj = polygon.vertices[j]
+            for i in range(start, start + count):
+                j = i + 1 if i + 1 < start + count else start
+                ti, tj = types[i], types[j]
+                vi = verts[i]
                 if ti != BACK:
                     f.append(vi)
                 if ti != FRONT:
-                    if ti != BACK:
-                        b.append(vi.clone())
-                    else:
-                        b.append(vi)
+                    b.append(vi)
                 if (ti | tj) == SPANNING:
-                    t = (self.w - self.normal.dot(vi.pos)) / self.normal.dot(vj.pos.minus(vi.pos))
-                    v = vi.interpolate(vj, t)
+                    vj = verts[j]
+                    t = dist[i] / (dist[i] - dist[j])
+                    v = [vi[0] + (vj[0] - vi[0]) * t,
+                         vi[1] + (vj[1] - vi[1]) * t,
+                         vi[2] + (vj[2] - vi[2]) * t]
                     f.append(v)
-                    b.append(v.clone())
-            if len(f) >= 3:
-                front.append(CSGPolygon(f, polygon.shared))
-            if len(b) >= 3:
-                back.append(CSGPolygon(b, polygon.shared))
+                    b.append(v)
+            f_verts.extend(f)
+            f_counts.append(len(f))
+            b_verts.extend(b)
+            b_counts.append(len(b))
+            start += count
 
-
-class CSGPolygon(object):
-
-    """
-    class CSGPolygon
-
-    Represents a convex polygon. The vertices used to initialize a polygon must
-    be coplanar and form a convex loop. They do not have to be `Vertex`
-    instances but they must behave similarly (duck typing can be used for
-    customization).
-
-    Each convex polygon has a `shared` property, which is shared between all
-    polygons that are clones of each other or were split from the same polygon.
-    This can be used to define per-polygon properties (such as surface color).
-    """
-
-    def __init__(self, vertices, shared=None):
-        self.vertices = list(vertices)
-        self.shared = shared
-        self.plane = CSGPlane.fromPoints(
-            self.vertices[0].pos,
-            self.vertices[1].pos,
-            self.vertices[2].pos)
-
-    def clone(self):
-        vertices = map(lambda v: v.clone(), self.vertices)
-        return CSGPolygon(vertices, self.shared)
-
-    def flip(self):
-        self.vertices.reverse()
-        map(lambda v: v.flip(), self.vertices)
-        self.plane.flip()
+        # the fragments keep the plane of the polygon they come from
+        planes = self.planes[spanning]
+        front = CSGPolygons.concatenate([front, CSGPolygons(f_verts, f_counts, planes)])
+        back = CSGPolygons.concatenate([back, CSGPolygons(b_verts, b_counts, planes)])
+        return coplanar_front, coplanar_back, front, back
 
 
 class CSGNode(object):
@@ -244,66 +162,63 @@ class CSGNode(object):
     """
     class CSGNode
 
-    Holds a node in a BSP tree. A BSP tree is built from a collection of polygons
+    Holds a BSP tree. A BSP tree is built from a collection of polygons
     by picking a polygon to split along. That polygon (and all other coplanar
     polygons) are added directly to that node and the other polygons are added to
     the front and/or back subtrees. This is not a leafy BSP tree since there is
     no distinction between internal and leaf nodes.
+
+    The nodes are kept in flat lists, node 0 is the root, and the polygons of
+    all nodes in one CSGPolygons, as the tree is only ever clipped or read as
+    a whole. Trees are walked with a stack instead of recursion, so the depth
+    of the tree is not limited by the recursion limit.
     """
 
+    __slots__ = ('planes', 'front', 'back', 'polygons')
+
     def __init__(self, polygons=None):
-        self.plane = None
-        self.front = None
-        self.back = None
-        self.polygons = []
-        if polygons:
+        self.planes = []
+        self.front = []
+        self.back = []
+        self.polygons = CSGPolygons.empty()
+        if polygons is not None:
             self.build(polygons)
 
-    def clone(self):
-        node = CSGNode()
-        if self.plane:
-            node.plane = self.plane.clone()
-        if self.front:
-            node.front = self.front.clone()
-        if self.back:
-            node.back = self.back.clone()
-        node.polygons = map(lambda p: p.clone(), self.polygons)
-        return node
+    def add_node(self, plane):
+        self.planes.append(plane)
+        self.front.append(-1)
+        self.back.append(-1)
+        return len(self.planes) - 1
 
     def invert(self):
         """
         Convert solid space to empty space and empty space to solid space.
         """
-        for poly in self.polygons:
-            poly.flip()
-        self.plane.flip()
-        if self.front:
-            self.front.invert()
-        if self.back:
-            self.back.invert()
-        temp = self.front
-        self.front = self.back
-        self.back = temp
+        self.polygons = self.polygons.flipped()
+        self.planes = [-plane for plane in self.planes]
+        self.front, self.back = self.back, self.front
 
     def clipPolygons(self, polygons):
         """
-        Recursively remove all polygons in `polygons` that are inside this BSP
-        tree.
+        Remove all polygons in `polygons` that are inside this BSP tree.
         """
-        if not self.plane:
-            return polygons[:]
-        front = []
-        back = []
-        for poly in polygons:
-            self.plane.splitPolygon(poly, front, back, front, back)
-        if self.front:
-            front = self.front.clipPolygons(front)
-        if self.back:
-            back = self.back.clipPolygons(back)
-        else:
-            back = []
-        front.extend(back)
-        return front
+        if not self.planes:
+            return polygons
+        kept = []
+        stack = [(0, polygons)]
+        while stack:
+            node, polygons = stack.pop()
+            coplanar_front, coplanar_back, front, back = polygons.split(self.planes[node])
+            front = CSGPolygons.concatenate([coplanar_front, front])
+            back = CSGPolygons.concatenate([coplanar_back, back])
+            if len(front):
+                if self.front[node] >= 0:
+                    stack.append((self.front[node], front))
+                else:
+                    kept.append(front)
+            if len(back) and self.back[node] >= 0:
+                stack.append((self.back[node], back))
+        return CSGPolygons.concatenate(kept)
 
     def clipTo(self, bsp):
         """
@@ -311,40 +226,33 @@ class CSGNode(object):
         `bsp`.
         """
         self.polygons = bsp.clipPolygons(self.polygons)
-        if self.front:
-            self.front.clipTo(bsp)
-        if self.back:
-            self.back.clipTo(bsp)
 
     def allPolygons(self):
         """
-        Return a list of all polygons in this BSP tree.
+        Return all polygons in this BSP tree.
         """
-        polygons = self.polygons[:]
-        if self.front:
-            polygons.extend(self.front.allPolygons())
-        if self.back:
-            polygons.extend(self.back.allPolygons())
-        return polygons
+        return self.polygons
 
     def build(self, polygons):
-        if isinstance(polygons, map):
-            polygons = list(polygons)
-            if not len(polygons):
-                return
-
-        if not self.plane:
-            self.plane = polygons[0].plane.clone()
-        front = []
-        back = []
-        for poly in polygons:
-            self.plane.splitPolygon(
-                poly, self.polygons, self.polygons, front, back)
-        if len(front):
-            if not self.front:
-                self.front = CSGNode()
-            self.front.build(front)
-        if len(back):
-            if not self.back:
-                self.back = CSGNode()
-            self.back.build(back)
+        """
+        Add polygons to the tree, polygons coplanar with a node go to that
+        node, the others are passed down to the front and back subtrees.
+        """
+        if not len(polygons):
+            return
+        if not self.planes:
+            self.add_node(polygons.planes[0])
+        node_polygons = [self.polygons]
+        stack = [(0, polygons)]
+        while stack:
+            node, polygons = stack.pop()
+            coplanar_front, coplanar_back, front, back = polygons.split(self.planes[node])
+            node_polygons.append(coplanar_front)
+            node_polygons.append(coplanar_back)
+            for children, part in ((self.front, front), (self.back, back)):
+                if not len(part):
+                    continue
+                if children[node] < 0:
+                    children[node] = self.add_node(part.planes[0])
+                stack.append((children[node], part))
+        self.polygons = CSGPolygons.concatenate(node_polygons)
@@ -0,0 +1,200 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+'''
+Headless benchmark of the layouts in json_examples.
+
+Run in background blender with sverchok enabled:
+
+  blender -b --addons sverchok --python utils/sv_benchmark.py -- \
+      --runs 5 --scale 1 10 100 --output bench.json
+
+Options after --
+  --runs N          times each layout is processed, default 5
+  --scale F [F ..]  factors for the vertex counts of generator nodes, default 1
+  --output PATH     write results as json
+  --compare PATH    print the change against an earlier results file
+  layouts           .json layouts, default all of json_examples
+
+Each result has total time per run, per node statistics from
+core/profiling.py, the size of the socket payloads and the peak memory
+allocated while the layout is processed once more after the timed runs,
+traced by tracemalloc so it's the peak of that layout alone. Memory that
+blender allocates itself, like meshes of viewers, isn't traced.
+'''
+
+import ast
+import copy
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+import traceback
+
+import bpy
+
+from sverchok import data_structure
+from sverchok.core import profiling
+from sverchok.core.update_system import process_tree
+from sverchok.utils.sv_IO_panel_tools import import_tree
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'json_examples')
+
+# params that set the number of generated elements, bl_idname: [(param, dimensions)]
+# a param of a node that generates a grid is scaled by the square root
+# of the factor so the vertex count scales by the factor.
+scale_params = {
+    'LineNode': [('int_', 1)],
+    'SvCircleNode': [('vert_', 1)],
+    'PlaneNode': [('int_X', 2), ('int_Y', 2)],
+    'SphereNode': [('U_', 2), ('V_', 2)],
+    'CylinderNode': [('vert_', 2), ('subd_', 2)],
+    'RandomVectorNode': [('count_inner', 1)],
+    'SvGenFloatRange': [('count_', 1)],
+}
+
+
+def scale_layout(nodes_json, factor):
+    '''
+    Copy of layout with the element counts of generator nodes scaled
+    '''
+    nodes_json = copy.deepcopy(nodes_json)
+    if factor == 1:
+        return nodes_json
+    layouts = [nodes_json] + list(nodes_json.get('groups', {}).values())
+    for layout in layouts:
+        for node_ref in layout['nodes'].values():
+            for param, dims in scale_params.get(node_ref['bl_idname'], []):
+                value = node_ref['params'].get(param)
+                if isinstance(value, int) and not isinstance(value, bool):
+                    node_ref['params'][param] = max(1, int(round(value * factor ** (1 / dims))))
+    return nodes_json
+
+
+def peak_traced_kb(ng):
+    '''
+    Peak of the memory allocated by python and numpy while ng is processed,
+    tracing is started for this run only as it slows down processing
+    '''
+    tracemalloc.start()
+    try:
+        process_tree(ng)
+        return tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+
+def payload_sizes(ng):
+    cache = data_structure.socket_data_cache.get(ng.name, {})
+    return sum(data_structure.sv_payload_size(data) for data in cache.values())
+
+
+def benchmark_layout(path, runs=5, factor=1):
+    name = os.path.basename(path)
+    with open(path) as fp:
+        nodes_json = scale_layout(json.load(fp), factor)
+
+    ng = bpy.data.node_groups.new(name, 'SverchCustomTreeType')
+    profile_mode = data_structure.PROFILE_MODE
+    result = {"layout": name, "scale": factor, "runs": runs}
+    try:
+        import_tree(ng, nodes_json=nodes_json, create_texts=True)
+        data_structure.PROFILE_MODE = True
+        profiling.reset(ng)
+        times = []
+        for i in range(runs):
+            start = time.perf_counter()
+            process_tree(ng)
+            times.append(time.perf_counter() - start)
+        result["total"] = {"mean": sum(times) / len(times),
+                           "min": min(times),
+                           "max": max(times),
+                           "times": times}
+        result["nodes"] = profiling.get_node_stats(ng)
+        result["payload_bytes"] = payload_sizes(ng)
+        result["peak_traced_kb"] = peak_traced_kb(ng)
+        if "error nodes" in ng:
+            result["errors"] = sorted(ast.literal_eval(ng["error nodes"]).keys())
+    except Exception as err:
+        traceback.print_exc()
+        result["failed"] = str(err)
+    finally:
+        data_structure.PROFILE_MODE = profile_mode
+        profiling.reset(ng)
+        bpy.data.node_groups.remove(ng)
+    return result
+
+
+def run(layouts=None, runs=5, scales=(1,)):
+    if not layouts:
+        layouts = sorted(os.path.join(EXAMPLES_DIR, f)
+                         for f in os.listdir(EXAMPLES_DIR) if f.endswith('.json'))
+    results = []
+    for path in layouts:
+        for factor in scales:
+            result = benchmark_layout(path, runs, factor)
+            results.append(result)
+            if "total" in result:
+                print("{layout} x{scale}: {mean:.4f}s".format(
+                    layout=result["layout"], scale=factor, mean=result["total"]["mean"]))
+            else:
+                print("{layout} x{scale}: failed".format(layout=result["layout"], scale=factor))
+    return {"sverchok_version": list(sys.modules['sverchok'].bl_info['version']),
+            "blender_version": list(bpy.app.version),
+            "results": results}
+
+
+def compare(old, new):
+    '''
+    Print change in mean total time per layout and scale between two results
+    '''
+    old_times = {(r["layout"], r["scale"]): r["total"]["mean"]
+                 for r in old["results"] if "total" in r}
+    for r in new["results"]:
+        key = (r["layout"], r["scale"])
+        if key in old_times and "total" in r:
+            ratio = r["total"]["mean"] / old_times[key] if old_times[key] else math.inf
+            print("{0} x{1}: {2:.4f}s -> {3:.4f}s ({4:+.1%})".format(
+                key[0], key[1], old_times[key], r["total"]["mean"], ratio - 1))
+
+
+def main(argv):
+    import argparse
+    parser = argparse.ArgumentParser(description="Sverchok layout benchmark")
+    parser.add_argument("layouts", nargs="*")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--scale", type=float, nargs="+", default=[1.0])
+    parser.add_argument("--output")
+    parser.add_argument("--compare")
+    args = parser.parse_args(argv)
+
+    scales = [int(s) if s.is_integer() else s for s in args.scale]
+    results = run(args.layouts, args.runs, scales)
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(results, fp, indent=2)
+    if args.compare:
+        with open(args.compare) as fp:
+            compare(json.load(fp), results)
+
+
+if __name__ == "__main__":
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    main(argv)
@@ -0,0 +1,319 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+'''
+BVH trees for the bvh nodes, cached by mesh content with LRU
+eviction, and queries that take all points at once and return arrays.
+'''
+
+import collections
+import hashlib
+import itertools
+
+import numpy as np
+
+from mathutils.bvhtree import BVHTree
+
+# number of trees kept
+BVH_CACHE_SIZE = 32
+
+# content key -> BVHTree, least recently used first
+bvh_cache = collections.OrderedDict()
+
+
+def content_key(*arrays):
+    digest = hashlib.sha1()
+    for arr in arrays:
+        arr = np.ascontiguousarray(arr)
+        digest.update(str((arr.dtype.str, arr.shape)).encode())
+        digest.update(arr.data)
+    return digest.hexdigest()
+
+
+def cached_bvh(key, build):
+    if key in bvh_cache:
+        bvh_cache.move_to_end(key)
+        return bvh_cache[key]
+    bvh = build()
+    bvh_cache[key] = bvh
+    while len(bvh_cache) > BVH_CACHE_SIZE:
+        bvh_cache.popitem(last=False)
+    return bvh
+
+
+def reset_bvh_cache():
+    bvh_cache.clear()
+
+
+def bvh_from_polygons(verts, polys):
+    '''
+    BVHTree.FromPolygons, reused while the same vertices and polygons come in
+    '''
+    verts = np.asarray(verts, dtype=np.float64).reshape(-1, 3)
+    if isinstance(polys, np.ndarray):
+        flat, totals = polys.ravel(), np.full(len(polys), polys.shape[-1] if polys.ndim > 1 else 0)
+    else:
+        totals = np.fromiter(map(len, polys), dtype=np.int64, count=len(polys))
+        flat = np.fromiter(itertools.chain.from_iterable(polys), dtype=np.int64, count=int(totals.sum()))
+    key = ('polygons', content_key(verts, flat.astype(np.int64), totals.astype(np.int64)))
+
+    def build():
+        face_list = polys.tolist() if isinstance(polys, np.ndarray) else polys
+        return BVHTree.FromPolygons(verts.tolist(), face_list, all_triangles=False, epsilon=0.0)
+
+    return cached_bvh(key, build)
+
+
+def object_key(obj):
+    '''
+    Cache key of the mesh of a plain mesh object, its name and a hash of its
+    vertices and polygons. None for objects blender evaluates, with
+    modifiers or shape keys, or in edit mode, their mesh can't be keyed
+    without evaluating it.
+    '''
+    mesh = obj.data
+    if obj.type != 'MESH' or obj.modifiers or mesh.shape_keys or obj.mode == 'EDIT':
+        return None
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', co)
+    loops = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get('vertex_index', loops)
+    totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get('loop_total', totals)
+    return ('object', obj.name, content_key(co, loops, totals))
+
+
+def bvh_from_object(obj, scene):
+    '''
+    BVHTree.FromObject, the tree of a plain mesh object is reused while its
+    mesh is unchanged. Objects with modifiers or shape keys are evaluated
+    by blender, their tree is built every time.
+    '''
+    def build():
+        return BVHTree.FromObject(obj, scene, deform=True, render=False, cage=False, epsilon=0.0)
+
+    key = object_key(obj)
+    if key is None:
+        return build()
+    return cached_bvh(key, build)
+
+
+def hits_to_arrays(hits):
+    '''
+    Results of ray_cast or find_nearest as arrays of location, normal,
+    index and distance, (0, 0, 0), (0, 0, 0), -1 and 0 where nothing was found
+    '''
+    count = len(hits)
+    location = np.zeros((count, 3))
+    normal = np.zeros((count, 3))
+    index = np.full(count, -1, dtype=np.int64)
+    distance = np.zeros(count)
+
+    found = [(i, h) for i, h in enumerate(hits) if h[0] is not None]
+    if found:
+        rows = [i for i, h in found]
+        location[rows] = [h[0][:] for i, h in found]
+        normal[rows] = [h[1][:] for i, h in found]
+        index[rows] = [h[2] for i, h in found]
+        distance[rows] = [h[3] for i, h in found]
+    return location, normal, index, distance
+
+
+def ray_cast(bvh, starts, directions, distance=None):
+    ''' cast all rays, see hits_to_arrays for the result '''
+    starts = np.asarray(starts, dtype=np.float64).reshape(-1, 3).tolist()
+    directions = np.asarray(directions, dtype=np.float64).reshape(-1, 3).tolist()
+    if distance is None:
+        hits = [bvh.ray_cast(s, d) for s, d in zip(starts, directions)]
+    else:
+        hits = [bvh.ray_cast(s, d, distance) for s, d in zip(starts, directions)]
+    return hits_to_arrays(hits)
+
+
+def find_nearest(bvh, points, distance=None):
+    ''' nearest point on the tree of all points, see hits_to_arrays for the result '''
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3).tolist()
+    if distance is None:
+        hits = [bvh.find_nearest(p) for p in points]
+    else:
+        hits = [bvh.find_nearest(p, distance) for p in points]
+    return hits_to_arrays(hits)
+
+
+def overlap(bvh_a, bvh_b):
+    ''' K x 2 array of indices of overlapping polygons of a and b '''
+    return np.array(bvh_a.overlap(bvh_b), dtype=np.int64).reshape(-1, 2)
+
+
+def ray_cast_segments(bvh, starts, ends):
+    ''' cast a ray along every segment start - end, see hits_to_arrays for the result '''
+    starts = np.asarray(starts, dtype=np.float64).reshape(-1, 3)
+    directions = np.asarray(ends, dtype=np.float64).reshape(-1, 3) - starts
+    distances = np.linalg.norm(directions, axis=1)
+    hits = [bvh.ray_cast(s, d, l) if l > 0 else (None, None, None, None)
+            for s, d, l in zip(starts.tolist(), directions.tolist(), distances.tolist())]
+    return hits_to_arrays(hits)
+
+
+#####################################
+# scene snapshot                    #
+#####################################
+
+# object types that blender can turn into a mesh
+mesh_types = {'MESH', 'CURVE', 'SURFACE', 'FONT', 'META'}
+
+# scene name -> SceneSnapshot of the current frame
+snapshot_cache = {}
+
+# object name -> changes of its data reported by blender, counted by a
+# scene update handler in core/handlers.py
+object_updates = collections.Counter()
+
+
+class SceneSnapshot(object):
+    '''
+    Local space BVH trees and world matrices of the visible objects of a
+    scene, so any number of rays can be cast against the scene as a batch.
+    A snapshot is kept for one frame. The trees are built once and again
+    only for objects whose data blender reports as changed, the matrices
+    are read on every refresh.
+    '''
+
+    def __init__(self, scene):
+        self.frame = scene.frame_current
+        # object name -> (object_updates of the object when built, tree)
+        self.trees = {}
+        self.objects = []
+        self.bvhs = []
+        self.matrices = self.inverses = np.zeros((0, 4, 4))
+        self.bounds = []
+
+    def get_bvh(self, obj, scene):
+        ''' tree of obj, built again if its data changed since it was built '''
+        updates = object_updates[obj.name]
+        cached = self.trees.get(obj.name)
+        if cached is None or cached[0] != updates:
+            cached = (updates, bvh_from_object(obj, scene))
+            self.trees[obj.name] = cached
+        return cached[1]
+
+    def refresh(self, scene):
+        ''' read the visible objects and their matrices again '''
+        self.objects, self.bvhs, matrices, inverses = [], [], [], []
+        for obj in scene.objects:
+            if obj.type not in mesh_types or not obj.is_visible(scene):
+                continue
+            matrix = np.array(obj.matrix_world)
+            try:
+                inverse = np.linalg.inv(matrix)
+            except np.linalg.LinAlgError:
+                # objects scaled to zero have no volume to hit, they are left out
+                continue
+            self.objects.append(obj)
+            self.bvhs.append(self.get_bvh(obj, scene))
+            matrices.append(matrix)
+            inverses.append(inverse)
+        self.matrices = np.array(matrices).reshape(-1, 4, 4)
+        self.inverses = np.array(inverses).reshape(-1, 4, 4)
+        self.bounds = [self.world_bounds(obj, m) for obj, m in zip(self.objects, self.matrices)]
+
+    @staticmethod
+    def world_bounds(obj, matrix):
+        corners = np.array([c[:] for c in obj.bound_box]).reshape(-1, 3)
+        world = corners.dot(matrix[:3, :3].T) + matrix[:3, 3]
+        return world.min(axis=0), world.max(axis=0)
+
+    def ray_cast(self, starts, ends):
+        '''
+        Nearest hit of every segment start - end over all objects, returns
+        success, object index (-1 for none), location, normal and face index
+        '''
+        starts = np.asarray(starts, dtype=np.float64).reshape(-1, 3)
+        ends = np.asarray(ends, dtype=np.float64).reshape(-1, 3)
+        count = len(starts)
+        best = np.full(count, np.inf)
+        obj_index = np.full(count, -1, dtype=np.int64)
+        location = np.zeros((count, 3))
+        normal = np.zeros((count, 3))
+        face_index = np.full(count, -1, dtype=np.int64)
+
+        for i, (bvh, matrix, inverse) in enumerate(zip(self.bvhs, self.matrices, self.inverses)):
+            rays = np.flatnonzero(segments_hit_box(starts, ends, *self.bounds[i]))
+            if not len(rays):
+                continue
+            local_starts = starts[rays].dot(inverse[:3, :3].T) + inverse[:3, 3]
+            local_ends = ends[rays].dot(inverse[:3, :3].T) + inverse[:3, 3]
+            loc, nor, idx, dist = ray_cast_segments(bvh, local_starts, local_ends)
+
+            hit = idx >= 0
+            world_loc = loc.dot(matrix[:3, :3].T) + matrix[:3, 3]
+            world_dist = np.linalg.norm(world_loc - starts[rays], axis=1)
+            closer = hit & (world_dist < best[rays])
+            rays = rays[closer]
+            best[rays] = world_dist[closer]
+            obj_index[rays] = i
+            location[rays] = world_loc[closer]
+            world_nor = nor[closer].dot(inverse[:3, :3])
+            lengths = np.linalg.norm(world_nor, axis=1)
+            lengths[lengths == 0] = 1.0
+            normal[rays] = world_nor / lengths[:, np.newaxis]
+            face_index[rays] = idx[closer]
+
+        return obj_index >= 0, obj_index, location, normal, face_index
+
+
+def segments_hit_box(starts, ends, box_min, box_max):
+    ''' mask of segments that intersect the axis aligned box, slab test '''
+    direction = ends - starts
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t0 = (box_min - starts) / direction
+        t1 = (box_max - starts) / direction
+    near = np.where(np.isnan(t0), -np.inf, np.minimum(t0, t1))
+    far = np.where(np.isnan(t1), np.inf, np.maximum(t0, t1))
+    # zero direction along an axis: inside the slab or never
+    flat = direction == 0
+    outside = flat & ((starts < box_min) | (starts > box_max))
+    near[flat] = -np.inf
+    far[flat] = np.inf
+    t_near = near.max(axis=1)
+    t_far = far.min(axis=1)
+    return ~outside.any(axis=1) & (t_near <= t_far) & (t_far >= 0) & (t_near <= 1)
+
+
+def frame_snapshot(scene):
+    ''' SceneSnapshot of the current frame of scene, a new one on frame change '''
+    snapshot = snapshot_cache.get(scene.name)
+    if snapshot is None or snapshot.frame != scene.frame_current:
+        snapshot = SceneSnapshot(scene)
+        snapshot_cache[scene.name] = snapshot
+    return snapshot
+
+
+def scene_snapshot(scene):
+    '''
+    SceneSnapshot of scene, with the trees of this frame and the current
+    objects and matrices
+    '''
+    snapshot = frame_snapshot(scene)
+    snapshot.refresh(scene)
+    return snapshot
+
+
+def object_bvh(obj, scene):
+    ''' tree of obj from the scene snapshot of this frame '''
+    return frame_snapshot(scene).get_bvh(obj, scene)
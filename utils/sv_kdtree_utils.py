@@ -0,0 +1,162 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+'''
+KD-trees with batched queries for the kdtree nodes.
+
+The trees are built with scipy's cKDTree when scipy is installed, else
+with mathutils.kdtree, and cached per upstream socket until the version
+of its payload changes.
+'''
+
+import numpy as np
+
+import mathutils
+
+from sverchok.data_structure import get_other_socket, socket_id, SvGetSocketVersion
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+# (tree name, socket id) -> (payload version, [SvKDTree, ..])
+kdtree_cache = {}
+
+
+def as_points(points):
+    return np.array(points, dtype=np.float64).reshape(-1, 3)
+
+
+def split_groups(values, counts):
+    ''' split flat array in consecutive groups of counts, as lists '''
+    return [g.tolist() for g in np.split(values, np.cumsum(counts)[:-1])] if len(counts) else []
+
+
+class SvKDTree(object):
+    '''
+    KD-tree of one vertex list, every query takes all points at once
+    and returns lists of coordinates, indices and distances.
+    '''
+
+    def __init__(self, verts):
+        self.verts = as_points(verts)
+        if cKDTree is not None:
+            self.tree = cKDTree(self.verts)
+        else:
+            self.tree = mathutils.kdtree.KDTree(len(self.verts))
+            for i, vtx in enumerate(self.verts.tolist()):
+                self.tree.insert(vtx, i)
+            self.tree.balance()
+
+    def __len__(self):
+        return len(self.verts)
+
+    def find(self, points):
+        ''' nearest vertex of every point '''
+        points = as_points(points)
+        if not len(self) or not len(points):
+            return [], [], []
+        if cKDTree is not None:
+            dist, idx = self.tree.query(points)
+            return self.verts[idx].tolist(), idx.tolist(), dist.tolist()
+        found = [self.tree.find(p) for p in points.tolist()]
+        return ([co.to_tuple() for co, index, dist in found],
+                [index for co, index, dist in found],
+                [dist for co, index, dist in found])
+
+    def find_n(self, points, n):
+        ''' n nearest vertices of every point, nearest first, one list per point '''
+        points = as_points(points)
+        n = min(n, len(self))
+        if not n or not len(points):
+            return [[] for p in points], [[] for p in points], [[] for p in points]
+        if cKDTree is not None:
+            dist, idx = self.tree.query(points, k=n)
+            idx = idx.reshape(len(points), n)
+            dist = dist.reshape(len(points), n)
+            return self.verts[idx].tolist(), idx.tolist(), dist.tolist()
+        return self._regroup([self.tree.find_n(p, n) for p in points.tolist()])
+
+    def find_range(self, points, radius):
+        ''' vertices within radius of every point, nearest first, one list per point '''
+        points = as_points(points)
+        if not len(self) or not len(points):
+            return [[] for p in points], [[] for p in points], [[] for p in points]
+        if cKDTree is None:
+            return self._regroup([self.tree.find_range(p, radius) for p in points.tolist()])
+
+        groups, idx, dist = self.range_arrays(points, radius)
+        counts = np.bincount(groups, minlength=len(points))
+        return (split_groups(self.verts[idx], counts),
+                split_groups(idx, counts),
+                split_groups(dist, counts))
+
+    def range_arrays(self, points, radius):
+        '''
+        Flat arrays of the find_range results: index of the point,
+        index of the vertex and distance, sorted by point and distance
+        '''
+        points = as_points(points)
+        if cKDTree is None:
+            found = [self.tree.find_range(p, radius) for p in points.tolist()]
+            groups = np.repeat(np.arange(len(found)), [len(f) for f in found])
+            idx = np.array([index for f in found for co, index, dist in f], dtype=np.int64)
+            dist = np.array([dist for f in found for co, index, dist in f], dtype=np.float64)
+        else:
+            found = self.tree.query_ball_point(points, radius)
+            counts = [len(f) for f in found]
+            groups = np.repeat(np.arange(len(found)), counts)
+            idx = np.fromiter((i for f in found for i in f), dtype=np.int64, count=sum(counts))
+            dist = np.linalg.norm(self.verts[idx] - points[groups], axis=1)
+        order = np.lexsort((dist, groups))
+        return groups[order], idx[order], dist[order]
+
+    @staticmethod
+    def _regroup(found):
+        return ([[co.to_tuple() for co, index, dist in f] for f in found],
+                [[index for co, index, dist in f] for f in found],
+                [[dist for co, index, dist in f] for f in found])
+
+
+def socket_kdtrees(socket, verts_list):
+    '''
+    One SvKDTree per object of verts_list, the data of the linked input
+    socket. The trees are reused while the upstream payload is unchanged.
+    '''
+    other = get_other_socket(socket)
+    version = SvGetSocketVersion(other) if other else None
+    if version is None:
+        return [SvKDTree(verts) for verts in verts_list]
+
+    key = (other.id_data.name, socket_id(other))
+    cached = kdtree_cache.get(key)
+    if cached and cached[0] == version and len(cached[1]) == len(verts_list):
+        return cached[1]
+    trees = [SvKDTree(verts) for verts in verts_list]
+    kdtree_cache[key] = (version, trees)
+    return trees
+
+
+def reset_kdtree_cache(ng=None):
+    ''' drop the trees built from sockets of node group ng, of all groups if None '''
+    if ng is None:
+        kdtree_cache.clear()
+        return
+    for key in [key for key in kdtree_cache if key[0] == ng.name]:
+        del kdtree_cache[key]
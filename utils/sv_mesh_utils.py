@@ -16,21 +16,303 @@
 #
 # ##### END GPL LICENSE BLOCK #####
 
+import itertools
+
+import numpy as np
+
+from sverchok import data_structure
+
+
 def mesh_join(vertices_s, edges_s, faces_s):
     '''Given list of meshes represented by lists of vertices, edges and faces,
-    produce one joined mesh.'''
+    produce one joined mesh. Vertices are one array when the meshes come
+    as arrays, else one list.'''
 
-    offset = 0
-    result_vertices = []
-    result_edges = []
-    result_faces = []
     if len(edges_s) == 0:
         edges_s = [[]] * len(faces_s)
-    for vertices, edges, faces in zip(vertices_s, edges_s, faces_s):
-        result_vertices.extend(vertices)
-        new_edges = [tuple(i + offset for i in edge) for edge in edges]
-        new_faces = [[i + offset for i in face] for face in faces]
-        result_edges.extend(new_edges)
-        result_faces.extend(new_faces)
-        offset += len(vertices)
+    count = min(len(vertices_s), len(edges_s), len(faces_s))
+    vertices_s, edges_s, faces_s = vertices_s[:count], edges_s[:count], faces_s[:count]
+    totals = np.fromiter(map(len, vertices_s), dtype=np.int64, count=count)
+    offsets = np.cumsum(totals) - totals
+
+    if count and all(isinstance(v, np.ndarray) for v in vertices_s):
+        result_vertices = np.concatenate([v.reshape(-1, 3) for v in vertices_s])
+    else:
+        result_vertices = list(itertools.chain.from_iterable(vertices_s))
+    result_edges = join_indices(edges_s, offsets)
+    result_faces = join_indices(faces_s, offsets)
     return result_vertices, result_edges, result_faces
+
+
+def flat_indices(items_s):
+    '''
+    Nested lists of index lists (edges or faces of several meshes) as a flat
+    index buffer, the length of every index list and the number of index
+    lists of every mesh
+    '''
+    mesh_counts = np.fromiter(map(len, items_s), dtype=np.int64, count=len(items_s))
+    items = list(itertools.chain.from_iterable(items_s))
+    lengths = np.fromiter(map(len, items), dtype=np.int64, count=len(items))
+    flat = np.fromiter(itertools.chain.from_iterable(items), dtype=np.int64,
+                       count=int(lengths.sum()))
+    return flat, lengths, mesh_counts
+
+
+def unflatten_indices(flat, lengths):
+    ''' list of index lists from a flat index buffer and the lengths '''
+    if len(lengths) and (lengths == lengths[0]).all():
+        return flat.reshape(len(lengths), -1).tolist()
+    ends = np.cumsum(lengths).tolist()
+    flat = flat.tolist()
+    return [flat[end - length:end] for end, length in zip(ends, lengths.tolist())]
+
+
+def join_indices(items_s, offsets):
+    ''' edges or faces of several meshes as one list, shifted by the vertex offset of their mesh '''
+    flat, lengths, mesh_counts = flat_indices(items_s)
+    if not len(lengths):
+        return []
+    # number of indices of every mesh
+    index_ends = np.r_[0, np.cumsum(lengths)][np.cumsum(mesh_counts)]
+    mesh_lengths = np.diff(np.r_[0, index_ends])
+    flat += np.repeat(offsets, mesh_lengths)
+    return unflatten_indices(flat, lengths)
+
+
+def repeat_indices(items, offsets, as_array=False):
+    '''
+    Edges or faces of one mesh repeated once per offset, shifted by the offset.
+    With as_array items of equal length come as one (K, length) array.
+    '''
+    if not len(items) or not len(offsets):
+        return []
+    flat, lengths, _ = flat_indices([items])
+    flat = (flat[np.newaxis] + np.asarray(offsets)[:, np.newaxis]).ravel()
+    if as_array and (lengths == lengths[0]).all():
+        return flat.reshape(-1, lengths[0])
+    return unflatten_indices(flat, np.tile(lengths, len(offsets)))
+
+
+#####################################
+# matrices                          #
+#####################################
+
+def transform_batch(matrices, vertices):
+    '''
+    (M, N, 3) array of the N vertices transformed by every one of the M matrices
+    '''
+    matrices = np.asarray(matrices, dtype=np.float64).reshape(-1, 4, 4)
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    out = np.matmul(vertices, matrices[:, :3, :3].transpose(0, 2, 1))
+    out += matrices[:, np.newaxis, :3, 3]
+    return out
+
+
+def transform_chunks(matrices, vertices):
+    '''
+    transform_batch in chunks of matrices, for results that are converted
+    or copied chunk by chunk. With a memory budget set in the preferences
+    a chunk takes at most that much memory, else all matrices are one chunk.
+    '''
+    matrices = np.asarray(matrices, dtype=np.float64).reshape(-1, 4, 4)
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    step = len(matrices)
+    if data_structure.MEMORY_BUDGET:
+        step = data_structure.MEMORY_BUDGET // max(vertices.nbytes, 1)
+    step = max(1, step)
+    for start in range(0, len(matrices), step):
+        yield transform_batch(matrices[start:start + step], vertices)
+
+
+def apply_matrices(matrices, vertices_s, index):
+    '''
+    Vertices of object index[i] transformed by matrices[i] for every i,
+    as a list of (N, 3) arrays. All matrices of one object are applied
+    in one batch.
+    '''
+    matrices = np.asarray(matrices, dtype=np.float64).reshape(-1, 4, 4)
+    index = np.asarray(index, dtype=np.int64)
+    order = np.argsort(index, kind='mergesort')
+    starts = np.flatnonzero(np.r_[True, index[order][1:] != index[order][:-1]])
+    result = [None] * len(matrices)
+    for which in np.split(order, starts[1:]) if len(order) else []:
+        batch = transform_batch(matrices[which], vertices_s[index[which[0]]])
+        for i, verts in zip(which.tolist(), batch):
+            result[i] = verts
+    return result
+
+
+#####################################
+# remove doubles                    #
+#####################################
+
+# cell offsets that find every pair of neighbouring cells once,
+# (0, 0, 0) and one of each pair of opposite offsets
+HALF_NEIGHBOURS = [(x, y, z) for x in (-1, 0, 1) for y in (-1, 0, 1) for z in (-1, 0, 1)
+                   if (x, y, z) >= (0, 0, 0)]
+
+
+def row_keys(arr):
+    """ rows of a 2d int array as sortable scalars, equal rows give equal keys """
+    arr = np.ascontiguousarray(arr)
+    return arr.view(np.dtype((np.void, arr.dtype.itemsize * arr.shape[1]))).ravel()
+
+
+def close_pairs(verts, dist):
+    """
+    All pairs (i, j), i < j, of vertices within dist of each other.
+    Vertices are put in a grid of cells of size dist, so only vertices
+    in the same or neighbouring cells are compared.
+    """
+    cells = np.floor(verts / dist).astype(np.int64)
+    # one integer per cell when the grid is small enough, else the row bytes
+    low = cells.min(axis=0) - 1
+    span = cells.max(axis=0) - low + 2
+    if float(span[0]) * float(span[1]) * float(span[2]) < 2 ** 62:
+        def cell_keys(c):
+            c = c - low
+            return (c[:, 0] * span[1] + c[:, 1]) * span[2] + c[:, 2]
+    else:
+        cell_keys = row_keys
+    keys = cell_keys(cells)
+    order = np.argsort(keys, kind='mergesort')
+    unique_keys, first, counts = np.unique(keys[order], return_index=True, return_counts=True)
+    unique_cells = cells[order[first]]
+
+    pairs = []
+    for offset in HALF_NEIGHBOURS:
+        # neighbouring cell of every occupied cell
+        other = cell_keys(unique_cells + offset)
+        pos = np.minimum(np.searchsorted(unique_keys, other), len(unique_keys) - 1)
+        cell_a = np.flatnonzero(unique_keys[pos] == other)
+        if not len(cell_a):
+            continue
+        cell_b = pos[cell_a]
+
+        # every vertex of cell a against every vertex of cell b
+        count_a, count_b = counts[cell_a], counts[cell_b]
+        n = count_a * count_b
+        k = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+        repeat_b = np.repeat(count_b, n)
+        i = order[np.repeat(first[cell_a], n) + k // repeat_b]
+        j = order[np.repeat(first[cell_b], n) + k % repeat_b]
+        if offset == (0, 0, 0):
+            keep = i < j
+            i, j = i[keep], j[keep]
+        diff = verts[i] - verts[j]
+        close = np.einsum('ij,ij->i', diff, diff) <= dist * dist
+        pairs.append(np.column_stack((np.minimum(i, j), np.maximum(i, j)))[close])
+    if not pairs:
+        return np.zeros((0, 2), dtype=np.int64)
+    return np.concatenate(pairs)
+
+
+def doubles_map(verts, dist):
+    """
+    Target of every vertex like bmesh.ops.find_doubles, vertices are visited
+    in order of x + y + z and take all free vertices within dist as doubles.
+    Returns an int array, target[i] == i for vertices that are kept.
+    """
+    verts = np.asarray(verts, dtype=np.float64).reshape(-1, 3)
+    count = len(verts)
+    rank = np.empty(count, dtype=np.int64)
+    rank[np.argsort(verts.sum(axis=1), kind='mergesort')] = np.arange(count)
+    target = np.arange(count)
+
+    if dist <= 0:
+        # only equal vertices, every group goes to its first vertex in rank order
+        unique, inverse = np.unique(verts, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        first = np.full(len(unique), count, dtype=np.int64)
+        np.minimum.at(first, inverse, rank)
+        by_rank = np.argsort(rank)
+        return by_rank[first[inverse]]
+
+    pairs = close_pairs(verts, dist)
+    if not len(pairs):
+        return target
+    # pair (a, b) with a before b in rank order
+    swap = rank[pairs[:, 0]] > rank[pairs[:, 1]]
+    pairs[swap] = pairs[swap][:, ::-1]
+    pairs = pairs[np.lexsort((rank[pairs[:, 1]], rank[pairs[:, 0]]))]
+
+    merged = np.zeros(count, dtype=bool)
+    for a, b in pairs.tolist():
+        if merged[a] or merged[b]:
+            continue
+        target[b] = a
+        merged[b] = True
+    return target
+
+
+def remove_doubles(verts, edges=None, faces=None, dist=0.0):
+    """
+    Merge vertices within dist of each other, like bmesh.ops.remove_doubles
+    but on arrays. Returns vertices, edges, faces and the removed vertices
+    as lists. Edges that collapse and faces with less than 3 vertices left
+    are removed, with faces the edges are those of the faces.
+    """
+    verts = np.asarray(verts, dtype=np.float64).reshape(-1, 3)
+    target = doubles_map(verts, dist)
+    kept = target == np.arange(len(verts))
+    new_index = np.cumsum(kept) - 1
+    remap = new_index[target]
+
+    verts_out = verts[kept].tolist()
+    doubles = verts[~kept].tolist()
+
+    if faces is not None and len(faces):
+        faces_out = remap_faces(faces, remap)
+        edges_out = face_edges(faces_out)
+    else:
+        faces_out = []
+        edges_out = []
+        if edges is not None and len(edges):
+            edges = remap[np.asarray(edges, dtype=np.int64).reshape(-1, 2)]
+            edges = np.sort(edges[edges[:, 0] != edges[:, 1]], axis=1)
+            if len(edges):
+                unique, first = np.unique(row_keys(edges), return_index=True)
+                edges_out = edges[np.sort(first)].tolist()
+    return verts_out, edges_out, faces_out, doubles
+
+
+def remap_faces(faces, remap):
+    """ faces with new vertex indices, repeated corners dropped, degenerate faces removed """
+    totals = np.fromiter(map(len, faces), dtype=np.int64, count=len(faces))
+    flat = remap[np.fromiter(itertools.chain.from_iterable(faces), dtype=np.int64,
+                             count=int(totals.sum()))]
+    flat, new_totals = drop_repeated_corners(flat, totals)
+    faces_out = np.split(flat, np.cumsum(new_totals)[:-1])
+    return [f.tolist() for f, n in zip(faces_out, new_totals) if n >= 3]
+
+
+def drop_repeated_corners(flat, totals):
+    """ faces given as flat corners and corner counts without corners equal to the next one """
+    if not len(totals):
+        return flat, totals
+    starts = np.cumsum(totals) - totals
+    following = np.arange(len(flat)) + 1
+    following[np.cumsum(totals) - 1] = starts
+    keep = flat != flat[following]
+    return flat[keep], np.add.reduceat(keep.astype(np.int64), starts)
+
+
+def face_edges(faces):
+    """ unique edges of faces, in order of first use """
+    if not faces:
+        return []
+    flat = np.fromiter(itertools.chain.from_iterable(faces), dtype=np.int64)
+    totals = np.fromiter(map(len, faces), dtype=np.int64, count=len(faces))
+    starts = np.cumsum(totals) - totals
+    following = np.arange(len(flat)) + 1
+    following[np.cumsum(totals) - 1] = starts
+    edges = np.sort(np.column_stack((flat, flat[following])), axis=1)
+    unique, first = np.unique(row_keys(edges), return_index=True)
+    return edges[np.sort(first)].tolist()
+
+
+def first_occurrences(items):
+    """ indices of the first of equal rows of items, in order """
+    items = np.asarray(items)
+    items = items.reshape(len(items), -1)
+    return np.sort(np.unique(items, axis=0, return_index=True)[1])
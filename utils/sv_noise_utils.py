@@ -0,0 +1,187 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+'''
+Noise over N x 3 arrays of points.
+
+noise_array approximates the mathutils.noise types with numpy:
+  BLENDER, STDPERLIN, NEWPERLIN  improved perlin gradient noise
+  VORONOI_F1 .. F4, F2F1, CRACKLE  distances to jittered cell points
+  CELLNOISE  random value per unit cell
+values are in the same ranges as mathutils.noise but not the same
+numbers, the tables are different.
+
+mathutils_noise gives exactly the mathutils values, large inputs are
+split over processes forked for the call where fork is available.
+'''
+
+import multiprocessing
+import os
+import threading
+
+import numpy as np
+
+from mathutils import noise
+
+# points per block, bounds the N x 27 x 3 temporaries of the voronoi types
+BLOCK_SIZE = 65536
+# inputs at least this large are evaluated in a process pool by mathutils_noise
+POOL_THRESHOLD = 100000
+
+# offsets of the second and third component of vector noise
+VECTOR_OFFSETS = np.array([[9.321, -1.531, -7.951],
+                           [0.0, 0.0, 0.0],
+                           [6.327, 0.1671, -2.672]])
+
+_random = np.random.RandomState(13)
+PERM = np.tile(_random.permutation(256), 2)
+JITTER = _random.random_sample((256, 3))
+CELL_VALUES = _random.random_sample(256)
+
+# the 27 cells around a cell
+NEIGHBOURS = np.array([(x, y, z) for x in (-1, 0, 1) for y in (-1, 0, 1) for z in (-1, 0, 1)])
+
+
+def cell_hash(cells):
+    ''' table index of integer cell coordinates, ... x 3 -> ... '''
+    cells = cells & 255
+    return PERM[PERM[PERM[cells[..., 0]] + cells[..., 1]] + cells[..., 2]]
+
+
+def fade(t):
+    return t * t * t * (t * (t * 6 - 15) + 10)
+
+
+def lerp(t, a, b):
+    return a + t * (b - a)
+
+
+def grad(hash_, x, y, z):
+    h = hash_ & 15
+    u = np.where(h < 8, x, y)
+    v = np.where(h < 4, y, np.where((h == 12) | (h == 14), x, z))
+    return np.where(h & 1, -u, u) + np.where(h & 2, -v, v)
+
+
+def perlin(points):
+    cells = np.floor(points).astype(np.int64)
+    x, y, z = (points - cells).T
+    u, v, w = fade(points - cells).T
+    X, Y, Z = (cells & 255).T
+
+    A = PERM[X] + Y
+    AA = PERM[A] + Z
+    AB = PERM[A + 1] + Z
+    B = PERM[X + 1] + Y
+    BA = PERM[B] + Z
+    BB = PERM[B + 1] + Z
+
+    return lerp(w, lerp(v, lerp(u, grad(PERM[AA], x, y, z),
+                                   grad(PERM[BA], x - 1, y, z)),
+                           lerp(u, grad(PERM[AB], x, y - 1, z),
+                                   grad(PERM[BB], x - 1, y - 1, z))),
+                   lerp(v, lerp(u, grad(PERM[AA + 1], x, y, z - 1),
+                                   grad(PERM[BA + 1], x - 1, y, z - 1)),
+                           lerp(u, grad(PERM[AB + 1], x, y - 1, z - 1),
+                                   grad(PERM[BB + 1], x - 1, y - 1, z - 1))))
+
+
+def voronoi_distances(points):
+    ''' sorted distances to the 4 nearest cell points, N x 4 '''
+    base = np.floor(points)
+    cells = base.astype(np.int64)[:, np.newaxis, :] + NEIGHBOURS
+    diff = (NEIGHBOURS - (points - base)[:, np.newaxis, :]) + JITTER[cell_hash(cells)]
+    dist = np.einsum('ijk,ijk->ij', diff, diff)
+    return np.sqrt(np.sort(np.partition(dist, 3, axis=1)[:, :4], axis=1))
+
+
+def cellnoise(points):
+    return CELL_VALUES[cell_hash(np.floor(points).astype(np.int64))]
+
+
+def scalar_noise(points, noise_type):
+    ''' noise in 0 .. 1, or about that for perlin, like BLI_gNoise '''
+    if noise_type in {'BLENDER', 'STDPERLIN', 'NEWPERLIN'}:
+        return 0.5 * perlin(points) + 0.5
+    if noise_type == 'CELLNOISE':
+        return cellnoise(points)
+    if noise_type.startswith('VORONOI'):
+        da = voronoi_distances(points)
+        if noise_type == 'VORONOI_F2F1':
+            return da[:, 1] - da[:, 0]
+        if noise_type == 'VORONOI_CRACKLE':
+            return np.minimum(10 * (da[:, 1] - da[:, 0]), 1.0)
+        return da[:, int(noise_type[-1]) - 1]
+    raise ValueError("No numpy noise for type {}".format(noise_type))
+
+
+def noise_array(points, noise_type, vector=False):
+    '''
+    Noise of N x 3 points in -1 .. 1 like noise.noise and noise.noise_vector,
+    returns an array of N values or N x 3 vectors
+    '''
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    out = np.empty((len(points), 3) if vector else len(points))
+    for start in range(0, len(points), BLOCK_SIZE):
+        block = points[start:start + BLOCK_SIZE]
+        if vector:
+            for i, offset in enumerate(VECTOR_OFFSETS):
+                out[start:start + BLOCK_SIZE, i] = scalar_noise(block + offset, noise_type)
+        else:
+            out[start:start + BLOCK_SIZE] = scalar_noise(block, noise_type)
+    return 2.0 * out - 1.0
+
+
+def _mathutils_chunk(args):
+    points, n_t, vector = args
+    if vector:
+        return np.array([noise.noise_vector(p, n_t)[:] for p in points.tolist()]).reshape(-1, 3)
+    return np.array([noise.noise(p, n_t) for p in points.tolist()])
+
+
+def fork_context():
+    '''
+    Context to fork processes with, None where fork is not available or
+    when not called from the main thread. The children need mathutils,
+    so they have to be forks of blender, spawned interpreters can't
+    import it. Forking from a worker thread can deadlock the child.
+    '''
+    if threading.current_thread() is not threading.main_thread():
+        return None
+    try:
+        return multiprocessing.get_context('fork')
+    except ValueError:
+        return None
+
+
+def mathutils_noise(points, n_t, vector=False):
+    '''
+    noise.noise or noise.noise_vector of N x 3 points, n_t is the noise.types
+    value, returns an array of N values or N x 3 vectors. Large inputs are
+    split over a pool of forked processes that lives for this call only,
+    so no copies of blender are kept between updates.
+    '''
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    context = fork_context() if len(points) >= POOL_THRESHOLD else None
+    if context is None:
+        return _mathutils_chunk((points, n_t, vector))
+    processes = os.cpu_count() or 2
+    chunks = np.array_split(points, processes * 4)
+    with context.Pool(processes) as pool:
+        results = pool.map(_mathutils_chunk, [(chunk, n_t, vector) for chunk in chunks])
+    return np.concatenate(results)
@@ -1,7 +1,11 @@
 import re
 import random
+import itertools
+
+import numpy as np
 
 import bpy
+import bmesh
 import mathutils
 from mathutils import Vector, Matrix
 
@@ -14,6 +18,60 @@ def matrix_sanitizer(matrix):
     return Matrix([san(v) for v in matrix])
 
 
+def index_buffer(faces):
+    '''
+    Flat vertex index buffer, loop start and loop total arrays for a list
+    of faces, faces can have different lengths or be a N x k array
+    '''
+    if isinstance(faces, np.ndarray) and faces.ndim == 2:
+        count, k = faces.shape
+        loop_total = np.full(count, k, dtype=np.int32)
+        flat = faces.astype(np.int32).ravel()
+    else:
+        loop_total = np.fromiter(map(len, faces), dtype=np.int32, count=len(faces))
+        flat = np.fromiter(itertools.chain.from_iterable(faces), dtype=np.int32,
+                           count=int(loop_total.sum()))
+    loop_start = np.zeros(len(loop_total), dtype=np.int32)
+    np.cumsum(loop_total[:-1], out=loop_start[1:])
+    return flat, loop_start, loop_total
+
+
+def mesh_from_pydata_bulk(mesh, verts, edges=[], faces=[]):
+    '''
+    Replace geometry of mesh, sizing vertices, edges, loops and
+    polygons once and filling them with foreach_set from flat arrays,
+    instead of creating each element with a python call.
+    The mesh datablock, and with that its materials, is kept.
+    '''
+    # an empty bmesh is the way to clear a mesh
+    bm = bmesh.new()
+    bm.to_mesh(mesh)
+    bm.free()
+
+    co = np.asarray(verts, dtype=np.float32).reshape(-1)
+    mesh.vertices.add(len(co) // 3)
+    mesh.vertices.foreach_set('co', co)
+
+    if len(edges):
+        edge_buffer = np.asarray(edges, dtype=np.int32).reshape(-1)
+        mesh.edges.add(len(edge_buffer) // 2)
+        mesh.edges.foreach_set('vertices', edge_buffer)
+
+    if len(faces):
+        flat, loop_start, loop_total = index_buffer(faces)
+        mesh.loops.add(len(flat))
+        mesh.loops.foreach_set('vertex_index', flat)
+        mesh.polygons.add(len(loop_total))
+        mesh.polygons.foreach_set('loop_start', loop_start)
+        mesh.polygons.foreach_set('loop_total', loop_total)
+
+    # adds the edges of the faces, duplicate edges are merged
+    mesh.update(calc_edges=True)
+    # remove what bmesh would have refused, like degenerate faces
+    mesh.validate()
+    return mesh
+
+
 def natural_plus_one(object_names):
 
     ''' sorts ['Alpha', 'Alpha1', 'Alpha11', 'Alpha2', 'Alpha23']
@@ -0,0 +1,478 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+'''
+2d Delaunay triangulation and Voronoi diagrams on arrays.
+
+The triangulation comes from scipy.spatial (qhull) when scipy is
+installed, else from Fortune's sweep as in utils/voronoi.py, with a heap
+for the event queue and the half edges kept in flat lists. The Voronoi
+diagram and the cells clipped to a box are derived from the triangles
+with numpy.
+'''
+
+import heapq
+import math
+
+import numpy as np
+
+from sverchok.utils.sv_mesh_utils import doubles_map, drop_repeated_corners
+
+try:
+    from scipy.spatial import Delaunay, QhullError
+except ImportError:
+    Delaunay = None
+
+# half edge sides and edge markers of the sweep
+LE, RE = 0, 1
+NO_EDGE, DELETED = -1, -2
+
+# vertices of the diagram closer than this times the size of the points are merged
+MERGE_TOLERANCE = 1e-9
+
+
+def as_xy(points):
+    ''' (N, 2) float array of the x and y of 2d or 3d points '''
+    points = np.asarray(points, dtype=np.float64)
+    if not points.size:
+        return np.zeros((0, 2))
+    return points.reshape(len(points), -1)[:, :2]
+
+
+def fortune_triangles(xy):
+    '''
+    Delaunay triangles of distinct 2d points with Fortune's sweep line,
+    (M, 3) int array of indices into xy
+    '''
+    count = len(xy)
+    order = np.lexsort((xy[:, 0], xy[:, 1]))
+    # sites in sweep order, comparing two sites is comparing their indices
+    sx = xy[order, 0].tolist()
+    sy = xy[order, 1].tolist()
+
+    # edges: line a*x + b*y = c between sites reg0 and reg1
+    ea, eb, ec, ereg0, ereg1 = [], [], [], [], []
+    # half edges: beach line neighbours, edge, side and queue stamp
+    hleft, hright, hedge, hpm, hstamp = [], [], [], [], []
+
+    def new_halfedge(edge, pm):
+        hleft.append(-1)
+        hright.append(-1)
+        hedge.append(edge)
+        hpm.append(pm)
+        hstamp.append(0)
+        return len(hedge) - 1
+
+    def bisect(s1, s2):
+        dx = sx[s2] - sx[s1]
+        dy = sy[s2] - sy[s1]
+        c = sx[s1] * dx + sy[s1] * dy + (dx * dx + dy * dy) * 0.5
+        if abs(dx) > abs(dy):
+            ea.append(1.0)
+            eb.append(dy / dx)
+            ec.append(c / dx)
+        else:
+            ea.append(dx / dy)
+            eb.append(1.0)
+            ec.append(c / dy)
+        ereg0.append(s1)
+        ereg1.append(s2)
+        return len(ea) - 1
+
+    def leftreg(he):
+        e = hedge[he]
+        if e < 0:
+            return 0
+        return ereg0[e] if hpm[he] == LE else ereg1[e]
+
+    def rightreg(he):
+        e = hedge[he]
+        if e < 0:
+            return 0
+        return ereg1[e] if hpm[he] == LE else ereg0[e]
+
+    def right_of(he, px, py):
+        e = hedge[he]
+        top = ereg1[e]
+        tx, ty = sx[top], sy[top]
+        right_of_site = px > tx
+        if right_of_site and hpm[he] == LE:
+            return True
+        if not right_of_site and hpm[he] == RE:
+            return False
+        a, b, c = ea[e], eb[e], ec[e]
+        if a == 1.0:
+            dyp = py - ty
+            dxp = px - tx
+            fast = False
+            if (not right_of_site and b < 0.0) or (right_of_site and b >= 0.0):
+                above = dyp >= b * dxp
+                fast = above
+            else:
+                above = px + py * b > c
+                if b < 0.0:
+                    above = not above
+                if not above:
+                    fast = True
+            if not fast:
+                dxs = tx - sx[ereg0[e]]
+                above = b * (dxp * dxp - dyp * dyp) < dxs * dyp * (1.0 + 2.0 * dxp / dxs + b * b)
+                if b < 0.0:
+                    above = not above
+        else:
+            yl = c - a * px
+            t1 = py - yl
+            t2 = px - tx
+            t3 = yl - ty
+            above = t1 * t1 > t2 * t2 + t3 * t3
+        return above if hpm[he] == LE else not above
+
+    def intersect(he1, he2):
+        e1, e2 = hedge[he1], hedge[he2]
+        if e1 < 0 or e2 < 0 or ereg1[e1] == ereg1[e2]:
+            return None
+        d = ea[e1] * eb[e2] - eb[e1] * ea[e2]
+        if -1e-9 < d < 1e-9:
+            return None
+        xint = (ec[e1] * eb[e2] - ec[e2] * eb[e1]) / d
+        yint = (ec[e2] * ea[e1] - ec[e1] * ea[e2]) / d
+        if ereg1[e1] < ereg1[e2]:
+            he, e = he1, e1
+        else:
+            he, e = he2, e2
+        right_of_site = xint >= sx[ereg1[e]]
+        if (right_of_site and hpm[he] == LE) or (not right_of_site and hpm[he] == RE):
+            return None
+        return xint, yint
+
+    # beach line, a linked list of half edges with a hash on x
+    xmin, xmax = min(sx), max(sx)
+    deltax = (xmax - xmin) or 1.0
+    hashsize = int(2 * math.sqrt(count + 4))
+    leftend = new_halfedge(NO_EDGE, LE)
+    rightend = new_halfedge(NO_EDGE, LE)
+    hright[leftend] = rightend
+    hleft[rightend] = leftend
+    edge_hash = [None] * hashsize
+    edge_hash[0] = leftend
+    edge_hash[-1] = rightend
+
+    def insert(left, he):
+        hleft[he] = left
+        hright[he] = hright[left]
+        hleft[hright[left]] = he
+        hright[left] = he
+
+    def delete(he):
+        hright[hleft[he]] = hright[he]
+        hleft[hright[he]] = hleft[he]
+        hedge[he] = DELETED
+
+    def gethash(b):
+        if b < 0 or b >= hashsize:
+            return None
+        he = edge_hash[b]
+        if he is None or hedge[he] != DELETED:
+            return he
+        edge_hash[b] = None
+        return None
+
+    def leftbnd(px, py):
+        bucket = min(max(int((px - xmin) / deltax * hashsize), 0), hashsize - 1)
+        he = gethash(bucket)
+        i = 1
+        while he is None:
+            he = gethash(bucket - i)
+            if he is None:
+                he = gethash(bucket + i)
+            i += 1
+        if he == leftend or (he != rightend and right_of(he, px, py)):
+            he = hright[he]
+            while he != rightend and right_of(he, px, py):
+                he = hright[he]
+            he = hleft[he]
+        else:
+            he = hleft[he]
+            while he != leftend and not right_of(he, px, py):
+                he = hleft[he]
+        if 0 < bucket < hashsize - 1:
+            edge_hash[bucket] = he
+        return he
+
+    # circle events, (y, x, -stamp, half edge). Deleted or replaced events
+    # stay in the heap and are skipped when the stamp of their half edge has
+    # changed, newer events go first of equal ones as in the bucketed queue.
+    queue = []
+    stamps = [0]
+
+    def queue_insert(he, p, site):
+        x, y = p
+        stamps[0] += 1
+        hstamp[he] = stamps[0]
+        heapq.heappush(queue, (y + math.hypot(sx[site] - x, sy[site] - y), x, -stamps[0], he))
+
+    def queue_top():
+        while queue and hstamp[queue[0][3]] != -queue[0][2]:
+            heapq.heappop(queue)
+        return queue[0] if queue else None
+
+    triangles = []
+    newsite = 1
+    while True:
+        top_event = queue_top()
+        if newsite < count and (top_event is None or sy[newsite] < top_event[0] or
+                                (sy[newsite] == top_event[0] and sx[newsite] < top_event[1])):
+            # site event
+            lbnd = leftbnd(sx[newsite], sy[newsite])
+            rbnd = hright[lbnd]
+            edge = bisect(rightreg(lbnd), newsite)
+            bisector = new_halfedge(edge, LE)
+            insert(lbnd, bisector)
+            p = intersect(lbnd, bisector)
+            if p is not None:
+                queue_insert(lbnd, p, newsite)
+            lbnd = bisector
+            bisector = new_halfedge(edge, RE)
+            insert(lbnd, bisector)
+            p = intersect(bisector, rbnd)
+            if p is not None:
+                queue_insert(bisector, p, newsite)
+            newsite += 1
+
+        elif top_event is not None:
+            # circle event
+            heapq.heappop(queue)
+            lbnd = top_event[3]
+            hstamp[lbnd] = 0
+            llbnd = hleft[lbnd]
+            rbnd = hright[lbnd]
+            rrbnd = hright[rbnd]
+            bot = leftreg(lbnd)
+            top = rightreg(rbnd)
+            triangles.append((bot, top, rightreg(lbnd)))
+
+            delete(lbnd)
+            hstamp[rbnd] = 0
+            delete(rbnd)
+
+            pm = LE
+            if sy[bot] > sy[top]:
+                bot, top = top, bot
+                pm = RE
+            bisector = new_halfedge(bisect(bot, top), pm)
+            insert(llbnd, bisector)
+            p = intersect(llbnd, bisector)
+            if p is not None:
+                queue_insert(llbnd, p, bot)
+            p = intersect(bisector, rrbnd)
+            if p is not None:
+                queue_insert(bisector, p, bot)
+        else:
+            break
+
+    if not triangles:
+        return np.zeros((0, 3), dtype=np.int64)
+    return order[np.array(triangles, dtype=np.int64)]
+
+
+def delaunay_triangles(points, use_scipy=True):
+    '''
+    Delaunay triangulation of the x and y of points, (M, 3) int array of
+    counter clockwise triangles. Of equal points only the first is used.
+    '''
+    xy = as_xy(points)
+    empty = np.zeros((0, 3), dtype=np.int64)
+    if len(xy) < 3:
+        return empty
+    unique, first = np.unique(xy, axis=0, return_index=True)
+    if len(unique) < 3:
+        return empty
+
+    if use_scipy and Delaunay is not None:
+        try:
+            tris = Delaunay(unique).simplices.astype(np.int64)
+        except QhullError:
+            # all points on a line
+            return empty
+    else:
+        tris = fortune_triangles(unique)
+        if not len(tris):
+            return empty
+
+    a, b, c = unique[tris[:, 0]], unique[tris[:, 1]], unique[tris[:, 2]]
+    u, v = b - a, c - a
+    area = u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0]
+    tris = tris[area != 0]
+    flip = area[area != 0] < 0
+    tris[flip] = tris[flip][:, ::-1]
+    return first[tris]
+
+
+def circumcenters(xy, tris):
+    ''' (M, 2) centers of the circles through the corners of triangles '''
+    a = xy[tris[:, 0]]
+    b = xy[tris[:, 1]] - a
+    c = xy[tris[:, 2]] - a
+    d = 2 * (b[:, 0] * c[:, 1] - b[:, 1] * c[:, 0])
+    bb = np.einsum('ij,ij->i', b, b)
+    cc = np.einsum('ij,ij->i', c, c)
+    ux = (c[:, 1] * bb - b[:, 1] * cc) / d
+    uy = (b[:, 0] * cc - c[:, 0] * bb) / d
+    return a + np.column_stack((ux, uy))
+
+
+def triangle_neighbours(tris):
+    '''
+    Edges shared by two triangles as (K, 2) pairs of triangle indices,
+    and the edges with one triangle as (H, 2) vertex pairs in the
+    direction of that triangle with the (H,) triangle indices.
+    '''
+    count = len(tris)
+    edges = np.concatenate((tris[:, [0, 1]], tris[:, [1, 2]], tris[:, [2, 0]]))
+    owner = np.tile(np.arange(count), 3)
+    keys = np.sort(edges, axis=1)
+    keys = keys[:, 0] * (int(tris.max()) + 1) + keys[:, 1]
+    order = np.argsort(keys, kind='mergesort')
+    keys = keys[order]
+    shared = np.flatnonzero(keys[1:] == keys[:-1])
+    pairs = np.column_stack((owner[order[shared]], owner[order[shared + 1]]))
+    single = np.ones(len(keys), dtype=bool)
+    single[shared] = False
+    single[shared + 1] = False
+    border = order[single]
+    return pairs, edges[border], owner[border]
+
+
+def merge_vertices(xy):
+    '''
+    Vertices closer than MERGE_TOLERANCE times the size of xy merged,
+    as x, y, 0 lists, and the new index of every row of xy
+    '''
+    scale = max(float(np.ptp(xy, axis=0).max()), 1.0) if len(xy) else 1.0
+    verts = np.column_stack((xy, np.zeros(len(xy))))
+    target = doubles_map(verts, MERGE_TOLERANCE * scale)
+    kept = target == np.arange(len(verts))
+    remap = (np.cumsum(kept) - 1)[target]
+    return verts[kept].tolist(), remap
+
+
+def voronoi_edges(points, use_scipy=True):
+    '''
+    Finite part of the Voronoi diagram of the x and y of points,
+    vertices at z 0 and edges as lists. Vertices of cocircular
+    points are merged.
+    '''
+    xy = as_xy(points)
+    tris = delaunay_triangles(xy, use_scipy)
+    if not len(tris):
+        return [], []
+    pairs, _, _ = triangle_neighbours(tris)
+    verts, remap = merge_vertices(circumcenters(xy, tris))
+    edges = remap[pairs]
+    return verts, edges[edges[:, 0] != edges[:, 1]].tolist()
+
+
+def clip_polygon(poly, origin, normal):
+    ''' part of convex polygon, list of (x, y), on the side of the line away from normal '''
+    ox, oy = origin
+    nx, ny = normal
+    result = []
+    last = poly[-1]
+    last_side = (last[0] - ox) * nx + (last[1] - oy) * ny
+    for point in poly:
+        side = (point[0] - ox) * nx + (point[1] - oy) * ny
+        if (side <= 0) != (last_side <= 0):
+            t = last_side / (last_side - side)
+            result.append((last[0] + (point[0] - last[0]) * t, last[1] + (point[1] - last[1]) * t))
+        if side <= 0:
+            result.append(point)
+        last, last_side = point, side
+    return result
+
+
+def voronoi_cells(points, bounds, use_scipy=True):
+    '''
+    Voronoi cells of the x and y of points clipped to bounds, a box
+    ((xmin, ymin), (xmax, ymax)). Returns vertices and polygons as lists,
+    the polygons in order of the points, without duplicate points and
+    points whose cell is outside the box. Vertices shared by cells are merged.
+    '''
+    xy = as_xy(points)
+    (xmin, ymin), (xmax, ymax) = bounds
+    box = [(xmin, ymin), (xmax, ymin), (xmax, ymax), (xmin, ymax)]
+    tris = delaunay_triangles(xy, use_scipy)
+    if not len(tris):
+        return [], []
+
+    centers = circumcenters(xy, tris)
+    _, border_edges, _ = triangle_neighbours(tris)
+
+    # cells of points on the hull or with a corner outside the box are
+    # the box cut by the bisectors to their neighbours
+    sites = tris.ravel()
+    owner = np.repeat(np.arange(len(tris)), 3)
+    outside = ((centers[:, 0] < xmin) | (centers[:, 0] > xmax) |
+               (centers[:, 1] < ymin) | (centers[:, 1] > ymax))
+    clipped = np.zeros(len(xy), dtype=bool)
+    clipped[border_edges.ravel()] = True
+    clipped[sites[outside[owner]]] = True
+
+    edges = np.concatenate((tris[:, [0, 1]], tris[:, [1, 2]], tris[:, [2, 0]]))
+    edges = np.concatenate((edges, edges[:, ::-1]))
+    neighbours = {}
+    for a, b in edges[clipped[edges[:, 0]]].tolist():
+        neighbours.setdefault(a, set()).add(b)
+    xy_list = xy.tolist()
+    clipped_sites, clipped_totals, clipped_corners = [], [], []
+    for site, others in neighbours.items():
+        sx, sy = xy_list[site]
+        poly = box
+        for other in others:
+            ox, oy = xy_list[other]
+            poly = clip_polygon(poly, ((sx + ox) / 2, (sy + oy) / 2), (ox - sx, oy - sy))
+            if not poly:
+                break
+        if len(poly) >= 3:
+            clipped_sites.append(site)
+            clipped_totals.append(len(poly))
+            clipped_corners.extend(poly)
+
+    # the other cells are the centers of the triangles around their point
+    # in order of angle, as corners (point, triangle) sorted by point and angle
+    inner = ~clipped[sites]
+    sites, owner = sites[inner], owner[inner]
+    offset = centers[owner] - xy[sites]
+    order = np.lexsort((np.arctan2(offset[:, 1], offset[:, 0]), sites))
+    sites, owner = sites[order], owner[order]
+    used_centers, owner = np.unique(owner, return_inverse=True)
+    starts = np.flatnonzero(np.r_[True, sites[1:] != sites[:-1]]) if len(sites) else sites
+    inner_totals = np.diff(np.r_[starts, len(sites)])
+
+    cell_sites = np.r_[sites[starts], clipped_sites].astype(np.int64)
+    totals = np.r_[inner_totals, clipped_totals].astype(np.int64)
+    flat = np.r_[owner.ravel(), np.arange(len(clipped_corners)) + len(used_centers)].astype(np.int64)
+    corners = np.concatenate((centers[used_centers], np.reshape(clipped_corners, (-1, 2))))
+
+    verts, remap = merge_vertices(corners)
+    flat, totals = drop_repeated_corners(remap[flat], totals)
+    ends = np.cumsum(totals).tolist()
+    totals = totals.tolist()
+    flat = flat.tolist()
+    polys = [flat[ends[i] - totals[i]:ends[i]] for i in np.argsort(cell_sites).tolist()
+             if totals[i] >= 3]
+    return verts, polys